@@ -0,0 +1,18 @@
+import numpy as np
+import time
+from pykin.kinematics.transform import Transform
+from pykin.robots.single_arm import SingleArm
+
+file_path = "urdf/ur5e/ur5e.urdf"
+robot = SingleArm(file_path, Transform(rot=[0.0, 0.0, 0.0], pos=[0, 0, 0]))
+robot.setup_link_name("ur5e_base_link", "ur5e_right_hand")
+
+thetas = np.random.uniform(-np.pi, np.pi, (10000, robot.arm_dof))
+
+start_time = time.time()
+fk = robot.kin.forward_kinematics_batch(robot.desired_frames, thetas)
+print(f"batch fk of {len(thetas)} configurations : {time.time() - start_time:.4f} sec")
+print(fk.shape)
+
+eef_pose = robot.kin.forward_kinematics(robot.desired_frames, thetas[0])
+print(np.allclose(eef_pose[robot.eef_name].h_mat, fk[0, -1]))
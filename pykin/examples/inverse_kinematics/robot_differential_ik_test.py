@@ -0,0 +1,48 @@
+import numpy as np
+import time
+from pykin.kinematics.transform import Transform
+from pykin.robots.single_arm import SingleArm
+from pykin.utils.kin_utils import calc_pose_error_batch
+
+file_path = "urdf/iiwa7/iiwa7.urdf"
+robot = SingleArm(file_path, Transform(rot=[0.0, 0.0, 0.0], pos=[0, 0, 0]))
+robot.setup_link_name("iiwa7_link_0", "iiwa7_right_hand")
+
+init_thetas = np.array([0.0, 0.5, 0.0, -1.5, 0.0, 1.0, 0.0])
+diff_ik = robot.get_differential_ik(init_thetas, velocity_limits=1.0)
+center = diff_ik.eef_pose
+
+# track a circle of radius 0.1 m in 2 seconds at 1 kHz
+dt = 0.001
+radius = 0.1
+omega = np.pi
+gain = 50.0
+num_ticks = 2000
+
+tick_times = np.zeros(num_ticks)
+tracking_errors = np.zeros(num_ticks)
+for tick in range(num_ticks):
+    t = tick * dt
+    target_pose = center.copy()
+    target_pose[:3, 3] += radius * np.array(
+        [0.0, np.sin(omega * t), 1 - np.cos(omega * t)]
+    )
+    velocity = radius * omega * np.array([0.0, np.cos(omega * t), np.sin(omega * t)])
+
+    start_time = time.perf_counter()
+    err = calc_pose_error_batch(target_pose, diff_ik.eef_pose, 1e-12)
+    twist = gain * err
+    twist[:3] += velocity
+    thetas = diff_ik.step(twist, dt)
+    tick_times[tick] = time.perf_counter() - start_time
+    tracking_errors[tick] = np.linalg.norm(err[:3])
+
+print(f"tick time mean : {np.mean(tick_times) * 1e6:.1f} us")
+print(f"tick time p99 : {np.percentile(tick_times, 99) * 1e6:.1f} us")
+print(f"tick time max : {np.max(tick_times) * 1e6:.1f} us")
+print(f"max tracking error : {np.max(tracking_errors):.6f} m")
+print(
+    "within joint limits :",
+    np.all(thetas >= robot.joint_limits_lower)
+    and np.all(thetas <= robot.joint_limits_upper),
+)
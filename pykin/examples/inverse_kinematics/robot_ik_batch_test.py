@@ -0,0 +1,20 @@
+import numpy as np
+import time
+from pykin.kinematics.transform import Transform
+from pykin.robots.single_arm import SingleArm
+
+file_path = "urdf/iiwa7/iiwa7.urdf"
+robot = SingleArm(file_path, Transform(rot=[0.0, 0.0, 0.0], pos=[0, 0, 0]))
+robot.setup_link_name("iiwa7_link_0", "iiwa7_right_hand")
+
+target_thetas = np.random.uniform(
+    robot.joint_limits_lower, robot.joint_limits_upper, (100, robot.arm_dof)
+)
+target_poses = robot.kin.forward_kinematics_batch(robot.desired_frames, target_thetas)[
+    :, -1
+]
+
+start_time = time.time()
+joints, errors = robot.inverse_kin_batch(target_poses, n_seeds=8, method="LM2")
+print(f"batch ik of {len(target_poses)} targets : {time.time() - start_time:.4f} sec")
+print(f"solved targets : {np.sum(errors < 1e-8)} / {len(target_poses)}")
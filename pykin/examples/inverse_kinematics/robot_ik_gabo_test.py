@@ -24,7 +24,7 @@ fk = robot.forward_kin(target_thetas)
 target_pose = robot.compute_eef_pose(fk)
 
 # Compute joints using GaBO IK
-joints = robot.inverse_kin(init_thetas, target_pose, method="GaBO")
+joints = robot.inverse_kin(init_thetas, target_pose, method="GaBO", verbose=True)
 
 robot.set_transform(joints)
 
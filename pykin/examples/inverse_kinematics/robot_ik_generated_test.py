@@ -0,0 +1,22 @@
+import numpy as np
+import time
+from pykin.kinematics.ik_generator import generate_ik_module
+from pykin.kinematics.transform import Transform
+from pykin.robots.single_arm import SingleArm
+
+file_path = "urdf/iiwa7/iiwa7.urdf"
+robot = SingleArm(file_path, Transform(rot=[0.0, 0.0, 0.0], pos=[0, 0, 0]))
+robot.setup_link_name("iiwa7_link_0", "iiwa7_right_hand")
+
+# generated once and loaded from ~/.cache/pykin/ik afterwards
+ik = generate_ik_module(robot, "iiwa7_link_0", "iiwa7_right_hand")
+print(f"free joint : {ik.JOINT_NAMES[ik.FREE_JOINT]}")
+
+target_thetas = np.random.uniform(robot.joint_limits_lower, robot.joint_limits_upper)
+target_pose = robot.eef_pose(target_thetas)
+
+start_time = time.time()
+solutions = ik.solve(target_pose, free_angle=target_thetas[ik.FREE_JOINT])
+print(f"generated ik : {time.time() - start_time:.4f} sec")
+for solution in solutions:
+    print(solution, robot.get_pose_error(target_pose, robot.eef_pose(solution)))
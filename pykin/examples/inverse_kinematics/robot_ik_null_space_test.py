@@ -0,0 +1,54 @@
+import numpy as np
+from pykin.kinematics.null_space import JointCentering, Manipulability
+from pykin.kinematics.transform import Transform
+from pykin.robots.single_arm import SingleArm
+
+file_path = "urdf/iiwa7/iiwa7.urdf"
+robot = SingleArm(file_path, Transform(rot=[0.0, 0.0, 0.0], pos=[0, 0, 0]))
+robot.setup_link_name("iiwa7_link_0", "iiwa7_right_hand")
+
+lower = np.array(robot.joint_limits_lower)
+upper = np.array(robot.joint_limits_upper)
+
+np.random.seed(0)
+n_targets = 20
+target_poses = [
+    robot.eef_pose(np.random.uniform(lower, upper)) for _ in range(n_targets)
+]
+init_thetas = np.random.randn(n_targets, robot.arm_dof)
+
+
+def get_manipulability(thetas):
+    J = robot.kin.jacobian(robot.desired_frames, thetas)
+    return np.sqrt(np.linalg.det(np.dot(J, J.T)))
+
+
+def get_centering_cost(thetas):
+    middle = (lower + upper) / 2
+    half_range = (upper - lower) / 2
+    return np.sum(((thetas - middle) / half_range) ** 2) / 2
+
+
+# The same poses are reached with and without objectives,
+# the redundant joint moves the arm towards the minimum of the objective
+for objectives in [None, [JointCentering(2.0)], [Manipulability(0.1)]]:
+    results = [
+        robot.inverse_kin(
+            thetas,
+            target_pose,
+            method="LM2",
+            max_iter=300,
+            objectives=objectives,
+            return_result=True,
+        )
+        for thetas, target_pose in zip(init_thetas, target_poses)
+    ]
+    print(objectives)
+    print(f"\tconverged : {sum(result.converged for result in results)}/{n_targets}")
+    print(f"\titerations : {np.mean([result.iterations for result in results]):.1f}")
+    print(
+        f"\tmanipulability : {np.mean([get_manipulability(result.joints) for result in results]):.4f}"
+    )
+    print(
+        f"\tcentering cost : {np.mean([get_centering_cost(result.joints) for result in results]):.4f}"
+    )
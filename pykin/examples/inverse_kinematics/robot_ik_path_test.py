@@ -0,0 +1,32 @@
+import numpy as np
+import time
+from pykin.kinematics.transform import Transform
+from pykin.robots.single_arm import SingleArm
+from pykin.utils import transform_utils as t_utils
+
+file_path = "urdf/iiwa7/iiwa7.urdf"
+robot = SingleArm(file_path, Transform(rot=[0.0, 0.0, 0.0], pos=[0, 0, 0]))
+robot.setup_link_name("iiwa7_link_0", "iiwa7_right_hand")
+
+init_thetas = np.array([0.0, 0.5, 0.0, -1.5, 0.0, 1.0, 0.0])
+init_pose = robot.forward_kin(init_thetas)[robot.eef_name].h_mat
+
+
+def circle(num_points, radius=0.1):
+    # waypoints are created lazily, so the path is never stored
+    for angle in np.linspace(0, 2 * np.pi, num_points):
+        pose = init_pose.copy()
+        pose[:3, 3] += radius * np.array([0.0, np.sin(angle), 1 - np.cos(angle)])
+        yield pose
+
+
+start_time = time.time()
+max_error = 0.0
+waypoints = circle(1000)
+for target_pose, thetas in zip(
+    circle(1000), robot.inverse_kin_path(waypoints, init_thetas)
+):
+    result_pose = robot.forward_kin(thetas)[robot.eef_name].h_mat
+    max_error = max(max_error, robot.get_pose_error(target_pose, result_pose))
+print(f"path ik : {time.time() - start_time:.4f} sec")
+print(f"max pose error : {max_error}")
@@ -1,3 +1,12 @@
+from . import analytic_ik
+from . import chain
+from . import differential_ik
+from . import ik_cache
+from . import ik_generator
+from . import ik_result
+from . import ik_solver
 from . import jacobian
 from . import kinematics
+from . import matrix_fk
+from . import null_space
 from . import transform
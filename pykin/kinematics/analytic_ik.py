@@ -0,0 +1,628 @@
+import numpy as np
+
+from pykin.utils import transform_utils as t_utils
+
+
+class AnalyticIK:
+    """
+    Class of AnalyticIK
+    Closed-form inverse kinematics of a 6-dof revolute chain.
+    The chain is written as a product of exponentials T(q) = e^(S1 q1) ... e^(S6 q6) M,
+    whose joint axes are read from the compiled chain at zero configuration,
+    and is solved with Paden-Kahan subproblems evaluated for all branches at once.
+    URDF files round their angles, so axes only need to meet the geometry within tol
+    and the solutions whose pose error is above REFINE_TOL are refined with at most
+    MAX_REFINE Newton steps on the exact exponentials
+
+    Args:
+        chain (CompiledChain): compiled chain (desired frames)
+        tol (float): tolerance of geometric checks
+        eps (float): tolerance of pose error of returned solutions
+    """
+
+    closed_form = None
+    # norm of pose error below which solutions are not refined,
+    # their weighted squared error is then below tolerance of LM (1e-12)
+    REFINE_TOL = 1e-7
+    # Newton steps converge quadratically from the rounding errors of URDF files
+    MAX_REFINE = 2
+
+    def __init__(self, chain, tol=1e-3, eps=1e-6):
+        self.chain = chain
+        self.tol = tol
+        self.eps = eps
+        self.iterations = 0
+
+        if chain.dof != 6 or len(chain.eef_joint_indices) != 6:
+            raise ValueError(
+                "Analytic IK needs 6 actuated joints, instead got: {}".format(chain.dof)
+            )
+        self._columns = chain.theta_indices[chain.eef_joint_indices]
+        self.axes, self.points, self.M = _get_zero_configuration(chain)
+        self.M_inv = _inverse(self.M)
+
+        get_key_points, self._solve_closed_form = CLOSED_FORMS[self.closed_form]
+        self.key_points = get_key_points(self.axes, self.points, tol)
+
+    def __repr__(self):
+        return "pykin.kinematics.analytic_ik.{}()".format(type(self).__name__)
+
+    def solve(self, target_pose):
+        """
+        Returns all solution branches, the number of Newton steps refining them is kept in iterations
+
+        Args:
+            target_pose (np.array): goal pose to achieve (pose(7,), pose(6,) or h_mat(4, 4))
+
+        Returns:
+            joints (np.array(n_solutions, dof)): joint angles wrapped to [-pi, pi] (up to 8 solutions)
+        """
+        target_pose = np.asarray(target_pose, dtype=np.float64)
+        if target_pose.shape != (4, 4):
+            target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
+
+        solutions = self._solve_closed_form(
+            np.dot(target_pose, self.M_inv),
+            self.axes,
+            self.points,
+            *self.key_points,
+            self.tol
+        )
+        solutions, errors, self.iterations = _refine(
+            self.axes,
+            self.points,
+            self.M,
+            solutions,
+            target_pose,
+            self.REFINE_TOL,
+            self.MAX_REFINE,
+        )
+        solutions = _get_unique_solutions(solutions[errors < self.eps])
+
+        joints = np.zeros((len(solutions), self.chain.dof))
+        joints[:, self._columns] = solutions
+        return joints
+
+
+class SphericalWristIK(AnalyticIK):
+    """
+    Class of SphericalWristIK
+    Closed form of arms whose first two axes intersect at shoulder,
+    third axis is the elbow and last three axes intersect at wrist center
+
+    Args:
+        chain (CompiledChain): compiled chain (desired frames)
+        tol (float): tolerance of geometric checks
+        eps (float): tolerance of pose error of returned solutions
+    """
+
+    closed_form = "spherical_wrist"
+
+
+class ParallelWristIK(AnalyticIK):
+    """
+    Class of ParallelWristIK
+    Closed form of UR-type arms whose second, third and fourth axes are parallel
+    and perpendicular to the first, while the fifth axis intersects the fourth and sixth
+
+    Args:
+        chain (CompiledChain): compiled chain (desired frames)
+        tol (float): tolerance of geometric checks
+        eps (float): tolerance of pose error of returned solutions
+    """
+
+    closed_form = "parallel_wrist"
+
+
+ANALYTIC_IK_SOLVERS = {
+    "ur5e": ParallelWristIK,
+    "doosan": SphericalWristIK,
+    "a0509": SphericalWristIK,
+}
+
+
+def register_analytic_ik(robot_name, solver_class):
+    """
+    Registers closed-form inverse kinematics of robot
+
+    Args:
+        robot_name (str): robot's name described in the urdf file
+        solver_class (AnalyticIK): class of closed-form inverse kinematics
+    """
+    ANALYTIC_IK_SOLVERS[robot_name] = solver_class
+
+
+def get_analytic_ik(robot_name, chain):
+    """
+    Returns closed-form inverse kinematics of robot
+
+    Args:
+        robot_name (str): robot's name described in the urdf file
+        chain (CompiledChain): compiled chain (desired frames)
+
+    Returns:
+        AnalyticIK: None if the robot is not registered or chain does not fit the closed form
+    """
+    solver_class = ANALYTIC_IK_SOLVERS.get(robot_name)
+    if solver_class is None:
+        return None
+    try:
+        return solver_class(chain)
+    except ValueError:
+        return None
+
+
+def _get_zero_configuration(chain):
+    """
+    Returns joint axes, points on them and end effector's pose at zero configuration
+
+    Args:
+        chain (CompiledChain): compiled chain (desired frames)
+
+    Returns:
+        axes (np.array(n, 3)), points (np.array(n, 3)), M (np.array(4, 4))
+    """
+    joints = chain.eef_joint_indices
+    if not np.all(chain.revolute_mask[joints]):
+        raise ValueError("Analytic IK only supports revolute joints")
+    poses = chain.forward_kinematics(np.zeros(chain.dof))
+    axes = np.einsum("nij,nj->ni", poses[joints, :3, :3], chain.axes[joints])
+    return axes, poses[joints, :3, 3], poses[-1]
+
+
+def _fix_joint(axes, points, M, index, theta):
+    """
+    Returns product of exponentials whose joint is fixed at theta
+
+    Args:
+        axes (np.array(n, 3)): joint axes at zero configuration
+        points (np.array(n, 3)): points on joint axes at zero configuration
+        M (np.array(4, 4)): end effector's pose at zero configuration
+        index (int): index of fixed joint
+        theta (float): angle of fixed joint
+
+    Returns:
+        axes (np.array(n-1, 3)), points (np.array(n-1, 3)), M (np.array(4, 4))
+    """
+    e = _exp(axes[index], points[index], np.array([theta]))[0]
+    is_after = (np.arange(len(axes)) > index)[:, None]
+    axes = np.where(is_after, np.dot(axes, e[:3, :3].T), axes)
+    points = np.where(is_after, np.dot(points, e[:3, :3].T) + e[:3, 3], points)
+    is_kept = np.arange(len(axes)) != index
+    return axes[is_kept], points[is_kept], np.dot(e, M)
+
+
+def _get_spherical_wrist_points(axes, points, tol):
+    """
+    Returns shoulder and wrist center of arms with spherical wrist
+
+    Args:
+        axes (np.array(6, 3)): joint axes at zero configuration
+        points (np.array(6, 3)): points on joint axes at zero configuration
+        tol (float): tolerance of geometric checks
+
+    Returns:
+        shoulder (np.array(3,)), wrist (np.array(3,))
+    """
+    shoulder = _get_intersection(axes[0], points[0], axes[1], points[1], tol)
+    if shoulder is None:
+        raise ValueError("First two axes must intersect")
+    if _get_distance_to_line(shoulder, axes[2], points[2]) < tol:
+        raise ValueError("Third axis must not pass through the shoulder")
+    wrist = _get_intersection(axes[3], points[3], axes[4], points[4], tol)
+    if wrist is None or _get_distance_to_line(wrist, axes[5], points[5]) > tol:
+        raise ValueError("Last three axes must intersect at one point")
+    return shoulder, wrist
+
+
+def _solve_spherical_wrist(g, axes, points, shoulder, wrist, tol):
+    """
+    Returns solution branches of arms with spherical wrist
+
+    Args:
+        g (np.array(4, 4)): target pose multiplied by inverse of zero configuration pose
+        axes (np.array(6, 3)): joint axes at zero configuration
+        points (np.array(6, 3)): points on joint axes at zero configuration
+        shoulder (np.array(3,)): intersection of first two axes
+        wrist (np.array(3,)): intersection of last three axes
+        tol (float): tolerance of reach
+
+    Returns:
+        np.array(n_solutions, 6): joint angles of solution branches
+    """
+    # elbow: distance between shoulder and wrist center
+    p_wrist = _transform_points(g, wrist)
+    delta = np.linalg.norm(p_wrist - shoulder)
+    q3, is_valid = _subproblem_3(axes[2], points[2], wrist, shoulder, delta, tol)
+    q3, valid = q3.ravel(), is_valid.ravel()
+
+    # shoulder: rotate wrist center onto its target
+    p = _transform_points(_exp(axes[2], points[2], q3), wrist)
+    q1, q2, is_valid = _subproblem_2(axes[0], axes[1], shoulder, p, p_wrist, tol)
+    q3, valid = _branch(q3, valid, is_valid)
+    q1, q2 = q1.ravel(), q2.ravel()
+
+    # wrist: remaining rotation e4 e5 e6
+    g_arm = np.matmul(
+        np.matmul(_exp(axes[0], points[0], q1), _exp(axes[1], points[1], q2)),
+        _exp(axes[2], points[2], q3),
+    )
+    g_wrist = np.matmul(_inverse(g_arm), g)
+    p6 = wrist + axes[5]
+    q4, q5, is_valid = _subproblem_2(
+        axes[3], axes[4], wrist, p6, _transform_points(g_wrist, p6), tol
+    )
+    (q1, q2, q3), valid = _branch((q1, q2, q3), valid, is_valid)
+    q4, q5 = q4.ravel(), q5.ravel()
+
+    g_wrist = np.repeat(g_wrist, 2, axis=0)
+    g6 = np.matmul(
+        np.matmul(_exp(axes[4], points[4], -q5), _exp(axes[3], points[3], -q4)),
+        g_wrist,
+    )
+    v6 = _get_perpendicular(axes[5])
+    q6 = _subproblem_1(axes[5], v6, np.dot(g6[:, :3, :3], v6))
+
+    return np.stack([q1, q2, q3, q4, q5, q6], axis=-1)[valid]
+
+
+def _get_parallel_wrist_points(axes, points, tol):
+    """
+    Returns wrist center of UR-type arms
+
+    Args:
+        axes (np.array(6, 3)): joint axes at zero configuration
+        points (np.array(6, 3)): points on joint axes at zero configuration
+        tol (float): tolerance of geometric checks
+
+    Returns:
+        wrist (np.array(3,)): intersection of fifth and sixth axes
+    """
+    if not (
+        _is_parallel(axes[1], axes[2], tol) and _is_parallel(axes[1], axes[3], tol)
+    ):
+        raise ValueError("Second, third and fourth axes must be parallel")
+    if abs(np.dot(axes[0], axes[1])) > tol or abs(np.dot(axes[1], axes[4])) > tol:
+        raise ValueError("First and fifth axes must be perpendicular to the second")
+    wrist = _get_intersection(axes[4], points[4], axes[5], points[5], tol)
+    if (
+        wrist is None
+        or _get_intersection(axes[3], points[3], axes[4], points[4], tol) is None
+    ):
+        raise ValueError("Fifth axis must intersect the fourth and sixth axes")
+    return (wrist,)
+
+
+def _solve_parallel_wrist(g, axes, points, wrist, tol):
+    """
+    Returns solution branches of UR-type arms
+
+    Args:
+        g (np.array(4, 4)): target pose multiplied by inverse of zero configuration pose
+        axes (np.array(6, 3)): joint axes at zero configuration
+        points (np.array(6, 3)): points on joint axes at zero configuration
+        wrist (np.array(3,)): intersection of fifth and sixth axes
+        tol (float): tolerance of reach
+
+    Returns:
+        np.array(n_solutions, 6): joint angles of solution branches
+    """
+    w = axes
+    r1, r2, r4 = points[0], points[1], points[3]
+
+    # base: wrist center keeps its height along the parallel axes
+    p_wrist = _transform_points(g, wrist)
+    q1, is_valid = _subproblem_4(
+        w[0], p_wrist - r1, w[1], np.dot(w[1], wrist - r1), tol
+    )
+    q1, valid = q1.ravel(), is_valid.ravel()
+
+    # fifth joint: angle between parallel axes and sixth axis
+    e1 = _exp(w[0], r1, q1)
+    w2_t = np.dot(e1[:, :3, :3], w[1])
+    w6_t = np.dot(g[:3, :3], w[5])
+    q5, is_valid = _subproblem_4(w[4], w[1], w[5], np.dot(w2_t, w6_t), tol)
+    q1, valid = _branch(q1, valid, is_valid)
+    q5 = q5.ravel()
+    e1, w2_t = np.repeat(e1, 2, axis=0), np.repeat(w2_t, 2, axis=0)
+
+    # sixth joint: arbitrary (0) at wrist singularity
+    e5 = _exp(w[4], points[4], q5)
+    u = np.dot(w2_t, g[:3, :3])
+    v = np.einsum("nji,j->ni", e5[:, :3, :3], w[1])
+    q6 = _subproblem_1(w[5], u, v)
+    q6[np.linalg.norm(np.cross(u, w[5]), axis=-1) < tol] = 0.0
+    e6 = _exp(w[5], points[5], q6)
+
+    # planar arm: second, third and fourth joints
+    g234 = np.matmul(np.matmul(_inverse(e1), g), _inverse(np.matmul(e5, e6)))
+    p4 = _transform_points(g234, r4)
+    delta = np.linalg.norm(p4 - r2, axis=-1)
+    q3, is_valid = _subproblem_3(w[2], points[2], r4, r2, delta, tol)
+    (q1, q5, q6), valid = _branch((q1, q5, q6), valid, is_valid)
+    q3 = q3.ravel()
+    g234, p4 = np.repeat(g234, 2, axis=0), np.repeat(p4, 2, axis=0)
+
+    e3 = _exp(w[2], points[2], q3)
+    q2 = _subproblem_1(w[1], _transform_points(e3, r4) - r2, p4 - r2)
+    e23 = np.matmul(_exp(w[1], r2, q2), e3)
+    R4 = np.matmul(np.swapaxes(e23[:, :3, :3], -1, -2), g234[:, :3, :3])
+    v4 = _get_perpendicular(w[3])
+    q4 = _subproblem_1(w[3], v4, np.dot(R4, v4))
+
+    return np.stack([q1, q2, q3, q4, q5, q6], axis=-1)[valid]
+
+
+# closed forms by name: (function returning key points, function returning branches)
+CLOSED_FORMS = {
+    "spherical_wrist": (_get_spherical_wrist_points, _solve_spherical_wrist),
+    "parallel_wrist": (_get_parallel_wrist_points, _solve_parallel_wrist),
+}
+
+
+def _refine(axes, points, M, joints, target_pose, tol, max_iter):
+    """
+    Refines solutions whose pose error is above tol with Newton steps on the product of exponentials
+
+    Args:
+        axes (np.array(n, 3)): joint axes at zero configuration
+        points (np.array(n, 3)): points on joint axes at zero configuration
+        M (np.array(4, 4)): end effector's pose at zero configuration
+        joints (np.array(n_solutions, n)): joint angles
+        target_pose (np.array(4, 4)): goal pose to achieve
+        tol (float): norm of pose error below which solutions are not refined
+        max_iter (int): Maximum number of Newton steps
+
+    Returns:
+        joints (np.array(n_solutions, n)): refined joint angles
+        errors (np.array(n_solutions,)): norm of pose errors
+        iterations (int): number of Newton steps
+    """
+    joints = joints.copy()
+    errors = np.zeros(len(joints))
+    active = np.arange(len(joints))
+    for i in range(max_iter + 1):
+        eef_poses, J = _forward_kinematics(axes, points, M, joints[active])
+        err = _get_pose_error(target_pose, eef_poses)
+        errors[active] = np.linalg.norm(err, axis=-1)
+
+        # converged lanes are not stepped any more
+        is_active = errors[active] > tol
+        if i == max_iter or not np.any(is_active):
+            break
+        active = active[is_active]
+        joints[active] += np.einsum(
+            "nij,nj->ni", np.linalg.pinv(J[is_active]), err[is_active]
+        )
+    return joints, errors, i
+
+
+def _forward_kinematics(axes, points, M, joints):
+    """
+    Returns end effector's poses and geometric jacobians of product of exponentials
+
+    Args:
+        axes (np.array(n, 3)): joint axes at zero configuration
+        points (np.array(n, 3)): points on joint axes at zero configuration
+        M (np.array(4, 4)): end effector's pose at zero configuration
+        joints (np.array(N, n)): joint angles
+
+    Returns:
+        eef_poses (np.array(N, 4, 4)), J (np.array(N, 6, n))
+    """
+    h_mats = np.tile(np.identity(4), (len(joints), 1, 1))
+    w = np.zeros((len(joints), len(axes), 3))
+    r = np.zeros((len(joints), len(axes), 3))
+    for i in range(len(axes)):
+        w[:, i] = np.dot(h_mats[:, :3, :3], axes[i])
+        r[:, i] = _transform_points(h_mats, points[i])
+        h_mats = np.matmul(h_mats, _exp(axes[i], points[i], joints[:, i]))
+    eef_poses = np.matmul(h_mats, M)
+    v = np.cross(w, eef_poses[:, None, :3, 3] - r)
+    return eef_poses, np.swapaxes(np.concatenate((v, w), axis=-1), -1, -2)
+
+
+def _get_pose_error(target_pose, eef_poses):
+    """
+    Returns position and rotation vector errors described in the base frame
+
+    Args:
+        target_pose (np.array(4, 4)): goal pose to achieve
+        eef_poses (np.array(N, 4, 4)): end effector's poses
+
+    Returns:
+        np.array(N, 6): pose errors
+    """
+    R = np.matmul(np.swapaxes(eef_poses[:, :3, :3], -1, -2), target_pose[:3, :3])
+    el = np.stack(
+        [R[:, 2, 1] - R[:, 1, 2], R[:, 0, 2] - R[:, 2, 0], R[:, 1, 0] - R[:, 0, 1]],
+        axis=-1,
+    )
+    norm = np.linalg.norm(el, axis=-1)
+    angle = np.arctan2(norm, np.trace(R, axis1=-2, axis2=-1) - 1)
+    scale = np.where(norm > 1e-12, angle / np.maximum(norm, 1e-12), 0.5)
+    err = np.zeros((len(eef_poses), 6))
+    err[:, :3] = target_pose[:3, 3] - eef_poses[:, :3, 3]
+    err[:, 3:] = np.einsum("nij,nj->ni", eef_poses[:, :3, :3], el * scale[:, None])
+    return err
+
+
+def _get_unique_solutions(joints):
+    """
+    Returns joint angles wrapped to [-pi, pi] without duplicated branches,
+    which come from double roots of subproblems
+    """
+    joints = (joints + np.pi) % (2 * np.pi) - np.pi
+    _, indices = np.unique(np.round(joints, decimals=6), axis=0, return_index=True)
+    return joints[np.sort(indices)]
+
+
+def _exp(w, r, thetas):
+    """
+    Returns homogeneous matrices of rotating thetas about axis w through point r
+
+    Args:
+        w (np.array(3,)): unit axis
+        r (np.array(3,)): point on axis
+        thetas (np.array(N,)): joint angles
+
+    Returns:
+        np.array(N, 4, 4): homogeneous matrices
+    """
+    K = np.array([[0.0, -w[2], w[1]], [w[2], 0.0, -w[0]], [-w[1], w[0], 0.0]])
+    thetas = thetas[:, None, None]
+    R = np.identity(3) + np.sin(thetas) * K + (1 - np.cos(thetas)) * np.dot(K, K)
+    h_mats = np.zeros((len(thetas), 4, 4))
+    h_mats[:, :3, :3] = R
+    h_mats[:, :3, 3] = r - np.dot(R, r)
+    h_mats[:, 3, 3] = 1.0
+    return h_mats
+
+
+def _inverse(h_mats):
+    """
+    Returns inverse of rigid homogeneous matrices
+    """
+    R = np.swapaxes(h_mats[..., :3, :3], -1, -2)
+    inverse = np.zeros(h_mats.shape)
+    inverse[..., :3, :3] = R
+    inverse[..., :3, 3] = -np.einsum("...ij,...j->...i", R, h_mats[..., :3, 3])
+    inverse[..., 3, 3] = 1.0
+    return inverse
+
+
+def _is_parallel(w1, w2, tol):
+    return np.linalg.norm(np.cross(w1, w2)) < tol
+
+
+def _get_distance_to_line(p, w, r):
+    return np.linalg.norm(np.cross(p - r, w))
+
+
+def _get_intersection(w1, r1, w2, r2, tol):
+    """
+    Returns intersection point of two axes (None if they do not intersect)
+    """
+    n = np.cross(w1, w2)
+    if np.linalg.norm(n) < tol:
+        return None
+    # closest points of two lines
+    d = r2 - r1
+    t1 = np.dot(np.cross(d, w2), n) / np.dot(n, n)
+    t2 = np.dot(np.cross(d, w1), n) / np.dot(n, n)
+    p1, p2 = r1 + t1 * w1, r2 + t2 * w2
+    if np.linalg.norm(p1 - p2) > tol:
+        return None
+    return (p1 + p2) / 2
+
+
+def _branch(values, valid, is_valid):
+    """
+    Repeats joint angles of each branch for the two roots of the next subproblem
+
+    Args:
+        values (np.array(N,) or tuple): joint angles of current branches
+        valid (np.array(N,)): True if current branch is solvable
+        is_valid (np.array(N, 2)): True if root of the next subproblem exists
+
+    Returns:
+        values (np.array(2N,) or tuple): repeated joint angles
+        valid (np.array(2N,)): True if branch is solvable
+    """
+    valid = (valid[:, None] & is_valid).ravel()
+    if isinstance(values, tuple):
+        return tuple(np.repeat(value, 2) for value in values), valid
+    return np.repeat(values, 2), valid
+
+
+def _transform_points(h_mats, p):
+    return np.dot(h_mats[..., :3, :3], p) + h_mats[..., :3, 3]
+
+
+def _get_perpendicular(w):
+    """
+    Returns unit vector perpendicular to w
+    """
+    v = np.cross(w, np.eye(3)[np.argmin(np.abs(w))])
+    return v / np.linalg.norm(v)
+
+
+def _project(w, u):
+    """
+    Returns projections of vectors u onto the plane perpendicular to w
+    """
+    return u - np.multiply.outer(np.dot(u, w), w)
+
+
+def _subproblem_1(w, u, v):
+    """
+    Returns thetas which rotate vectors u about axis w onto vectors v
+    """
+    u_p, v_p = _project(w, u), _project(w, v)
+    return np.arctan2(np.dot(np.cross(u_p, v_p), w), np.sum(u_p * v_p, axis=-1))
+
+
+def _subproblem_2(w1, w2, r, p, q, tol=1e-9):
+    """
+    Returns (theta1, theta2) which satisfy e^(w1 theta1) e^(w2 theta2) p = q
+    for two axes intersecting at r (nearest ones if q is out of reach within tol)
+
+    Returns:
+        theta1 (np.array(N, 2)), theta2 (np.array(N, 2)), is_valid (np.array(N, 2))
+    """
+    u, v = np.broadcast_arrays(np.atleast_2d(p - r), np.atleast_2d(q - r))
+    w12 = np.dot(w1, w2)
+    alpha = (w12 * np.dot(u, w2) - np.dot(v, w1)) / (w12**2 - 1)
+    beta = (w12 * np.dot(v, w1) - np.dot(u, w2)) / (w12**2 - 1)
+    n = np.cross(w1, w2)
+    uu = np.sum(u * u, axis=-1)
+    gamma_squared = (uu - alpha**2 - beta**2 - 2 * alpha * beta * w12) / np.dot(n, n)
+    gamma = np.sqrt(np.maximum(gamma_squared, 0.0))
+
+    gamma = np.stack([gamma, -gamma], axis=-1)[..., None]
+    z = (alpha[:, None] * w1 + beta[:, None] * w2)[:, None] + gamma * n
+    theta2 = _subproblem_1(w2, u[:, None], z)
+    theta1 = _subproblem_1(w1, z, v[:, None])
+    is_valid = np.repeat((gamma_squared >= -tol * uu)[:, None], 2, axis=-1)
+    return theta1, theta2, is_valid
+
+
+def _subproblem_3(w, r, p, q, delta, tol=1e-9):
+    """
+    Returns thetas which satisfy ||e^(w theta) p - q|| = delta for axis w through r
+    (nearest ones if delta is out of reach within tol)
+
+    Returns:
+        thetas (np.array(N, 2)), is_valid (np.array(N, 2))
+    """
+    delta = np.atleast_1d(delta)
+    u_p, v_p = _project(w, p - r), _project(w, q - r)
+    delta_p_squared = delta**2 - np.dot(p - q, w) ** 2
+    theta0 = np.arctan2(np.dot(np.cross(u_p, v_p), w), np.dot(u_p, v_p))
+    norm = 2 * np.linalg.norm(u_p) * np.linalg.norm(v_p)
+    cos_phi = (np.dot(u_p, u_p) + np.dot(v_p, v_p) - delta_p_squared) / max(norm, 1e-12)
+    phi = np.arccos(np.clip(cos_phi, -1.0, 1.0))
+    thetas = theta0 + np.stack([phi, -phi], axis=-1)
+    is_valid = (norm > 1e-12) & (np.abs(cos_phi) <= 1 + tol)
+    return thetas, np.repeat(is_valid[:, None], 2, axis=-1)
+
+
+def _subproblem_4(w, a, b, c, tol=1e-9):
+    """
+    Returns thetas which satisfy dot(a, e^(w theta) b) = c for rotation about axis w
+    (nearest ones if c is out of reach within tol)
+
+    Returns:
+        thetas (np.array(N, 2)), is_valid (np.array(N, 2))
+    """
+    a, c = np.atleast_2d(a), np.atleast_1d(c)
+    b_parallel = w * np.dot(w, b)
+    b_perpendicular = b - b_parallel
+    A = np.dot(a, b_perpendicular)
+    B = np.dot(a, np.cross(w, b_perpendicular))
+    C = c - np.dot(a, b_parallel)
+    norm = np.hypot(A, B)
+    phi = np.arccos(np.clip(C / np.maximum(norm, 1e-12), -1.0, 1.0))
+    thetas = np.arctan2(B, A)[:, None] + np.stack([phi, -phi], axis=-1)
+    is_valid = (norm > 1e-12) & (np.abs(C) <= norm * (1 + tol))
+    return thetas, np.repeat(is_valid[:, None], 2, axis=-1)
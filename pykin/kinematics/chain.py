@@ -0,0 +1,507 @@
+import numpy as np
+
+from pykin.kinematics import jacobian as jac
+from pykin.kinematics.transform import Transform
+
+
+class CompiledChain:
+    """
+    Class of CompiledChain
+    Flattens robot's frames once into contiguous index arrays
+    so that fk and jacobian are evaluated by integer index
+
+    Args:
+        frames (list or Frame()): robot's frame (desired frames or root frame)
+        joint_names (list): joint names mapped to the columns of thetas (only used with root frame)
+        offset (Transform): robot's offset
+    """
+
+    FIXED = 0
+    REVOLUTE = 1
+    PRISMATIC = 2
+
+    JOINT_TYPES = {"fixed": FIXED, "revolute": REVOLUTE, "prismatic": PRISMATIC}
+
+    def __init__(self, frames, joint_names=None, offset=None):
+        if offset is None:
+            offset = Transform()
+
+        self.link_names = []
+        self.joint_names = []
+        self._parents = []
+        self._joint_types = []
+        self._axes = []
+        self._offsets = []
+        self._theta_indices = []
+        self._limits = {}
+
+        if isinstance(frames, list):
+            self.dof = self._compile_frames(frames)
+        else:
+            if joint_names is None:
+                joint_names = []
+            self._compile_frame_recursive(frames, -1, list(joint_names))
+            self.dof = len(joint_names)
+
+        self.base = offset.h_mat
+        self.parents = np.array(self._parents, dtype=np.int64)
+        self.joint_types = np.array(self._joint_types, dtype=np.int64)
+        self.axes = np.array(self._axes, dtype=np.float64).reshape(-1, 3)
+        self.offsets = np.array(self._offsets, dtype=np.float64).reshape(-1, 4, 4)
+        self.theta_indices = np.array(self._theta_indices, dtype=np.int64)
+        self.lower_limits, self.upper_limits = self._get_limits()
+        del (
+            self._parents,
+            self._joint_types,
+            self._axes,
+            self._offsets,
+            self._theta_indices,
+            self._limits,
+        )
+
+        self.num_links = len(self.link_names)
+        self.subtree_end = self._get_subtree_end()
+        self.link_index = {name: i for i, name in enumerate(self.link_names)}
+
+        self._setup_motion()
+
+    def __repr__(self):
+        return "pykin.kinematics.chain.{}()".format(type(self).__name__)
+
+    def _add_frame(self, frame, parent, theta_index):
+        """
+        Appends frame's link and joint into the chain
+
+        Args:
+            frame (Frame): frame to append
+            parent (int): index of parent link (-1 is robot's base)
+            theta_index (int): column of thetas (-1 if joint is not actuated)
+
+        Returns:
+            int: index of appended link
+        """
+        joint_type = self.JOINT_TYPES.get(frame.joint.dtype)
+        if joint_type is None:
+            raise ValueError("Unsupported joint type %s." % frame.joint.dtype)
+
+        axis = np.zeros(3)
+        if joint_type != self.FIXED:
+            axis = np.asarray(frame.joint.axis, dtype=np.float64)
+            if joint_type == self.REVOLUTE:
+                axis = axis / np.linalg.norm(axis)
+        else:
+            theta_index = -1
+
+        self.link_names.append(frame.link.name)
+        self.joint_names.append(frame.joint.name)
+        self._parents.append(parent)
+        self._joint_types.append(joint_type)
+        self._axes.append(axis)
+        self._offsets.append(frame.joint.offset.h_mat)
+        self._theta_indices.append(theta_index)
+        if theta_index >= 0:
+            self._limits[theta_index] = frame.joint.limit
+        return len(self.link_names) - 1
+
+    def _compile_frames(self, frames):
+        """
+        Compiles desired frames as serial chain
+
+        Args:
+            frames (list): desired frames
+
+        Returns:
+            int: number of actuated joints
+        """
+        cnt = 0
+        for frame in frames:
+            self._add_frame(frame, len(self.link_names) - 1, cnt)
+            if frame.joint.dtype != "fixed":
+                cnt += 1
+        return cnt
+
+    def _compile_frame_recursive(self, frame, parent, joint_names):
+        """
+        Compiles frame with all child frames in depth-first order
+
+        Args:
+            frame (Frame): current frame
+            parent (int): index of parent link
+            joint_names (list): joint names mapped to the columns of thetas
+        """
+        theta_index = -1
+        if frame.joint.name in joint_names:
+            theta_index = joint_names.index(frame.joint.name)
+        index = self._add_frame(frame, parent, theta_index)
+        for child in frame.children:
+            self._compile_frame_recursive(child, index, joint_names)
+
+    def _get_limits(self):
+        """
+        Returns joint limits of each theta column described in the urdf file
+
+        Returns:
+            lower_limits (np.array(dof,)): lower limits (-inf if not described)
+            upper_limits (np.array(dof,)): upper limits (inf if not described)
+        """
+        lower_limits = np.full(self.dof, -np.inf)
+        upper_limits = np.full(self.dof, np.inf)
+        for theta_index, (lower, upper) in self._limits.items():
+            if lower is not None:
+                lower_limits[theta_index] = lower
+            if upper is not None:
+                upper_limits[theta_index] = upper
+        return lower_limits, upper_limits
+
+    def _get_subtree_end(self):
+        """
+        Returns end index of each link's subtree.
+        Links are in depth-first order, so descendants of link i are i+1 ... subtree_end[i]-1
+
+        Returns:
+            np.array(num_links,): end index of subtree
+        """
+        subtree_end = np.arange(1, self.num_links + 1)
+        for i in reversed(range(self.num_links)):
+            parent = self.parents[i]
+            if parent >= 0:
+                subtree_end[parent] = max(subtree_end[parent], subtree_end[i])
+        return subtree_end
+
+    def _setup_motion(self):
+        """
+        Precomputes skew matrices of revolute axes and translation axes of prismatic joints
+        """
+        revolute = self.joint_types == self.REVOLUTE
+        prismatic = self.joint_types == self.PRISMATIC
+
+        x, y, z = self.axes.T
+        zero = np.zeros(self.num_links)
+        K = np.stack(
+            [
+                np.stack([zero, -z, y], axis=-1),
+                np.stack([z, zero, -x], axis=-1),
+                np.stack([-y, x, zero], axis=-1),
+            ],
+            axis=-2,
+        )
+        self.skew_axes = np.where(revolute[:, None, None], K, 0.0)
+        self.skew_axes_squared = np.matmul(self.skew_axes, self.skew_axes)
+        self.translation_axes = np.where(prismatic[:, None], self.axes, 0.0)
+
+        self.theta_columns = np.maximum(self.theta_indices, 0)
+        self.actuated_mask = (self.theta_indices >= 0).astype(np.float64)
+
+        self.revolute_mask = revolute
+        self.eef_path = self.get_path(self.num_links - 1)
+        self.eef_joint_indices = self.eef_path[self.theta_indices[self.eef_path] >= 0]
+        self._eef_path_is_joint = [
+            bool(self.theta_indices[i] >= 0) for i in self.eef_path
+        ]
+
+    def get_path(self, link_index):
+        """
+        Returns indices of links from the root to the given link
+
+        Args:
+            link_index (int): index of link
+
+        Returns:
+            np.array: indices of links
+        """
+        path = []
+        link_index = int(link_index) % self.num_links
+        while link_index >= 0:
+            path.append(link_index)
+            link_index = self.parents[link_index]
+        return np.array(path[::-1], dtype=np.int64)
+
+    def get_link_thetas(self, thetas, links=slice(None)):
+        """
+        Returns joint angle of each link
+
+        Args:
+            thetas (np.array(..., dof)): input joint angles
+            links (slice or np.array): indices of links
+
+        Returns:
+            np.array(..., num_links): joint angles (0 for not actuated joints)
+        """
+        thetas = np.asarray(thetas, dtype=np.float64)
+        return (
+            np.take(thetas, self.theta_columns[links], axis=-1)
+            * self.actuated_mask[links]
+        )
+
+    def get_local_h_mats(self, thetas, links=slice(None)):
+        """
+        Returns homogeneous matrices of each link with respect to its parent
+
+        Args:
+            thetas (np.array(..., dof)): input joint angles
+            links (slice or np.array): indices of links
+
+        Returns:
+            np.array(..., num_links, 4, 4): local homogeneous matrices
+        """
+        q = self.get_link_thetas(thetas, links)
+        motion = np.zeros(q.shape + (4, 4))
+        s = np.sin(q)[..., None, None]
+        v = (1.0 - np.cos(q))[..., None, None]
+        motion[..., :3, :3] = (
+            np.identity(3)
+            + s * self.skew_axes[links]
+            + v * self.skew_axes_squared[links]
+        )
+        motion[..., :3, 3] = q[..., None] * self.translation_axes[links]
+        motion[..., 3, 3] = 1.0
+        return np.matmul(self.offsets[links], motion)
+
+    def forward_kinematics(self, thetas):
+        """
+        Returns homogeneous matrices of all links
+
+        Args:
+            thetas (np.array(dof,) or np.array(N, dof)): input joint angles
+
+        Returns:
+            np.array(num_links, 4, 4) or np.array(N, num_links, 4, 4): link poses
+        """
+        local = self.get_local_h_mats(thetas)
+        poses = np.empty_like(local)
+        for i, parent in enumerate(self.parents):
+            if parent < 0:
+                np.matmul(self.base, local[..., i, :, :], out=poses[..., i, :, :])
+            else:
+                np.matmul(
+                    poses[..., parent, :, :],
+                    local[..., i, :, :],
+                    out=poses[..., i, :, :],
+                )
+        return poses
+
+    def forward_kinematics_batch(self, thetas):
+        """
+        Returns homogeneous matrices of all links for a batch of joint angles
+
+        Args:
+            thetas (np.array(N, dof)): input joint angles
+
+        Returns:
+            np.array(N, num_links, 4, 4): link poses
+        """
+        return self.forward_kinematics(np.atleast_2d(thetas))
+
+    def eef_pose(self, thetas):
+        """
+        Returns homogeneous matrix of end effector (last link)
+        without materializing the other link poses
+
+        Args:
+            thetas (np.array(dof,) or np.array(N, dof)): input joint angles
+
+        Returns:
+            np.array(4, 4) or np.array(N, 4, 4): end effector's pose
+        """
+        local = self.get_local_h_mats(thetas, self.eef_path)
+        pose = self.base
+        for i in range(local.shape[-3]):
+            pose = np.matmul(pose, local[..., i, :, :])
+        return pose
+
+    def joint_frames(self, thetas):
+        """
+        Returns only the joint frames needed to compute jacobian of end effector (last link)
+
+        Args:
+            thetas (np.array(dof,) or np.array(N, dof)): input joint angles
+
+        Returns:
+            joint_h_mats (np.array(..., n_joints, 4, 4)): poses of actuated joints from root to end effector
+            eef_pose (np.array(..., 4, 4)): end effector's pose
+        """
+        local = self.get_local_h_mats(thetas, self.eef_path)
+        joint_h_mats = np.empty(local.shape[:-3] + (len(self.eef_joint_indices), 4, 4))
+        pose = self.base
+        cnt = 0
+        for i, is_joint in enumerate(self._eef_path_is_joint):
+            pose = np.matmul(pose, local[..., i, :, :])
+            if is_joint:
+                joint_h_mats[..., cnt, :, :] = pose
+                cnt += 1
+        return joint_h_mats, pose
+
+    def jacobian(self, poses, eef_index=-1, point=None):
+        """
+        Returns jacobian from link poses computed by forward_kinematics
+
+        Args:
+            poses (np.array(..., num_links, 4, 4)): link poses
+            eef_index (int): index of end effector's link
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian (np.array(..., 6, dof)): return Jacobian
+        """
+        if eef_index in (-1, self.num_links - 1):
+            joint_indices = self.eef_joint_indices
+        else:
+            path = self.get_path(eef_index)
+            joint_indices = path[self.theta_indices[path] >= 0]
+        return self._get_jacobian(
+            poses[..., joint_indices, :, :],
+            joint_indices,
+            self._get_reference_position(poses[..., eef_index, :, :], point),
+        )
+
+    def jacobian_batch(self, thetas, point=None):
+        """
+        Returns jacobians of end effector (last link) for a batch of joint angles
+
+        Args:
+            thetas (np.array(N, dof)): input joint angles
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian (np.array(N, 6, dof)): return Jacobians
+        """
+        joint_h_mats, eef_pose = self.joint_frames(np.atleast_2d(thetas))
+        return self.jacobian_from_joint_frames(joint_h_mats, eef_pose, point)
+
+    def jacobian_from_joint_frames(self, joint_h_mats, eef_pose, point=None):
+        """
+        Returns jacobian of end effector from joint frames computed by joint_frames
+
+        Args:
+            joint_h_mats (np.array(..., n_joints, 4, 4)): poses of actuated joints
+            eef_pose (np.array(..., 4, 4)): end effector's pose
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian (np.array(..., 6, dof)): return Jacobian
+        """
+        return self._get_jacobian(
+            joint_h_mats,
+            self.eef_joint_indices,
+            self._get_reference_position(eef_pose, point),
+        )
+
+    @staticmethod
+    def _get_reference_position(eef_pose, point=None):
+        """
+        Returns position of reference point on end effector
+
+        Args:
+            eef_pose (np.array(..., 4, 4)): end effector's pose
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            np.array(..., 3): position of reference point
+        """
+        if point is None:
+            return eef_pose[..., :3, 3]
+        return np.matmul(eef_pose[..., :3, :3], point) + eef_pose[..., :3, 3]
+
+    def hessian(self, thetas, point=None):
+        """
+        Returns kinematic hessian of end effector (last link) from one fk pass
+
+        Args:
+            thetas (np.array(..., dof)): input joint angles
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Hessian (np.array(..., dof, 6, dof)): return Hessian, H[..., j, :, i] is derivative of J[..., :, i] with respect to q[j]
+        """
+        J = self._get_eef_jacobian(thetas, point)
+        H = self._scatter_columns(jac.calc_hessian_batch(J), self.eef_joint_indices)
+        if self._has_ordered_columns(self.eef_joint_indices):
+            return H
+        H_full = np.zeros(H.shape[:-3] + (self.dof,) + H.shape[-2:])
+        H_full[..., self.theta_indices[self.eef_joint_indices], :, :] = H
+        return H_full
+
+    def jacobian_dot(self, thetas, dthetas, point=None):
+        """
+        Returns time derivative of jacobian of end effector (last link) from one fk pass
+
+        Args:
+            thetas (np.array(..., dof)): input joint angles
+            dthetas (np.array(..., dof)): input joint velocities
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian_dot (np.array(..., 6, dof)): return time derivative of Jacobian
+        """
+        J = self._get_eef_jacobian(thetas, point)
+        dthetas = np.take(
+            np.asarray(dthetas, dtype=np.float64),
+            self.theta_indices[self.eef_joint_indices],
+            axis=-1,
+        )
+        return self._scatter_columns(
+            jac.calc_jacobian_dot_batch(J, dthetas), self.eef_joint_indices
+        )
+
+    def _get_eef_jacobian(self, thetas, point=None):
+        """
+        Returns jacobian columns of actuated joints ordered from root to end effector
+
+        Args:
+            thetas (np.array(..., dof)): input joint angles
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian (np.array(..., 6, n_joints)): return Jacobian
+        """
+        joint_h_mats, eef_pose = self.joint_frames(thetas)
+        return jac.calc_jacobian_batch(
+            joint_h_mats,
+            self.axes[self.eef_joint_indices],
+            self.revolute_mask[self.eef_joint_indices],
+            self._get_reference_position(eef_pose, point),
+        )
+
+    def _get_jacobian(self, joint_h_mats, joint_indices, eef_position):
+        """
+        Places jacobian columns of actuated joints at their theta columns
+
+        Args:
+            joint_h_mats (np.array(..., n_joints, 4, 4)): poses of actuated joints
+            joint_indices (np.array(n_joints,)): link indices of actuated joints
+            eef_position (np.array(..., 3)): position of reference point
+
+        Returns:
+            Jacobian (np.array(..., 6, dof)): return Jacobian
+        """
+        J = jac.calc_jacobian_batch(
+            joint_h_mats,
+            self.axes[joint_indices],
+            self.revolute_mask[joint_indices],
+            eef_position,
+        )
+        return self._scatter_columns(J, joint_indices)
+
+    def _has_ordered_columns(self, joint_indices):
+        """
+        Returns True if actuated joints are mapped to theta columns 0 ... dof-1 in order
+        """
+        columns = self.theta_indices[joint_indices]
+        return len(columns) == self.dof and np.all(columns == np.arange(self.dof))
+
+    def _scatter_columns(self, J, joint_indices):
+        """
+        Places last axis of J, ordered as joint_indices, at the theta columns
+
+        Args:
+            J (np.array(..., n_joints)): values of actuated joints
+            joint_indices (np.array(n_joints,)): link indices of actuated joints
+
+        Returns:
+            np.array(..., dof): values placed at the theta columns
+        """
+        if self._has_ordered_columns(joint_indices):
+            return J
+        J_full = np.zeros(J.shape[:-1] + (self.dof,))
+        J_full[..., self.theta_indices[joint_indices]] = J
+        return J_full
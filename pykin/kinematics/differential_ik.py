@@ -0,0 +1,143 @@
+import numpy as np
+
+from pykin.kinematics.ik_solver import IKSolver
+
+
+class DifferentialIK(IKSolver):
+    """
+    Class of DifferentialIK
+    Velocity level inverse kinematics for servo loops.
+    Each tick maps a twist of the end effector to joint velocities with damped least squares,
+    qdot = J^T * (J * J^T + damping^2 * I)^-1 * twist.
+    Joints which would cross a limit within the tick are removed from the jacobian
+    and the twist is solved again, then velocities are clipped to the limits and scaled
+    down uniformly to velocity limits, so the direction of motion is kept.
+    Joint frames and jacobian (same as calc_jacobian) are updated once per tick in the
+    preallocated buffers of IKSolver, so a tick costs at most two 6x6 solves
+
+    Args:
+        chain (CompiledChain): compiled chain
+        thetas (sequence of float): initial joint angles (default: zeros)
+        damping (float): damping of least squares near singularities
+        velocity_limits (float or np.array(dof,)): positive maximum joint velocities (default: inf)
+    """
+
+    def __init__(self, chain, thetas=None, damping=1e-2, velocity_limits=None):
+        super().__init__(chain)
+        dof = chain.dof
+        self.damping = damping
+        if velocity_limits is None:
+            velocity_limits = np.inf
+        self.velocity_limits = np.array(
+            np.broadcast_to(velocity_limits, (dof,)), dtype=np.float64
+        )
+        if not np.all(self.velocity_limits > 0):
+            raise ValueError(
+                "Velocity limits must be positive, instead got: {}".format(
+                    self.velocity_limits
+                )
+            )
+        self.joint_velocities = np.zeros(dof)
+
+        self._JJt = np.zeros((6, 6))
+        self._J_blocked = np.zeros((6, dof))
+        self._next_thetas = np.zeros(dof)
+        self._min_velocities = np.zeros(dof)
+        self._max_velocities = np.zeros(dof)
+
+        self.reset(np.zeros(dof) if thetas is None else thetas)
+
+    def __repr__(self):
+        return "pykin.kinematics.differential_ik.{}()".format(type(self).__name__)
+
+    @property
+    def thetas(self):
+        """
+        Current joint angles
+        """
+        return self._thetas.copy()
+
+    @property
+    def eef_pose(self):
+        """
+        Current end effector's pose (np.array(4, 4))
+        """
+        return self._poses[-1].copy()
+
+    def reset(self, thetas):
+        """
+        Sets current joint angles and computes joint frames and jacobian
+
+        Args:
+            thetas (sequence of float): joint angles
+        """
+        self._thetas[:] = thetas
+        self.joint_velocities[:] = 0.0
+        self._update_joint_frames(self._thetas)
+        self._update_jacobian()
+
+    def get_joint_velocities(self, twist, dt):
+        """
+        Returns joint velocities realizing twist within joint limits without moving
+
+        Args:
+            twist (np.array(6,)): linear and angular velocity of end effector described in base frame
+            dt (float): duration of tick [sec]
+
+        Returns:
+            joint_velocities (np.array(dof,)): joint velocities
+        """
+        twist = np.asarray(twist, dtype=np.float64)
+        thetas = self._thetas
+        qdot = self._solve_damped_least_squares(self.J, twist)
+
+        # joints which would cross a limit are fixed
+        np.multiply(qdot, dt, out=self._next_thetas)
+        self._next_thetas += thetas
+        np.logical_or(
+            self._next_thetas < self._lower,
+            self._next_thetas > self._upper,
+            out=self._is_blocked,
+        )
+        if np.any(self._is_blocked):
+            np.copyto(self._J_blocked, self.J)
+            self._J_blocked[:, self._is_blocked] = 0.0
+            qdot = self._solve_damped_least_squares(self._J_blocked, twist)
+
+        np.subtract(self._lower, thetas, out=self._min_velocities)
+        np.subtract(self._upper, thetas, out=self._max_velocities)
+        self._min_velocities /= dt
+        self._max_velocities /= dt
+        np.clip(qdot, self._min_velocities, self._max_velocities, out=qdot)
+
+        ratio = np.max(np.abs(qdot) / self.velocity_limits)
+        if ratio > 1.0:
+            qdot /= ratio
+        return qdot
+
+    def step(self, twist, dt):
+        """
+        Moves joints by the velocities realizing twist for one tick
+        and updates joint frames and jacobian
+
+        Args:
+            twist (np.array(6,)): linear and angular velocity of end effector described in base frame
+            dt (float): duration of tick [sec]
+
+        Returns:
+            thetas (np.array(dof,)): joint angles after tick
+        """
+        self.joint_velocities[:] = self.get_joint_velocities(twist, dt)
+        np.multiply(self.joint_velocities, dt, out=self._next_thetas)
+        self._thetas += self._next_thetas
+        self._update_joint_frames(self._thetas)
+        self._update_jacobian()
+        return self._thetas.copy()
+
+    def _solve_damped_least_squares(self, J, twist):
+        """
+        Returns J^T * (J * J^T + damping^2 * I)^-1 * twist
+        """
+        np.matmul(J, J.T, out=self._JJt)
+        self._JJt.reshape(-1)[::7] += self.damping**2
+        return np.dot(J.T, np.linalg.solve(self._JJt, twist))
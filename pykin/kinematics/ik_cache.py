@@ -0,0 +1,167 @@
+import numpy as np
+
+from pykin.utils import transform_utils as t_utils
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+class IKSeedCache:
+    """
+    Class of IKSeedCache
+    Stores solved (end effector pose, joint angles) pairs and returns the joints
+    of the nearest stored poses as seeds of inverse kinematics.
+    Poses are embedded as [position, rotation_weight * rotation matrix],
+    so euclidean distance combines position error and chordal rotation error.
+    Nearest neighbours are searched with scipy's cKDTree if installed (brute force otherwise),
+    and the least recently used entry is evicted when the cache is full
+
+    Args:
+        dof (int): size of joint space
+        capacity (int): maximum number of stored solutions
+        rotation_weight (float): weight of rotation [m] in pose distance
+    """
+
+    def __init__(self, dof, capacity=10000, rotation_weight=0.1):
+        self.dof = dof
+        self.capacity = capacity
+        self.rotation_weight = rotation_weight
+
+        self._embeddings = np.zeros((capacity, 12))
+        self._joints = np.zeros((capacity, dof))
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._tick = 0
+
+        # entries changed since the tree was built are searched by brute force
+        self._tree = None
+        self._tree_size = 0
+        self._is_dirty = np.zeros(capacity, dtype=bool)
+
+    def __repr__(self):
+        return "pykin.kinematics.ik_cache.{}()".format(type(self).__name__)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, pose, joints):
+        """
+        Stores joint angles solving pose
+
+        Args:
+            pose (np.array): end effector's pose (pose(7,), pose(6,) or h_mat(4, 4))
+            joints (sequence of float): joint angles
+        """
+        if self._size < self.capacity:
+            index = self._size
+            self._size += 1
+        else:
+            index = int(np.argmin(self._last_used))
+
+        self._tick += 1
+        self._embeddings[index] = self._embed(pose)
+        self._joints[index] = joints
+        self._last_used[index] = self._tick
+        self._is_dirty[index] = True
+
+    def query(self, pose, k=1):
+        """
+        Returns joint angles of nearest stored poses
+
+        Args:
+            pose (np.array): end effector's pose (pose(7,), pose(6,) or h_mat(4, 4))
+            k (int): number of seeds
+
+        Returns:
+            seeds (np.array(k, dof)): joint angles ordered from the nearest (less than k if cache is small)
+            distances (np.array(k,)): pose distances
+        """
+        k = min(k, self._size)
+        if k == 0:
+            return np.zeros((0, self.dof)), np.zeros(0)
+
+        embedding = self._embed(pose)
+        if cKDTree is not None:
+            dirty = np.flatnonzero(self._is_dirty[: self._size])
+            if len(dirty) > max(64, np.sqrt(self._size)):
+                self._build_tree()
+                dirty = dirty[:0]
+        else:
+            dirty = np.arange(self._size)
+
+        indices = dirty
+        if self._tree is not None and cKDTree is not None:
+            n_query = min(k + len(dirty), self._tree_size)
+            _, tree_indices = self._tree.query(embedding, n_query)
+            tree_indices = np.atleast_1d(tree_indices)
+            tree_indices = tree_indices[~self._is_dirty[tree_indices]]
+            indices = np.concatenate((tree_indices, dirty))
+
+        distances = np.linalg.norm(self._embeddings[indices] - embedding, axis=-1)
+        nearest = np.argsort(distances)[:k]
+        indices = indices[nearest]
+
+        self._tick += 1
+        self._last_used[indices] = self._tick
+        return self._joints[indices].copy(), distances[nearest]
+
+    def save(self, file_path):
+        """
+        Saves stored solutions to npz file
+
+        Args:
+            file_path (str): path to the npz file
+        """
+        np.savez(
+            file_path,
+            embeddings=self._embeddings[: self._size],
+            joints=self._joints[: self._size],
+            last_used=self._last_used[: self._size],
+            rotation_weight=self.rotation_weight,
+        )
+
+    @classmethod
+    def load(cls, file_path, capacity=None):
+        """
+        Loads stored solutions from npz file
+
+        Args:
+            file_path (str): path to the npz file
+            capacity (int): maximum number of stored solutions (default: max(10000, number of saved solutions))
+
+        Returns:
+            IKSeedCache: cache with loaded solutions
+        """
+        data = np.load(file_path)
+        joints = data["joints"]
+        if capacity is None:
+            capacity = max(10000, len(joints))
+
+        # keep the most recently used solutions if capacity is smaller
+        order = np.argsort(data["last_used"])[-capacity:]
+        cache = cls(joints.shape[-1], capacity, float(data["rotation_weight"]))
+        cache._size = len(order)
+        cache._embeddings[: cache._size] = data["embeddings"][order]
+        cache._joints[: cache._size] = joints[order]
+        cache._last_used[: cache._size] = np.arange(1, cache._size + 1)
+        cache._tick = cache._size
+        cache._is_dirty[: cache._size] = True
+        return cache
+
+    def _embed(self, pose):
+        """
+        Returns embedding [position, rotation_weight * rotation matrix] of pose
+        """
+        pose = np.asarray(pose, dtype=np.float64)
+        if pose.shape != (4, 4):
+            pose = t_utils.get_h_mat(pose[:3], pose[3:])
+        return np.concatenate(
+            (pose[:3, 3], self.rotation_weight * pose[:3, :3].reshape(-1))
+        )
+
+    def _build_tree(self):
+        self._tree = cKDTree(self._embeddings[: self._size])
+        self._tree_size = self._size
+        self._is_dirty[:] = False
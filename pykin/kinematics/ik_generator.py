@@ -0,0 +1,293 @@
+import os
+import hashlib
+import inspect
+import importlib.util
+import numpy as np
+
+from pykin.kinematics import analytic_ik
+from pykin.kinematics.chain import CompiledChain
+from pykin.models.urdf_model import URDFModel
+from pykin.utils.error_utils import NotFoundError
+
+GENERATOR_VERSION = 2
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pykin", "ik")
+
+# numpy-only functions of analytic_ik copied into every generated module
+_HELPERS = [
+    analytic_ik._fix_joint,
+    analytic_ik._refine,
+    analytic_ik._forward_kinematics,
+    analytic_ik._get_pose_error,
+    analytic_ik._get_unique_solutions,
+    analytic_ik._exp,
+    analytic_ik._inverse,
+    analytic_ik._is_parallel,
+    analytic_ik._get_distance_to_line,
+    analytic_ik._get_intersection,
+    analytic_ik._branch,
+    analytic_ik._transform_points,
+    analytic_ik._get_perpendicular,
+    analytic_ik._project,
+    analytic_ik._subproblem_1,
+    analytic_ik._subproblem_2,
+    analytic_ik._subproblem_3,
+    analytic_ik._subproblem_4,
+]
+
+# free angles at which geometry of the remaining joints is checked
+_CHECK_ANGLES = [0.0, 1.0, 2.5]
+
+_HEADER = '''"""
+Inverse kinematics of {robot_name} from {base_name} to {eef_name} ({closed_form})
+Generated by pykin.kinematics.ik_generator from {urdf_name} (sha256: {urdf_hash})
+Do not edit, this file is generated again when the urdf file changes
+"""
+import numpy as np
+
+DOF = {dof}
+FREE_JOINT = {free_joint}
+JOINT_NAMES = {joint_names}
+AXES = np.array({axes})
+POINTS = np.array({points})
+M = np.array({M})
+TOL = {tol}
+EPS = {eps}
+REFINE_TOL = {refine_tol}
+MAX_REFINE = {max_refine}
+
+
+def solve(target_pose, free_angle=0.0):
+    """
+    Returns all solution branches
+
+    Args:
+        target_pose (np.array): goal pose to achieve described in base frame (pose(7,) or h_mat(4, 4))
+        free_angle (float): angle of free joint (ignored if FREE_JOINT is None)
+
+    Returns:
+        joints (np.array(n_solutions, DOF)): joint angles wrapped to [-pi, pi]
+    """
+    target_pose = np.asarray(target_pose, dtype=np.float64)
+    if target_pose.shape != (4, 4):
+        target_pose = _get_h_mat(target_pose)
+
+    axes, points, zero_pose = AXES, POINTS, M
+    if FREE_JOINT is not None:
+        axes, points, zero_pose = _fix_joint(AXES, POINTS, M, FREE_JOINT, free_angle)
+    key_points = {get_key_points}(axes, points, TOL)
+    solutions = {solve_closed_form}(
+        np.dot(target_pose, _inverse(zero_pose)), axes, points, *key_points, TOL
+    )
+    solutions, errors, _ = _refine(
+        axes, points, zero_pose, solutions, target_pose, REFINE_TOL, MAX_REFINE
+    )
+    solutions = _get_unique_solutions(solutions[errors < EPS])
+
+    if FREE_JOINT is not None:
+        free_angle = (free_angle + np.pi) % (2 * np.pi) - np.pi
+        solutions = np.insert(solutions, FREE_JOINT, free_angle, axis=1)
+    return solutions
+
+
+def _get_h_mat(pose):
+    """
+    Returns homogeneous matrix of position and quaternion (wxyz)
+    """
+    w, x, y, z = pose[3:] / np.linalg.norm(pose[3:])
+    h_mat = np.identity(4)
+    h_mat[:3, :3] = [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ]
+    h_mat[:3, 3] = pose[:3]
+    return h_mat
+'''
+
+_modules = {}
+
+
+def generate_ik_source(
+    urdf_model, base_name, eef_name, free_joint=None, tol=1e-3, eps=1e-6
+):
+    """
+    Returns source of a standalone numpy module solving inverse kinematics of a chain.
+    Joint axes are read from the urdf at zero configuration and matched against
+    the closed forms of analytic_ik, whose code is emitted with the chain's constants.
+    A 7-dof chain is reduced to 6 joints by fixing a free joint,
+    which becomes a parameter of the generated solve function
+
+    Args:
+        urdf_model (URDFModel): urdf model (or robot)
+        base_name (str): reference link name ("" for root)
+        eef_name (str): end effector name
+        free_joint (str): name of free joint of 7-dof chain (default: first one that fits)
+        tol (float): tolerance of geometric checks
+        eps (float): tolerance of pose error of returned solutions
+
+    Returns:
+        str: source of module
+    """
+    chain = _get_chain(urdf_model, base_name, eef_name)
+    axes, points, M = analytic_ik._get_zero_configuration(chain)
+    joint_names = [chain.joint_names[i] for i in chain.eef_joint_indices]
+
+    if len(joint_names) == 6:
+        if free_joint is not None:
+            raise ValueError("6-dof chain has no free joint")
+        candidates = [None]
+    elif len(joint_names) == 7:
+        if free_joint is None:
+            # joints near the middle of the chain first, like the elbow of S-R-S arms
+            candidates = sorted(range(7), key=lambda i: abs(i - 3))
+        elif free_joint in joint_names:
+            candidates = [joint_names.index(free_joint)]
+        else:
+            raise NotFoundError(free_joint)
+    else:
+        raise ValueError(
+            "IK generator needs 6 or 7 revolute joints, instead got: {}".format(
+                len(joint_names)
+            )
+        )
+
+    for free_index in candidates:
+        closed_form = _find_closed_form(axes, points, M, free_index, tol)
+        if closed_form is not None:
+            break
+    else:
+        raise ValueError(
+            "No closed form fits the chain from {} to {}".format(base_name, eef_name)
+        )
+
+    get_key_points, solve_closed_form = analytic_ik.CLOSED_FORMS[closed_form]
+    source = _HEADER.format(
+        robot_name=urdf_model.robot_name,
+        base_name=base_name,
+        eef_name=eef_name,
+        closed_form=closed_form,
+        urdf_name=os.path.basename(urdf_model.file_path),
+        urdf_hash=_get_urdf_hash(urdf_model),
+        dof=len(joint_names),
+        free_joint=free_index,
+        joint_names=repr(joint_names),
+        axes=repr(axes.tolist()),
+        points=repr(points.tolist()),
+        M=repr(M.tolist()),
+        tol=repr(tol),
+        eps=repr(eps),
+        refine_tol=repr(analytic_ik.AnalyticIK.REFINE_TOL),
+        max_refine=repr(analytic_ik.AnalyticIK.MAX_REFINE),
+        get_key_points=get_key_points.__name__,
+        solve_closed_form=solve_closed_form.__name__,
+    )
+    for function in [get_key_points, solve_closed_form] + _HELPERS:
+        source += "\n\n" + inspect.getsource(function)
+    _check_source(source)
+    return source
+
+
+def _check_source(source):
+    """
+    Runs generated source and solves the pose at zero configuration,
+    so a module whose helpers do not fit the template is never written to the cache
+
+    Args:
+        source (str): source of module
+    """
+    namespace = {}
+    exec(compile(source, "<generated ik>", "exec"), namespace)
+    namespace["solve"](namespace["M"])
+
+
+def generate_ik_module(
+    urdf_model, base_name, eef_name, free_joint=None, cache_dir=None
+):
+    """
+    Returns generated inverse kinematics module of a chain.
+    Modules are cached on disk by hash of urdf file and chain,
+    so they are generated only once
+
+    Args:
+        urdf_model (URDFModel): urdf model (or robot)
+        base_name (str): reference link name ("" for root)
+        eef_name (str): end effector name
+        free_joint (str): name of free joint of 7-dof chain (default: first one that fits)
+        cache_dir (str): directory of generated modules (default: ~/.cache/pykin/ik)
+
+    Returns:
+        module: module with solve(target_pose, free_angle=0.0)
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+
+    key = hashlib.sha256(
+        "{}|{}|{}|{}|{}".format(
+            _get_urdf_hash(urdf_model),
+            base_name,
+            eef_name,
+            free_joint,
+            GENERATOR_VERSION,
+        ).encode()
+    ).hexdigest()[:16]
+    module_name = "{}_ik_{}".format(urdf_model.robot_name, key)
+    file_path = os.path.join(cache_dir, module_name + ".py")
+
+    module = _modules.get(file_path)
+    if module is not None:
+        return module
+
+    if not os.path.isfile(file_path):
+        source = generate_ik_source(urdf_model, base_name, eef_name, free_joint)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+        with open(tmp_path, "w") as f:
+            f.write(source)
+        os.replace(tmp_path, file_path)
+
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _modules[file_path] = module
+    return module
+
+
+def _get_chain(urdf_model, base_name, eef_name):
+    """
+    Returns compiled chain from base link to end effector without robot's offset
+    """
+    if base_name:
+        base_frame = urdf_model.find_frame(base_name + "_frame")
+        if base_frame is None:
+            raise NotFoundError(base_name)
+    else:
+        base_frame = urdf_model.root
+    frames = URDFModel.generate_desired_frame_recursive(base_frame, eef_name)
+    if frames is None:
+        raise NotFoundError(eef_name)
+    return CompiledChain(frames)
+
+
+def _find_closed_form(axes, points, M, free_index, tol):
+    """
+    Returns name of closed form which fits the joints except free joint at every checked angle
+    (None if no closed form fits)
+    """
+    for name, (get_key_points, _) in analytic_ik.CLOSED_FORMS.items():
+        try:
+            if free_index is None:
+                get_key_points(axes, points, tol)
+            for angle in _CHECK_ANGLES if free_index is not None else []:
+                reduced_axes, reduced_points, _ = analytic_ik._fix_joint(
+                    axes, points, M, free_index, angle
+                )
+                get_key_points(reduced_axes, reduced_points, tol)
+        except ValueError:
+            continue
+        return name
+    return None
+
+
+def _get_urdf_hash(urdf_model):
+    with open(urdf_model.file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
@@ -0,0 +1,28 @@
+class IKResult:
+    """
+    Class of IKResult
+    Result of one inverse kinematics solve
+
+    Args:
+        joints (np.array): target joint angles
+        method (str): method used to calculate IK
+        iterations (int): number of calculation iterations
+        error (float): weighted squared pose error of joints
+        converged (bool): whether the pose error is below tolerance of the method
+        wall_time (float): time spent solving [sec]
+    """
+
+    def __init__(self, joints, method, iterations, error, converged, wall_time=0.0):
+        self.joints = joints
+        self.method = method
+        self.iterations = iterations
+        self.error = error
+        self.converged = converged
+        self.wall_time = wall_time
+
+    def __repr__(self):
+        return (
+            f"IKResult(method={self.method}, iterations={self.iterations}, "
+            f"error={self.error:.3e}, converged={self.converged}, "
+            f"wall_time={self.wall_time:.6f})"
+        )
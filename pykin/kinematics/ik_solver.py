@@ -0,0 +1,858 @@
+import math
+import numpy as np
+
+from pykin.kinematics import jacobian as jac
+from pykin.utils import transform_utils as t_utils
+
+# Levi-Civita symbol to write cross products into preallocated buffers
+_LEVI_CIVITA = np.zeros((3, 3, 3))
+_LEVI_CIVITA[0, 1, 2] = _LEVI_CIVITA[1, 2, 0] = _LEVI_CIVITA[2, 0, 1] = 1.0
+_LEVI_CIVITA[0, 2, 1] = _LEVI_CIVITA[2, 1, 0] = _LEVI_CIVITA[1, 0, 2] = -1.0
+_IDENTITY = np.identity(3)
+
+
+class IKSolver:
+    """
+    Class of IKSolver
+    Levenberg-Marquardt inverse kinematics bound to a compiled chain.
+    Joint frames, jacobian, JtWJ, gradient and pose error are written into
+    buffers allocated once, so iterations do not create new arrays
+    except for the step returned by np.linalg.solve.
+    If bounded, iterates are kept within joint limits of the urdf file by projected LM:
+    joints at a limit whose step points outward are removed from the normal equations,
+    the step is clamped to the limits and halved until the pose error decreases.
+    If objectives are given, their gradients are projected into the null space of the
+    jacobian and added to every step, so redundant joints minimize them while the
+    pose error converges (see pykin.kinematics.null_space)
+
+    Args:
+        chain (CompiledChain): compiled chain
+        method (str): damping method (LM: lambda * I, LM2: lambda * diag(JtWJ))
+        eps (float): tolerance of weighted squared pose error
+        bounded (bool): keep joint angles within joint limits
+        joint_limits (tuple): lower and upper joint limits (default: limits of the urdf file)
+    """
+
+    METHODS = ["LM", "LM2"]
+    # weights of position and rotation errors
+    WEIGHTS = np.array([1 / 0.3] * 3 + [1 / (2 * np.pi)] * 3)
+    # damping factor is the weighted squared pose error plus DAMPING
+    DAMPING = 0.002
+    MAX_HALVINGS = 5
+    # weighted squared pose error which a null space step may leave behind
+    NULL_SPACE_TOL = 1e-8
+    # squared norm of null space step below which objectives are minimized,
+    # absolute or relative to the largest step of the solve
+    NULL_SPACE_EPS = 1e-8
+    NULL_SPACE_RTOL = 1e-3
+    NULL_SPACE_DAMPING = 1e-6
+    # scale of null space steps grows while successive steps point the same way
+    NULL_SPACE_GROWTH = 1.2
+    NULL_SPACE_MAX_SCALE = 16.0
+
+    def __init__(
+        self, chain, method="LM2", eps=1e-12, bounded=False, joint_limits=None
+    ):
+        if method not in self.METHODS:
+            raise NotImplementedError(
+                "Only {} are supported, instead got: {}".format(self.METHODS, method)
+            )
+        self.chain = chain
+        self.method = method
+        self.eps = eps
+        self.bounded = bounded
+        self.iterations = 0
+        self.error = np.inf
+
+        path = chain.eef_path
+        n_path = len(path)
+        is_joint = chain.theta_indices[path] >= 0
+        n_joints = int(np.count_nonzero(is_joint))
+        dof = chain.dof
+
+        self._joint_positions = np.flatnonzero(is_joint)
+        self._theta_columns = chain.theta_columns[path]
+        self._actuated_mask = chain.actuated_mask[path]
+        self._skew_axes = chain.skew_axes[path]
+        self._skew_axes_squared = chain.skew_axes_squared[path]
+        self._translation_axes = chain.translation_axes[path]
+        self._offsets = chain.offsets[path]
+
+        joints = chain.eef_joint_indices
+        self._revolute_axes = np.where(
+            chain.revolute_mask[joints, None], chain.axes[joints], 0.0
+        )
+        self._prismatic_axes = chain.translation_axes[joints]
+        self._columns = chain.theta_indices[joints]
+        self._is_ordered = n_joints == dof and np.all(self._columns == np.arange(dof))
+
+        self.We = self.WEIGHTS
+
+        # forward kinematics
+        self._q = np.zeros(n_path)
+        self._sin = np.zeros((n_path, 1, 1))
+        self._versine = np.zeros((n_path, 1, 1))
+        self._rot = np.zeros((n_path, 3, 3))
+        self._motion = np.tile(np.identity(4), (n_path, 1, 1))
+        self._local = np.zeros((n_path, 4, 4))
+        self._poses = np.zeros((n_path, 4, 4))
+        self._motion_rot = self._motion[:, :3, :3]
+        self._motion_pos = self._motion[:, :3, 3]
+        self._compose_views = [
+            (self._poses[i - 1], self._local[i], self._poses[i])
+            for i in range(1, n_path)
+        ]
+        if np.all(np.diff(self._joint_positions) == 1):
+            # joints are consecutive on the path, so their poses are a view
+            self._joint_h_mats = self._poses[
+                self._joint_positions[0] : self._joint_positions[-1] + 1
+            ]
+            self._joint_positions = None
+        else:
+            self._joint_h_mats = np.zeros((n_joints, 4, 4))
+
+        # jacobian
+        self._distance = np.zeros((n_joints, 3))
+        self._linear = np.zeros((3, n_joints))
+        self._J_joints = np.zeros((6, n_joints))
+        self.J = self._J_joints if self._is_ordered else np.zeros((6, dof))
+
+        # normal equations
+        self._WJ = np.zeros((6, dof))
+        self.JtWJ = np.zeros((dof, dof))
+        self._diagonal = self.JtWJ.reshape(-1)[:: dof + 1]
+        self._JtWJ_diagonal = np.zeros(dof)
+        self.gradient = np.zeros(dof)
+
+        # pose error
+        self._target = np.identity(4)
+        self.err = np.zeros(6)
+        self._weighted_err = np.zeros(6)
+        self._rot_err = np.zeros((3, 3))
+        self._el = np.zeros(3)
+
+        self._thetas = np.zeros(dof)
+
+        # joint limits
+        if joint_limits is None:
+            self._lower, self._upper = chain.lower_limits, chain.upper_limits
+        else:
+            self._lower, self._upper = (
+                np.asarray(limit, dtype=np.float64) for limit in joint_limits
+            )
+        self._is_blocked = np.zeros(dof, dtype=bool)
+
+        # null space
+        self._JJt = np.identity(6)
+
+    def __repr__(self):
+        return "pykin.kinematics.ik_solver.{}()".format(type(self).__name__)
+
+    def solve(self, current_joints, target_pose, max_iter=1000, objectives=None):
+        """
+        Computes inverse kinematics
+
+        Args:
+            current_joints (sequence of float): input joint angles
+            target_pose (np.array): goal pose to achieve (pose(7,), pose(6,) or h_mat(4, 4))
+            max_iter (int): Maximum number of calculation iterations
+            objectives (list of NullSpaceObjective): secondary objectives minimized in null space
+
+        Returns:
+            joints (np.array): target joint angles
+        """
+        target_pose = np.asarray(target_pose, dtype=np.float64)
+        if target_pose.shape == (4, 4):
+            self._target[:] = target_pose
+        else:
+            self._target[:] = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
+
+        thetas = self._thetas
+        thetas[:] = current_joints
+        if self.bounded:
+            np.clip(thetas, self._lower, self._upper, out=thetas)
+        iterator = 1
+
+        self._update_joint_frames(thetas)
+        Ek = self._update_pose_error()
+
+        if objectives:
+            iterator, Ek = self._solve_null_space(thetas, Ek, max_iter, objectives)
+
+        while Ek > self.eps:
+            iterator += 1
+            if iterator > max_iter:
+                break
+
+            lamb = Ek + self.DAMPING
+
+            self._update_jacobian()
+            self._update_normal_equations(lamb)
+            if self.bounded:
+                Ek2 = self._step_bounded(thetas, Ek)
+                if Ek2 < Ek:
+                    Ek = Ek2
+                    continue
+                break
+
+            dq = np.linalg.solve(self.JtWJ, self.gradient)
+            thetas += dq
+
+            self._update_joint_frames(thetas)
+            Ek2 = self._update_pose_error()
+
+            if Ek2 < Ek:
+                Ek = Ek2
+            else:
+                thetas -= dq
+                break
+
+        self.iterations = iterator - 1
+        self.error = Ek
+        return thetas.copy()
+
+    def get_hessian(self):
+        """
+        Returns kinematic hessian of end effector from the jacobian of the last iteration
+
+        Returns:
+            Hessian (np.array(dof, 6, dof)): return Hessian, H[j, :, i] is derivative of J[:, i] with respect to q[j]
+        """
+        H = jac.calc_hessian_batch(self._J_joints)
+        if self._is_ordered:
+            return H
+        dof = self.chain.dof
+        H_columns = np.zeros((len(self._columns), 6, dof))
+        H_columns[..., self._columns] = H
+        H_full = np.zeros((dof, 6, dof))
+        H_full[self._columns] = H_columns
+        return H_full
+
+    @property
+    def converged(self):
+        """
+        Whether weighted squared pose error of the last solve is below eps
+        """
+        return self.error <= self.eps
+
+    def _solve_null_space(self, thetas, Ek, max_iter, objectives):
+        """
+        Takes LM steps plus projected objective steps in place
+        until the pose error is small and the projected step is negligible,
+        or half of the iterations are used.
+        Steps are scaled up while successive steps point the same way and halved when they overshoot.
+        A step may raise the pose error up to NULL_SPACE_TOL, the following steps remove it
+
+        Args:
+            thetas (np.array(dof,)): joint angles
+            Ek (float): weighted squared pose error of thetas
+            max_iter (int): Maximum number of calculation iterations
+            objectives (list of NullSpaceObjective): secondary objectives
+
+        Returns:
+            iterator (int): number of calculation iterations + 1
+            Ek (float): weighted squared pose error of thetas
+        """
+        iterator = 1
+        scale = 1.0
+        previous = None
+        largest = 0.0
+        while True:
+            iterator += 1
+            # the plain LM loop keeps half of the iterations to remove the remaining error
+            if iterator > max_iter // 2:
+                break
+
+            self._update_jacobian()
+            step = self._get_null_space_step(thetas, objectives)
+            if previous is not None:
+                # steps grow while objectives descend the same way and shrink when they overshoot
+                scale *= self.NULL_SPACE_GROWTH if np.dot(step, previous) > 0 else 0.5
+                scale = min(scale, self.NULL_SPACE_MAX_SCALE)
+            previous = step
+            dq_null = scale * step
+            squared_norm = np.dot(dq_null, dq_null)
+            largest = max(largest, squared_norm)
+            threshold = max(Ek, self.NULL_SPACE_TOL)
+            if squared_norm < max(self.NULL_SPACE_EPS, self.NULL_SPACE_RTOL * largest):
+                if Ek <= self.NULL_SPACE_TOL:
+                    # objectives are minimized, the plain LM loop removes the remaining error
+                    break
+                dq_null, threshold = None, Ek
+
+            self._update_normal_equations(Ek + self.DAMPING)
+            Ek2 = self._step_null_space(thetas, Ek, dq_null, threshold)
+            if Ek2 < threshold:
+                Ek = Ek2
+                continue
+            if dq_null is None:
+                break
+
+            # projected step was too long, so a plain LM step is taken instead
+            scale *= 0.5
+            self._update_normal_equations(Ek + self.DAMPING)
+            Ek2 = self._step_null_space(thetas, Ek, None, Ek)
+            if Ek2 < Ek:
+                Ek = Ek2
+            elif Ek > self.NULL_SPACE_TOL:
+                break
+
+        return iterator - 1, Ek
+
+    def _step_null_space(self, thetas, Ek, dq_null, threshold):
+        """
+        Takes LM step plus null space step in place
+
+        Args:
+            thetas (np.array(dof,)): joint angles, which are kept if step is rejected
+            Ek (float): weighted squared pose error of thetas
+            dq_null (np.array(dof,)): null space step (None for plain LM step)
+            threshold (float): pose error the step has to get below
+
+        Returns:
+            float: weighted squared pose error after step (inf if step is rejected)
+        """
+        if self.bounded:
+            Ek2 = self._step_bounded(thetas, Ek, dq_null, threshold)
+        else:
+            dq = np.linalg.solve(self.JtWJ, self.gradient)
+            if dq_null is not None:
+                # damping of LM2 moves joints in the null space against objectives
+                dq += dq_null - self._project_null_space(dq)
+            thetas += dq
+            self._update_joint_frames(thetas)
+            Ek2 = self._update_pose_error()
+            if not Ek2 < threshold:
+                thetas -= dq
+                Ek2 = math.inf
+
+        if Ek2 == math.inf:
+            # pose error of the kept joint angles is needed by the next step
+            self._update_joint_frames(thetas)
+            self._update_pose_error()
+        return Ek2
+
+    def _get_null_space_step(self, thetas, objectives):
+        """
+        Returns descent direction of objectives projected into the null space of the jacobian
+
+        Args:
+            thetas (np.array(dof,)): joint angles
+            objectives (list of NullSpaceObjective): secondary objectives
+
+        Returns:
+            np.array(dof,): null space step
+        """
+        gradient = objectives[0](self, thetas)
+        for objective in objectives[1:]:
+            gradient = gradient + objective(self, thetas)
+
+        J = self.J
+        np.dot(J, J.T, out=self._JJt)
+        self._JJt.reshape(-1)[::7] += self.NULL_SPACE_DAMPING
+        return -self._project_null_space(gradient)
+
+    def _project_null_space(self, dq):
+        """
+        Returns component of dq in the null space of the jacobian of _get_null_space_step
+        """
+        return dq - np.dot(self.J.T, np.linalg.solve(self._JJt, np.dot(self.J, dq)))
+
+    def _step_bounded(self, thetas, Ek, dq_null=None, threshold=None):
+        """
+        Takes a projected step within joint limits in place
+
+        Args:
+            thetas (np.array(dof,)): joint angles, which are kept if pose error does not decrease
+            Ek (float): weighted squared pose error of thetas
+            dq_null (np.array(dof,)): null space step added to LM step
+            threshold (float): pose error the step has to get below (default: Ek)
+
+        Returns:
+            float: weighted squared pose error after step (inf if step is rejected)
+        """
+        if threshold is None:
+            threshold = Ek
+
+        dq = np.linalg.solve(self.JtWJ, self.gradient)
+        if dq_null is not None:
+            dq += dq_null - self._project_null_space(dq)
+
+        # joints at a limit whose step points outward are fixed
+        np.logical_or(
+            (thetas <= self._lower) & (dq < 0),
+            (thetas >= self._upper) & (dq > 0),
+            out=self._is_blocked,
+        )
+        if np.any(self._is_blocked):
+            self.JtWJ[self._is_blocked] = 0.0
+            self.JtWJ[:, self._is_blocked] = 0.0
+            self._diagonal[self._is_blocked] = 1.0
+            self.gradient[self._is_blocked] = 0.0
+            dq = np.linalg.solve(self.JtWJ, self.gradient)
+            if dq_null is not None:
+                dq += np.where(
+                    self._is_blocked, 0.0, dq_null - self._project_null_space(dq)
+                )
+
+        previous = thetas.copy()
+        for _ in range(self.MAX_HALVINGS):
+            np.clip(previous + dq, self._lower, self._upper, out=thetas)
+            self._update_joint_frames(thetas)
+            Ek2 = self._update_pose_error()
+            if Ek2 < threshold:
+                return Ek2
+            dq *= 0.5
+
+        thetas[:] = previous
+        return math.inf
+
+    def _update_joint_frames(self, thetas):
+        """
+        Computes poses of links from root to end effector in place
+
+        Args:
+            thetas (np.array(dof,)): input joint angles
+        """
+        np.take(thetas, self._theta_columns, out=self._q)
+        self._q *= self._actuated_mask
+
+        np.sin(self._q, out=self._sin[:, 0, 0])
+        np.cos(self._q, out=self._versine[:, 0, 0])
+        np.subtract(1.0, self._versine, out=self._versine)
+
+        rot = self._motion_rot
+        np.multiply(self._skew_axes, self._sin, out=rot)
+        np.multiply(self._skew_axes_squared, self._versine, out=self._rot)
+        rot += self._rot
+        rot += _IDENTITY
+        np.multiply(self._translation_axes, self._q[:, None], out=self._motion_pos)
+        np.matmul(self._offsets, self._motion, out=self._local)
+
+        np.dot(self.chain.base, self._local[0], out=self._poses[0])
+        for parent, local, pose in self._compose_views:
+            np.dot(parent, local, out=pose)
+        if self._joint_positions is not None:
+            np.take(self._poses, self._joint_positions, axis=0, out=self._joint_h_mats)
+
+    def _update_jacobian(self):
+        """
+        Computes jacobian of end effector in place from the joint frames
+        """
+        rotations = self._joint_h_mats[:, :3, :3]
+        angular = self._J_joints[3:]
+        np.einsum("nij,nj->in", rotations, self._revolute_axes, out=angular)
+        np.einsum("nij,nj->in", rotations, self._prismatic_axes, out=self._linear)
+
+        np.subtract(
+            self._poses[-1, :3, 3], self._joint_h_mats[:, :3, 3], out=self._distance
+        )
+        np.einsum(
+            "ijk,jn,nk->in",
+            _LEVI_CIVITA,
+            angular,
+            self._distance,
+            out=self._J_joints[:3],
+        )
+        self._J_joints[:3] += self._linear
+
+        if not self._is_ordered:
+            self.J[:, self._columns] = self._J_joints
+
+    def _update_normal_equations(self, lamb):
+        """
+        Computes damped JtWJ and gradient JtWe in place
+
+        Args:
+            lamb (float): damping factor
+        """
+        np.multiply(self.J, self.We[:, None], out=self._WJ)
+        np.matmul(self.J.T, self._WJ, out=self.JtWJ)
+        np.matmul(self._WJ.T, self.err, out=self.gradient)
+
+        if self.method == "LM":
+            self._diagonal += lamb
+        else:
+            np.multiply(self._diagonal, lamb, out=self._JtWJ_diagonal)
+            self._diagonal += self._JtWJ_diagonal
+
+    def _update_pose_error(self):
+        """
+        Computes pose error between target and end effector in place
+
+        Returns:
+            float: weighted squared pose error
+        """
+        cur_pose = self._poses[-1]
+        cur_rot = cur_pose[:3, :3]
+        np.subtract(self._target[:3, 3], cur_pose[:3, 3], out=self.err[:3])
+        np.matmul(cur_rot.T, self._target[:3, :3], out=self._rot_err)
+
+        R = self._rot_err
+        el = self._el
+        el[0] = R[2, 1] - R[1, 2]
+        el[1] = R[0, 2] - R[2, 0]
+        el[2] = R[1, 0] - R[0, 1]
+        norm_el = math.sqrt(el[0] * el[0] + el[1] * el[1] + el[2] * el[2])
+        if norm_el > self.eps:
+            el *= math.atan2(norm_el, R[0, 0] + R[1, 1] + R[2, 2] - 1) / norm_el
+        elif R[0, 0] > 0 and R[1, 1] > 0 and R[2, 2] > 0:
+            el[:] = 0.0
+        else:
+            el[0] = R[0, 0] + 1
+            el[1] = R[1, 1] + 1
+            el[2] = R[2, 2] + 1
+            el *= np.pi / 2
+        np.matmul(cur_rot, el, out=self.err[3:])
+
+        np.multiply(self.err, self.err, out=self._weighted_err)
+        return float(np.dot(self._weighted_err, self.We))
+
+
+class StackedIKSolver:
+    """
+    Class of StackedIKSolver
+    Levenberg-Marquardt inverse kinematics of several chains in lockstep,
+    like both arms of a bimanual robot or many seeds of one chain (batched IK).
+    Paths of the chains are padded with identity links to the same length and stacked
+    into buffers allocated once, so every iteration takes one batched numpy call per link
+    or per step for all chains, and costs about as much as an iteration of IKSolver.
+    A chain stops as soon as its error is below eps or its step is rejected.
+    Once half of MANY_CHAINS or more chains stopped, the others are moved to a smaller solver
+
+    Args:
+        chains (list of CompiledChain): compiled chains whose joints are ordered from root to end effector
+        method (str): damping method (LM: lambda * I, LM2: lambda * diag(JtWJ))
+        eps (float): tolerance of weighted squared pose error
+    """
+
+    # from this many chains, stopped chains are compacted instead of masked
+    # and cross products are taken by components, which scale better than einsum
+    MANY_CHAINS = 64
+
+    def __init__(self, chains, method="LM2", eps=1e-12):
+        if method not in IKSolver.METHODS:
+            raise NotImplementedError(
+                "Only {} are supported, instead got: {}".format(
+                    IKSolver.METHODS, method
+                )
+            )
+        self.chains = chains
+        self.method = method
+        self.eps = eps
+        self.iterations = 0
+        self.dofs = [len(chain.eef_joint_indices) for chain in chains]
+
+        n_chains = len(chains)
+        n_path = max(len(chain.eef_path) for chain in chains)
+        n_joints = max(self.dofs)
+
+        self._bases = np.stack([chain.base for chain in chains])
+        # links are the leading axis, so each link of all chains is contiguous
+        self._theta_columns = np.zeros((n_path, n_chains), dtype=np.int64)
+        self._actuated_mask = np.zeros((n_path, n_chains))
+        self._skew_axes = np.zeros((n_path, n_chains, 3, 3))
+        self._skew_axes_squared = np.zeros((n_path, n_chains, 3, 3))
+        self._translation_axes = np.zeros((n_path, n_chains, 3))
+        self._offsets = np.tile(np.identity(4), (n_path, n_chains, 1, 1))
+        self._joint_positions = np.zeros((n_chains, n_joints), dtype=np.int64)
+        self._revolute_axes = np.zeros((n_chains, n_joints, 3))
+        self._prismatic_axes = np.zeros((n_chains, n_joints, 3))
+        self._is_padding = np.ones((n_chains, n_joints))
+
+        # lanes of the same chain, e.g. seeds of batched IK, are filled together
+        lanes = {}
+        for k, chain in enumerate(chains):
+            lanes.setdefault(chain, []).append(k)
+
+        for chain, k in lanes.items():
+            path = chain.eef_path
+            joints = chain.eef_joint_indices
+            dof = len(joints)
+            if np.any(chain.theta_indices[joints] != np.arange(dof)):
+                raise ValueError(
+                    "Joints of stacked chains must be ordered from root to end effector"
+                )
+
+            n = len(path)
+            self._theta_columns[:n, k] = chain.theta_columns[path, None]
+            self._actuated_mask[:n, k] = chain.actuated_mask[path, None]
+            self._skew_axes[:n, k] = chain.skew_axes[path, None]
+            self._skew_axes_squared[:n, k] = chain.skew_axes_squared[path, None]
+            self._translation_axes[:n, k] = chain.translation_axes[path, None]
+            self._offsets[:n, k] = chain.offsets[path, None]
+
+            self._joint_positions[k, :dof] = np.flatnonzero(
+                chain.theta_indices[path] >= 0
+            )
+            self._revolute_axes[k, :dof] = np.where(
+                chain.revolute_mask[joints, None], chain.axes[joints], 0.0
+            )
+            self._prismatic_axes[k, :dof] = chain.translation_axes[joints]
+            self._is_padding[k, :dof] = 0.0
+
+        # columns of padded links point at the chain's own thetas
+        self._theta_columns += np.arange(n_chains) * n_joints
+        self._joint_positions *= n_chains
+        self._joint_positions += np.arange(n_chains)[:, None]
+
+        self.We = IKSolver.WEIGHTS
+
+        # forward kinematics
+        self._q = np.zeros((n_path, n_chains))
+        self._sin = np.zeros((n_path, n_chains, 1, 1))
+        self._versine = np.zeros((n_path, n_chains, 1, 1))
+        self._rot = np.zeros((n_path, n_chains, 3, 3))
+        self._motion = np.tile(np.identity(4), (n_path, n_chains, 1, 1))
+        self._local = np.zeros((n_path, n_chains, 4, 4))
+        self._poses = np.zeros((n_path, n_chains, 4, 4))
+        self._flat_poses = self._poses.reshape(-1, 4, 4)
+
+        # jacobian
+        self._joint_h_mats = np.zeros((n_chains, n_joints, 4, 4))
+        self._distance = np.zeros((n_chains, n_joints, 3))
+        self._linear = np.zeros((n_chains, 3, n_joints))
+        self._cross = np.zeros((n_chains, n_joints))
+        self._has_many_chains = n_chains >= self.MANY_CHAINS
+        self.J = np.zeros((n_chains, 6, n_joints))
+
+        # normal equations
+        self._WJ = np.zeros((n_chains, 6, n_joints))
+        self.JtWJ = np.zeros((n_chains, n_joints, n_joints))
+        self._diagonal = np.einsum("bii->bi", self.JtWJ)
+        self._JtWJ_diagonal = np.zeros((n_chains, n_joints))
+        self.gradient = np.zeros((n_chains, n_joints, 1))
+
+        # pose error
+        self._targets = np.zeros((n_chains, 4, 4))
+        self.err = np.zeros((n_chains, 6))
+        self._rot_err = np.zeros((n_chains, 3, 3))
+        self._rot_err_diagonal = np.einsum("bii->bi", self._rot_err)
+        self._el = np.zeros((n_chains, 3))
+        self._weighted_err = np.zeros((n_chains, 6))
+
+        self._thetas = np.zeros((n_chains, n_joints))
+        self._new_thetas = np.zeros((n_chains, n_joints))
+
+    def __repr__(self):
+        return "pykin.kinematics.ik_solver.{}()".format(type(self).__name__)
+
+    def solve(self, current_joints, target_poses, max_iter=1000):
+        """
+        Computes inverse kinematics of every chain
+
+        Args:
+            current_joints (list of sequence of float): input joint angles of each chain
+                (or np.array(n_chains, dof) if all chains have the same dof)
+            target_poses (list of np.array): goal pose of each chain (pose(7,), pose(6,) or h_mat(4, 4))
+                (or np.array(n_chains, 4, 4))
+            max_iter (int): Maximum number of calculation iterations
+
+        Returns:
+            joints (list of np.array): target joint angles of each chain
+            errors (np.array(n_chains,)): weighted squared pose errors
+        """
+        thetas = self._thetas
+        new_thetas = self._new_thetas
+        if (
+            isinstance(current_joints, np.ndarray)
+            and current_joints.shape == thetas.shape
+        ):
+            thetas[:] = current_joints
+        else:
+            thetas[:] = 0.0
+            for k, dof in enumerate(self.dofs):
+                thetas[k, :dof] = current_joints[k]
+
+        if isinstance(target_poses, np.ndarray) and target_poses.shape[-2:] == (4, 4):
+            self._targets[:] = target_poses
+        else:
+            for k, target_pose in enumerate(target_poses):
+                target_pose = np.asarray(target_pose, dtype=np.float64)
+                if target_pose.shape == (4, 4):
+                    self._targets[k] = target_pose
+                else:
+                    self._targets[k] = t_utils.get_h_mat(
+                        target_pose[:3], target_pose[3:]
+                    )
+
+        self._update_joint_frames(thetas)
+        Ek = self._update_pose_error()
+        err = self.err.copy()
+
+        active = Ek > self.eps
+        iterator = 1
+        while active.any():
+            iterator += 1
+            if iterator > max_iter:
+                break
+
+            # joint frames of rejected chains are left at their rejected step
+            self._update_jacobian()
+            self._update_normal_equations(Ek + IKSolver.DAMPING, err)
+            dq = np.linalg.solve(self.JtWJ, self.gradient)[..., 0]
+            dq *= active[:, None]
+            np.add(thetas, dq, out=new_thetas)
+
+            self._update_joint_frames(new_thetas)
+            Ek2 = self._update_pose_error()
+
+            is_improved = active & (Ek2 < Ek)
+            np.copyto(thetas, new_thetas, where=is_improved[:, None])
+            np.copyto(err, self.err, where=is_improved[:, None])
+            np.copyto(Ek, Ek2, where=is_improved)
+            active = is_improved & (Ek > self.eps)
+
+            n_active = np.count_nonzero(active)
+            if n_active and len(active) >= self.MANY_CHAINS:
+                if n_active <= len(active) // 2:
+                    # remaining chains are solved by a smaller solver, so finished chains cost nothing
+                    iterator += self._solve_compacted(
+                        active, thetas, Ek, max_iter - iterator + 1
+                    )
+                    break
+
+        self.iterations = iterator - 1
+        joints = [thetas[k, :dof].copy() for k, dof in enumerate(self.dofs)]
+        return joints, Ek
+
+    def _solve_compacted(self, active, thetas, Ek, max_iter):
+        """
+        Solves active chains with a solver of their own and writes the results back in place
+
+        Args:
+            active (np.array(n_chains,)): mask of chains still iterating
+            thetas (np.array(n_chains, n_joints)): joint angles of every chain
+            Ek (np.array(n_chains,)): weighted squared pose errors of every chain
+            max_iter (int): Maximum number of calculation iterations left
+
+        Returns:
+            int: number of calculation iterations of the smaller solver
+        """
+        lanes = np.flatnonzero(active)
+        solver = StackedIKSolver([self.chains[k] for k in lanes], self.method, self.eps)
+        n_joints = solver._thetas.shape[1]
+        _, Ek[lanes] = solver.solve(
+            thetas[lanes, :n_joints], self._targets[lanes], max_iter
+        )
+        thetas[lanes, :n_joints] = solver._thetas
+        return solver.iterations
+
+    def _update_joint_frames(self, thetas):
+        """
+        Computes poses of links from root to end effector of every chain in place
+
+        Args:
+            thetas (np.array(n_chains, n_joints)): input joint angles
+        """
+        np.take(thetas, self._theta_columns, out=self._q)
+        self._q *= self._actuated_mask
+
+        np.sin(self._q, out=self._sin[..., 0, 0])
+        np.cos(self._q, out=self._versine[..., 0, 0])
+        np.subtract(1.0, self._versine, out=self._versine)
+
+        rot = self._motion[..., :3, :3]
+        np.multiply(self._skew_axes, self._sin, out=rot)
+        np.multiply(self._skew_axes_squared, self._versine, out=self._rot)
+        rot += self._rot
+        rot += _IDENTITY
+        np.multiply(
+            self._translation_axes, self._q[..., None], out=self._motion[..., :3, 3]
+        )
+        np.matmul(self._offsets, self._motion, out=self._local)
+
+        poses = self._poses
+        np.matmul(self._bases, self._local[0], out=poses[0])
+        for i in range(1, len(poses)):
+            np.matmul(poses[i - 1], self._local[i], out=poses[i])
+
+    def _update_jacobian(self):
+        """
+        Computes jacobians of end effectors in place from the joint frames
+        """
+        np.take(self._flat_poses, self._joint_positions, axis=0, out=self._joint_h_mats)
+        rotations = self._joint_h_mats[..., :3, :3]
+        angular = self.J[:, 3:]
+        np.einsum("bnij,bnj->bin", rotations, self._revolute_axes, out=angular)
+        np.einsum("bnij,bnj->bin", rotations, self._prismatic_axes, out=self._linear)
+
+        np.subtract(
+            self._poses[-1, :, None, :3, 3],
+            self._joint_h_mats[..., :3, 3],
+            out=self._distance,
+        )
+        linear = self.J[:, :3]
+        if self._has_many_chains:
+            for i, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+                np.multiply(angular[:, j], self._distance[..., k], out=linear[:, i])
+                np.multiply(angular[:, k], self._distance[..., j], out=self._cross)
+                linear[:, i] -= self._cross
+        else:
+            np.einsum(
+                "ijk,bjn,bnk->bin", _LEVI_CIVITA, angular, self._distance, out=linear
+            )
+        linear += self._linear
+
+    def _update_normal_equations(self, lamb, err):
+        """
+        Computes damped JtWJ and gradient JtWe of every chain in place
+
+        Args:
+            lamb (np.array(n_chains,)): damping factors
+            err (np.array(n_chains, 6)): pose errors
+        """
+        np.multiply(self.J, self.We[:, None], out=self._WJ)
+        np.matmul(np.swapaxes(self.J, -1, -2), self._WJ, out=self.JtWJ)
+        np.matmul(np.swapaxes(self._WJ, -1, -2), err[..., None], out=self.gradient)
+
+        if self.method == "LM":
+            self._diagonal += lamb[:, None]
+        else:
+            np.multiply(self._diagonal, lamb[:, None], out=self._JtWJ_diagonal)
+            self._diagonal += self._JtWJ_diagonal
+        # padded joints have zero columns
+        self._diagonal += self._is_padding
+
+    def _update_pose_error(self):
+        """
+        Computes pose errors between targets and end effectors in place
+
+        Returns:
+            np.array(n_chains,): weighted squared pose errors
+        """
+        cur_poses = self._poses[-1]
+        cur_rot = cur_poses[:, :3, :3]
+        np.subtract(self._targets[:, :3, 3], cur_poses[:, :3, 3], out=self.err[:, :3])
+        np.matmul(
+            np.swapaxes(cur_rot, -1, -2), self._targets[:, :3, :3], out=self._rot_err
+        )
+
+        R = self._rot_err
+        el = self._el
+        np.subtract(R[:, 2, 1], R[:, 1, 2], out=el[:, 0])
+        np.subtract(R[:, 0, 2], R[:, 2, 0], out=el[:, 1])
+        np.subtract(R[:, 1, 0], R[:, 0, 1], out=el[:, 2])
+        norm_el = np.sqrt(np.einsum("bi,bi->b", el, el))
+        diagonal = self._rot_err_diagonal
+
+        is_rotated = norm_el > self.eps
+        if np.all(is_rotated):
+            scale = np.arctan2(norm_el, np.einsum("bii->b", R) - 1)
+            scale /= norm_el
+            el *= scale[:, None]
+        else:
+            scale = np.arctan2(norm_el, np.einsum("bii->b", R) - 1) / np.where(
+                is_rotated, norm_el, 1.0
+            )
+            # half turns, whose axis is read from the diagonal
+            is_half_turn = ~is_rotated & ~np.all(diagonal > 0, axis=-1)
+            el[:] = np.where(
+                is_rotated[:, None],
+                el * scale[:, None],
+                np.where(is_half_turn[:, None], (diagonal + 1) * np.pi / 2, 0.0),
+            )
+        np.matmul(cur_rot, el[..., None], out=self.err[:, 3:, None])
+
+        np.multiply(self.err, self.err, out=self._weighted_err)
+        return np.dot(self._weighted_err, self.We)
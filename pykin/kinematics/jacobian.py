@@ -12,17 +12,128 @@ def calc_jacobian(frames: list, fk: dict, jsize: int) -> np.array:
         Jacobian (np.array(6, jsize)): return Jacobian
     """
     target_position = list(fk.values())[-1].pos
+    frames = [frame for frame in frames if frame.joint.dtype != "fixed"]
     J = np.zeros((6, jsize))
-    n = 0
-    for frame in frames:
-        if frame.joint.dtype == "revolute":
-            n += 1
-            w = np.dot(fk[frame.link.name].h_mat[:3, :3], frame.joint.axis)
-            v = np.cross(w, target_position - fk[frame.link.name].pos)
-            J[:, n - 1] = np.hstack((v, w))
-        elif frame.joint.dtype == "prismatic":
-            n += 1
-            w = np.zeros(3)
-            v = np.dot(fk[frame.link.name].h_mat[:3, :3], frame.joint.axis)
-            J[:, n - 1] = np.hstack((v, w))
+    if not frames:
+        return J
+    J[:, : len(frames)] = calc_jacobian_from_h_mats(
+        np.array([fk[frame.link.name].h_mat for frame in frames]),
+        np.array([frame.joint.axis for frame in frames], dtype=np.float64),
+        np.array([frame.joint.dtype == "revolute" for frame in frames]),
+        target_position,
+    )
     return J
+
+
+def calc_jacobian_from_h_mats(
+    h_mats: np.array, axes: np.array, revolute_mask: np.array, target_position: np.array
+) -> np.array:
+    """
+    Args:
+        h_mats (np.array(jsize, 4, 4)): homogeneous matrices of actuated joints
+        axes (np.array(jsize, 3)): joint axes described in the urdf file
+        revolute_mask (np.array(jsize,)): True if joint is revolute, False if prismatic
+        target_position (np.array(3,)): end effector's position
+
+    Returns:
+        Jacobian (np.array(6, jsize)): return Jacobian
+    """
+    return calc_jacobian_batch(h_mats, axes, revolute_mask, target_position)
+
+
+def calc_jacobian_batch(
+    h_mats: np.array, axes: np.array, revolute_mask: np.array, target_position: np.array
+) -> np.array:
+    """
+    Args:
+        h_mats (np.array(N, jsize, 4, 4)): homogeneous matrices of actuated joints
+        axes (np.array(jsize, 3)): joint axes described in the urdf file
+        revolute_mask (np.array(jsize,)): True if joint is revolute, False if prismatic
+        target_position (np.array(N, 3)): position of reference point on end effector
+
+    Returns:
+        Jacobian (np.array(N, 6, jsize)): return Jacobians
+    """
+    h_mats = np.asarray(h_mats)
+    target_position = np.asarray(target_position)
+    w = np.einsum("...nij,nj->...ni", h_mats[..., :3, :3], axes)
+    v = np.cross(w, target_position[..., None, :] - h_mats[..., :3, 3])
+    revolute_mask = revolute_mask[:, None]
+    J = np.empty(h_mats.shape[:-3] + (6, len(axes)))
+    J[..., :3, :] = np.swapaxes(np.where(revolute_mask, v, w), -1, -2)
+    J[..., 3:, :] = np.swapaxes(np.where(revolute_mask, w, 0.0), -1, -2)
+    return J
+
+
+def calc_hessian(J: np.array) -> np.array:
+    """
+    Args:
+        J (np.array(6, jsize)): geometric jacobian whose columns are ordered from base to end effector
+
+    Returns:
+        Hessian (np.array(jsize, 6, jsize)): return Hessian, H[j, :, i] is derivative of J[:, i] with respect to q[j]
+    """
+    return calc_hessian_batch(J)
+
+
+def calc_hessian_batch(J: np.array) -> np.array:
+    """
+    Args:
+        J (np.array(N, 6, jsize)): geometric jacobians whose columns are ordered from base to end effector
+
+    Returns:
+        Hessian (np.array(N, jsize, 6, jsize)): return Hessians, H[..., j, :, i] is derivative of J[..., :, i] with respect to q[j]
+    """
+    J = np.asarray(J)
+    v = np.swapaxes(J[..., :3, :], -1, -2)
+    w = np.swapaxes(J[..., 3:, :], -1, -2)
+    jsize = J.shape[-1]
+
+    is_upper = np.triu(np.ones((jsize, jsize), dtype=bool))[..., None]
+    H_v = np.where(
+        is_upper,
+        np.cross(w[..., :, None, :], v[..., None, :, :]),
+        np.cross(w[..., None, :, :], v[..., :, None, :]),
+    )
+    H_w = np.cross(w[..., :, None, :], w[..., None, :, :])
+    H_w *= np.triu(np.ones((jsize, jsize)), 1)[..., None]
+
+    return np.swapaxes(np.concatenate((H_v, H_w), axis=-1), -1, -2)
+
+
+def calc_jacobian_dot(J: np.array, dthetas: np.array) -> np.array:
+    """
+    Args:
+        J (np.array(6, jsize)): geometric jacobian whose columns are ordered from base to end effector
+        dthetas (np.array(jsize,)): joint velocities
+
+    Returns:
+        Jacobian_dot (np.array(6, jsize)): return time derivative of Jacobian
+    """
+    return calc_jacobian_dot_batch(J, dthetas)
+
+
+def calc_jacobian_dot_batch(J: np.array, dthetas: np.array) -> np.array:
+    """
+    Computes J_dot = sum_j(H[j] * dq[j]) with cumulative sums instead of building the Hessian
+
+    Args:
+        J (np.array(N, 6, jsize)): geometric jacobians whose columns are ordered from base to end effector
+        dthetas (np.array(N, jsize)): joint velocities
+
+    Returns:
+        Jacobian_dot (np.array(N, 6, jsize)): return time derivatives of Jacobians
+    """
+    J = np.asarray(J)
+    dthetas = np.asarray(dthetas, dtype=np.float64)[..., None]
+    v = np.swapaxes(J[..., :3, :], -1, -2)
+    w = np.swapaxes(J[..., 3:, :], -1, -2)
+
+    w_sum = np.cumsum(w * dthetas, axis=-2)
+    v_sum = np.cumsum((v * dthetas)[..., ::-1, :], axis=-2)[..., ::-1, :]
+    v_sum = v_sum - v * dthetas
+
+    J_dot = np.empty(J.shape)
+    J_dot[..., :3, :] = np.swapaxes(np.cross(w_sum, v) + np.cross(w, v_sum), -1, -2)
+    J_dot[..., 3:, :] = np.swapaxes(np.cross(w_sum - w * dthetas, w), -1, -2)
+    return J_dot
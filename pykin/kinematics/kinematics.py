@@ -1,10 +1,20 @@
+import time
 import numpy as np
 from collections import OrderedDict
 
-from pykin.kinematics import jacobian as jac
+from pykin.kinematics.analytic_ik import get_analytic_ik
+from pykin.kinematics.chain import CompiledChain
+from pykin.kinematics.differential_ik import DifferentialIK
+from pykin.kinematics.ik_result import IKResult
+from pykin.kinematics.ik_solver import IKSolver, StackedIKSolver
+from pykin.kinematics.matrix_fk import MatrixForwardKinematics
 from pykin.kinematics.transform import Transform
 from pykin.utils import transform_utils as t_utils
-from pykin.utils.kin_utils import calc_pose_error, convert_thetas_to_dict, logging_time
+from pykin.utils.kin_utils import (
+    calc_pose_error,
+    calc_pose_error_batch,
+    convert_thetas_to_dict,
+)
 
 
 class Kinematics:
@@ -34,6 +44,12 @@ class Kinematics:
         self.hand_joint_names = hand_joint_names
         self.base_name = base_name
         self.eef_name = eef_name
+        self._chains = {}
+        self._matrix_fks = {}
+        self._ik_solvers = {}
+        self._stacked_ik_solvers = {}
+        self._analytic_ik_solvers = {}
+        self._torch_kinematics = {}
 
     def forward_kinematics(self, frames, thetas):
         """
@@ -48,44 +64,538 @@ class Kinematics:
         """
 
         if not isinstance(frames, list):
-            thetas = convert_thetas_to_dict(self.active_joint_names,self.hand_joint_names, thetas)
+            thetas = convert_thetas_to_dict(
+                self.active_joint_names, self.hand_joint_names, thetas
+            )
         fk = self._compute_FK(frames, self.offset, thetas)
         return fk
 
-    @logging_time
+    def forward_kinematics_batch(self, frames, thetas):
+        """
+        Returns homogeneous matrices obtained by computing fk for a batch of joint angles.
+        Only links of the chain are computed, so Baxter's *_visual links
+        of forward_kinematics are not included
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (np.array(N, dof)): batch of input joint angles
+
+        Returns:
+            fk (np.array(N, n_links, 4, 4)): homogeneous matrices ordered as get_chain(frames).link_names
+        """
+        thetas = np.atleast_2d(np.asarray(thetas, dtype=np.float64))
+        chain = self.get_chain(frames)
+        return chain.forward_kinematics(self.expand_hand_thetas(chain, thetas))
+
+    def forward_kinematics_h_mat(self, frames, thetas):
+        """
+        Returns link poses obtained by computing fk with preallocated homogeneous matrices
+        (links of the chain only, without Baxter's *_visual links)
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (sequence of float): input joint angles
+
+        Returns:
+            fk (LinkPoses): link poses, overwritten by the next call with the same frames
+        """
+        chain = self.get_chain(frames)
+        matrix_fk = self._matrix_fks.get(chain)
+        if matrix_fk is None:
+            matrix_fk = MatrixForwardKinematics(chain)
+            self._matrix_fks[chain] = matrix_fk
+        return matrix_fk.compute(
+            self.expand_hand_thetas(chain, np.asarray(thetas, dtype=np.float64))
+        )
+
+    def eef_pose(self, frames, thetas):
+        """
+        Returns end effector's homogeneous matrix without computing every link's transformation
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (sequence of float or np.array(N, dof)): input joint angles
+
+        Returns:
+            eef_pose (np.array(4, 4) or np.array(N, 4, 4)): homogeneous matrix of the last frame
+        """
+        chain = self.get_chain(frames)
+        thetas = np.asarray(thetas, dtype=np.float64)
+        return chain.eef_pose(self.expand_hand_thetas(chain, thetas))
+
+    def joint_frames(self, frames, thetas):
+        """
+        Returns only the joint frames needed to compute end effector's jacobian
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (sequence of float): input joint angles
+
+        Returns:
+            joint_h_mats (np.array(n_joints, 4, 4)): homogeneous matrices of actuated joints
+            eef_pose (np.array(4, 4)): homogeneous matrix of the last frame
+        """
+        chain = self.get_chain(frames)
+        thetas = np.asarray(thetas, dtype=np.float64)
+        return chain.joint_frames(self.expand_hand_thetas(chain, thetas))
+
+    def jacobian(self, frames, thetas, point=None):
+        """
+        Returns geometric jacobian of end effector
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (sequence of float): input joint angles
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian (np.array(6, dof)): return Jacobian
+        """
+        chain = self.get_chain(frames)
+        thetas = np.asarray(thetas, dtype=np.float64)
+        joint_h_mats, eef_pose = chain.joint_frames(
+            self.expand_hand_thetas(chain, thetas)
+        )
+        return chain.jacobian_from_joint_frames(joint_h_mats, eef_pose, point)
+
+    def jacobian_batch(self, frames, thetas, point=None):
+        """
+        Returns geometric jacobians of end effector for a batch of joint angles
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (np.array(N, dof)): batch of input joint angles
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian (np.array(N, 6, dof)): return Jacobians
+        """
+        thetas = np.atleast_2d(np.asarray(thetas, dtype=np.float64))
+        chain = self.get_chain(frames)
+        return chain.jacobian_batch(self.expand_hand_thetas(chain, thetas), point)
+
+    def hessian(self, frames, thetas, point=None):
+        """
+        Returns kinematic hessian of end effector
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (np.array(dof,) or np.array(N, dof)): input joint angles
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Hessian (np.array(..., dof, 6, dof)): return Hessian, H[..., j, :, i] is derivative of J[..., :, i] with respect to q[j]
+        """
+        chain = self.get_chain(frames)
+        thetas = np.asarray(thetas, dtype=np.float64)
+        return chain.hessian(self.expand_hand_thetas(chain, thetas), point)
+
+    def jacobian_dot(self, frames, thetas, dthetas, point=None):
+        """
+        Returns time derivative of geometric jacobian of end effector
+
+        Args:
+            frames (list or Frame()): robot's frame for forward kinematics
+            thetas (np.array(dof,) or np.array(N, dof)): input joint angles
+            dthetas (np.array(dof,) or np.array(N, dof)): input joint velocities
+            point (np.array(3,)): reference point described in end effector's frame
+
+        Returns:
+            Jacobian_dot (np.array(..., 6, dof)): return time derivative of Jacobian
+        """
+        chain = self.get_chain(frames)
+        thetas = np.asarray(thetas, dtype=np.float64)
+        dthetas = np.asarray(dthetas, dtype=np.float64)
+        return chain.jacobian_dot(
+            self.expand_hand_thetas(chain, thetas),
+            self.expand_hand_thetas(chain, dthetas),
+            point,
+        )
+
+    def get_chain(self, frames):
+        """
+        Returns compiled chain of frames, which is compiled only once
+
+        Args:
+            frames (list or Frame()): robot's frame
+
+        Returns:
+            chain (CompiledChain): compiled chain
+        """
+        if isinstance(frames, list):
+            key = tuple(frame.link.name for frame in frames)
+        else:
+            key = frames.link.name
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = CompiledChain(frames, self.active_joint_names, self.offset)
+            self._chains[key] = chain
+        return chain
+
+    def get_ik_solver(self, frames, method="LM2", bounded=False, joint_limits=None):
+        """
+        Returns inverse kinematics solver of frames, which is created only once
+
+        Args:
+            frames (list or Frame()): robot's frame
+            method (str): damping method (LM or LM2)
+            bounded (bool): keep joint angles within joint limits
+            joint_limits (tuple): lower and upper joint limits (default: limits of the urdf file)
+
+        Returns:
+            solver (IKSolver): inverse kinematics solver with preallocated buffers
+        """
+        chain = self.get_chain(frames)
+        key = (chain, method, bounded)
+        if joint_limits is not None:
+            key += tuple(
+                tuple(np.asarray(limit, dtype=np.float64)) for limit in joint_limits
+            )
+        solver = self._ik_solvers.get(key)
+        if solver is None:
+            solver = IKSolver(chain, method, bounded=bounded, joint_limits=joint_limits)
+            self._ik_solvers[key] = solver
+        return solver
+
+    def get_stacked_ik_solver(self, frames_list, method="LM2"):
+        """
+        Returns inverse kinematics solver of several frames solved in lockstep,
+        which is created only once
+
+        Args:
+            frames_list (list of list): robot's frames of each chain
+            method (str): damping method (LM or LM2)
+
+        Returns:
+            solver (StackedIKSolver): stacked inverse kinematics solver
+        """
+        chains = tuple(self.get_chain(frames) for frames in frames_list)
+        key = (chains, method)
+        solver = self._stacked_ik_solvers.get(key)
+        if solver is None:
+            solver = StackedIKSolver(list(chains), method)
+            self._stacked_ik_solvers[key] = solver
+        return solver
+
+    def get_differential_ik(
+        self, frames, current_joints, damping=1e-2, velocity_limits=None
+    ):
+        """
+        Returns new velocity level inverse kinematics of frames for servo loops
+
+        Args:
+            frames (list or Frame()): robot's frame
+            current_joints (sequence of float): initial joint angles
+            damping (float): damping of least squares near singularities
+            velocity_limits (float or np.array(dof,)): positive maximum joint velocities (default: inf)
+
+        Returns:
+            DifferentialIK: differential inverse kinematics at current joint angles
+        """
+        return DifferentialIK(
+            self.get_chain(frames), current_joints, damping, velocity_limits
+        )
+
+    def get_analytic_ik_solver(self, frames):
+        """
+        Returns closed-form inverse kinematics solver of frames, which is created only once
+
+        Args:
+            frames (list or Frame()): robot's frame
+
+        Returns:
+            solver (AnalyticIK): None if robot has no closed-form solution
+        """
+        chain = self.get_chain(frames)
+        if chain not in self._analytic_ik_solvers:
+            self._analytic_ik_solvers[chain] = get_analytic_ik(self.robot_name, chain)
+        return self._analytic_ik_solvers[chain]
+
+    def get_torch_kinematics(self, frames, dtype=None, device="cpu"):
+        """
+        Returns torch backend computing differentiable fk of frames, which is created only once.
+        torch is imported only when this is called
+
+        Args:
+            frames (list or Frame()): robot's frame
+            dtype (torch.dtype): dtype of tensors (default: torch.float64)
+            device (str or torch.device): device of tensors
+
+        Returns:
+            TorchKinematics: torch backend of the compiled chain
+        """
+        import torch
+        from pykin.kinematics.torch_kinematics import TorchKinematics
+
+        if dtype is None:
+            dtype = torch.float64
+        chain = self.get_chain(frames)
+        key = (chain, dtype, str(device))
+        torch_kinematics = self._torch_kinematics.get(key)
+        if torch_kinematics is None:
+            torch_kinematics = TorchKinematics(chain, dtype, device)
+            self._torch_kinematics[key] = torch_kinematics
+        return torch_kinematics
+
+    def expand_hand_thetas(self, chain, thetas):
+        """
+        Inserts zero angles of hand joints if thetas do not include them
+
+        Args:
+            chain (CompiledChain): compiled chain
+            thetas (np.array(..., dof)): input joint angles
+
+        Returns:
+            thetas (np.array(..., chain.dof)): joint angles
+        """
+        if thetas.shape[-1] == chain.dof or not self.hand_joint_names:
+            return thetas
+        hand_indices = [
+            self.active_joint_names.index(joint) for joint in self.hand_joint_names
+        ]
+        return np.insert(
+            thetas, np.array(hand_indices) - np.arange(len(hand_indices)), 0, axis=-1
+        )
+
     def inverse_kinematics(
-        self, frames, current_joints, target_pose, method="LM2", max_iter=1000
+        self,
+        frames,
+        current_joints,
+        target_pose,
+        method="LM2",
+        max_iter=1000,
+        bounded=False,
+        objectives=None,
+        verbose=False,
+        callback=None,
+        return_result=False,
+        gabo_options=None,
+        joint_limits=None,
     ):
         """
-        Returns joint angles obtained by computing IK
+        Returns joint angles obtained by computing IK.
+        Nothing is printed unless verbose, so it can be called in control loops
 
         Args:
             frames (Frame()): robot's frame for invers kinematics
             current_joints (sequence of float): input joint angles
             target_pose (np.array): goal pose to achieve
-            method (str): two methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson)
+            method (str): methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson, analytic: closed form)
             max_iter (int): Maximum number of calculation iterations
+            bounded (bool): keep joint angles within joint limits of the urdf file (LM, LM2 and analytic)
+            objectives (list of NullSpaceObjective): secondary objectives of redundant robots (LM and LM2)
+            verbose (bool): print method, iterations, error and working time
+            callback (callable): called with IKResult after solving, e.g. to collect timings
+            return_result (bool): return IKResult instead of joint angles
+            gabo_options (dict): keyword arguments of _compute_IK_GaBO (GaBO), e.g.
+                {"refit_interval": 5, "max_data": 300, "batch_size": 3} (default: refit every iteration,
+                one candidate per iteration)
+            joint_limits (tuple): lower and upper joint limits kept if bounded
+                (default: limits of the urdf file)
 
         Returns:
-            joints (np.array): target joint angles
+            joints (np.array): target joint angles (IKResult if return_result)
         """
-        if method == "NR":
-            joints = self._compute_IK_NR(
-                frames, current_joints, target_pose, max_iter=max_iter
+        start_time = time.perf_counter()
+        if method == "analytic":
+            solved = self._compute_IK_analytic(
+                frames,
+                current_joints,
+                target_pose,
+                max_iter=max_iter,
+                bounded=bounded,
+                joint_limits=joint_limits,
             )
-        if method == "LM":
-            joints = self._compute_IK_LM(
+        elif method == "NR":
+            solved = self._compute_IK_NR(
                 frames, current_joints, target_pose, max_iter=max_iter
             )
-        if method == "LM2":
-            joints = self._compute_IK_LM2(
-                frames, current_joints, target_pose, max_iter=max_iter
+        elif method == "LM":
+            solved = self._compute_IK_LM(
+                frames,
+                current_joints,
+                target_pose,
+                max_iter=max_iter,
+                bounded=bounded,
+                objectives=objectives,
+                joint_limits=joint_limits,
+            )
+        elif method == "LM2":
+            solved = self._compute_IK_LM2(
+                frames,
+                current_joints,
+                target_pose,
+                max_iter=max_iter,
+                bounded=bounded,
+                objectives=objectives,
+                joint_limits=joint_limits,
             )
-        if method == "GaBO":
-            joints = self._compute_IK_GaBO(
-                frames, target_pose, max_iter=max_iter, opt_dimension=2
+        elif method == "GaBO":
+            solved = self._compute_IK_GaBO(
+                frames,
+                target_pose,
+                max_iter=max_iter,
+                opt_dimension=2,
+                verbose=verbose,
+                **(gabo_options or {}),
+            )
+        else:
+            raise NotImplementedError(
+                "Only analytic, NR, LM, LM2 and GaBO are supported, instead got: {}".format(
+                    method
+                )
             )
-        return joints
+        wall_time = time.perf_counter() - start_time
+
+        if not (verbose or callback is not None or return_result):
+            return solved[0]
+
+        result = IKResult(*solved, wall_time=wall_time)
+        if verbose:
+            print(result)
+        if callback is not None:
+            callback(result)
+        if return_result:
+            return result
+        return result.joints
+
+    def inverse_kinematics_batch(
+        self,
+        frames,
+        target_poses,
+        seeds,
+        method="LM2",
+        max_iter=1000,
+        joint_limits=None,
+    ):
+        """
+        Returns joint angles obtained by computing IK of many targets from many seeds at once
+
+        Args:
+            frames (list): robot's frame for inverse kinematics
+            target_poses (np.array(M, 7) or np.array(M, 4, 4)): goal poses to achieve
+            seeds (np.array(M, K, dof) or np.array(K, dof)): initial joint angles of each target
+            method (str): two methods to calculate IK (LM: Levenberg-marquardt, LM2: scaled Levenberg-marquardt)
+            max_iter (int): Maximum number of calculation iterations
+            joint_limits (tuple): lower and upper joint limits (default: limits of the urdf file)
+
+        Returns:
+            joints (np.array(M, dof)): best target joint angles of each target
+            errors (np.array(M,)): weighted squared pose errors (inf if no seed respects joint limits)
+        """
+        chain = self.get_chain(frames)
+        target_poses = np.asarray(target_poses, dtype=np.float64)
+        if target_poses.shape[-2:] != (4, 4):
+            target_poses = t_utils.get_h_mat_batch(
+                target_poses[..., :3], target_poses[..., 3:]
+            )
+        target_poses = target_poses.reshape(-1, 4, 4)
+        num_targets = len(target_poses)
+
+        seeds = np.asarray(seeds, dtype=np.float64)
+        if seeds.ndim == 2:
+            seeds = np.broadcast_to(seeds, (num_targets,) + seeds.shape)
+        num_seeds = seeds.shape[1]
+
+        if joint_limits is None:
+            lower, upper = chain.lower_limits, chain.upper_limits
+        else:
+            lower, upper = (
+                np.asarray(limit, dtype=np.float64) for limit in joint_limits
+            )
+
+        # every seed of every target is a lane of one stacked solver
+        solver = StackedIKSolver([chain] * (num_targets * num_seeds), method)
+        joints, errors = solver.solve(
+            seeds.reshape(-1, chain.dof),
+            np.repeat(target_poses, num_seeds, axis=0),
+            max_iter,
+        )
+        joints = np.reshape(joints, (num_targets, num_seeds, chain.dof))
+        errors = errors.reshape(num_targets, num_seeds)
+
+        in_limits = np.all((joints >= lower) & (joints <= upper), axis=-1)
+        errors = np.where(in_limits, errors, np.inf)
+        best = np.argmin(errors, axis=-1)
+        return (
+            joints[np.arange(num_targets), best],
+            errors[np.arange(num_targets), best],
+        )
+
+    def inverse_kinematics_stacked(
+        self, frames_list, current_joints, target_poses, method="LM2", max_iter=100
+    ):
+        """
+        Returns joint angles of several chains, like both arms of a bimanual robot,
+        solved together in lockstep
+
+        Args:
+            frames_list (list of list): robot's frames of each chain
+            current_joints (list of sequence of float): input joint angles of each chain
+            target_poses (list of np.array): goal pose of each chain (pose(7,), pose(6,) or h_mat(4, 4))
+            method (str): two methods to calculate IK (LM: Levenberg-marquardt, LM2: scaled Levenberg-marquardt)
+            max_iter (int): Maximum number of calculation iterations
+
+        Returns:
+            joints (list of np.array): target joint angles of each chain
+            errors (np.array(n_chains,)): weighted squared pose errors
+        """
+        solver = self.get_stacked_ik_solver(frames_list, method)
+        return solver.solve(current_joints, target_poses, max_iter)
+
+    def inverse_kinematics_path(
+        self,
+        frames,
+        target_poses,
+        current_joints,
+        method="LM2",
+        max_iter=100,
+        bounded=False,
+    ):
+        """
+        Yields joint angles of waypoints solved in order.
+        Each solve is warm started from the previous solution plus a damped least
+        squares step mapping the change of target pose through the jacobian
+        of the previous solve, so prediction needs no extra forward kinematics.
+        Nothing is kept between waypoints, so arbitrarily long paths can be streamed.
+        The path has an IKSolver of its own, so IK computed between yields
+        does not overwrite its jacobian
+
+        Args:
+            frames (list or Frame()): robot's frame for inverse kinematics
+            target_poses (iterable of np.array): waypoints to achieve (pose(7,), pose(6,) or h_mat(4, 4))
+            current_joints (sequence of float): initial joint angles
+            method (str): two methods to calculate IK (LM: Levenberg-marquardt, LM2: scaled Levenberg-marquardt)
+            max_iter (int): Maximum number of calculation iterations of each waypoint
+            bounded (bool): keep joint angles within joint limits of the urdf file
+
+        Yields:
+            joints (np.array): target joint angles of each waypoint
+        """
+        solver = IKSolver(self.get_chain(frames), method, bounded=bounded)
+        damping = 1e-4 * np.identity(6)
+        joints = np.array(current_joints, dtype=np.float64)
+        previous_pose = None
+        has_jacobian = False
+
+        for target_pose in target_poses:
+            target_pose = np.asarray(target_pose, dtype=np.float64)
+            if target_pose.shape != (4, 4):
+                target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
+
+            seed = joints
+            if has_jacobian:
+                J = solver.J
+                delta = calc_pose_error_batch(target_pose, previous_pose, 1e-12)
+                seed = joints + np.dot(
+                    J.T, np.linalg.solve(np.dot(J, J.T) + damping, delta)
+                )
+
+            joints = solver.solve(seed, target_pose, max_iter)
+            # jacobian is computed only once the solver iterates
+            has_jacobian = has_jacobian or solver.iterations > 0
+            previous_pose = target_pose
+            yield joints
 
     def _compute_FK(self, frames, offset, thetas):
         """
@@ -136,16 +646,20 @@ class Kinematics:
 
         Returns:
             joints (np.array): target joint angles
+            method (str): method used
+            iterations (int): number of calculation iterations
+            error (float): weighted squared pose error
+            converged (bool): whether the error is below tolerance
         """
         lamb = 0.5
         iterator = 1
         EPS = float(1e-6)
-        dof = len(current_joints)
 
         target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
 
-        cur_fk = self.forward_kinematics(frames, current_joints)
-        cur_pose = list(cur_fk.values())[-1].h_mat
+        current_joints = np.array(current_joints, dtype=np.float64)
+        chain = self.get_chain(frames)
+        joint_h_mats, cur_pose = chain.joint_frames(current_joints)
 
         err_pose = calc_pose_error(target_pose, cur_pose, EPS)
         err = np.linalg.norm(err_pose)
@@ -156,22 +670,29 @@ class Kinematics:
             if iterator > max_iter:
                 break
 
-            J = jac.calc_jacobian(frames, cur_fk, len(current_joints))
+            J = chain.jacobian_from_joint_frames(joint_h_mats, cur_pose)
             dq = lamb * np.dot(np.linalg.pinv(J), err_pose)
-            current_joints = [current_joints[i] + dq[i] for i in range(dof)]
-            cur_fk = self.forward_kinematics(frames, current_joints)
-
-            cur_pose = list(cur_fk.values())[-1].h_mat
+            current_joints = current_joints + dq.flatten()
+            joint_h_mats, cur_pose = chain.joint_frames(current_joints)
             err_pose = calc_pose_error(target_pose, cur_pose, EPS)
             err = np.linalg.norm(err_pose)
 
-        print(f"Iterators : {iterator-1}")
         current_joints = np.array(
             [float(current_joint) for current_joint in current_joints]
         )
-        return current_joints
+        Ek = self._get_weighted_error(err_pose.flatten())
+        return current_joints, "NR", iterator - 1, Ek, err <= EPS
 
-    def _compute_IK_LM(self, frames, current_joints, target_pose, max_iter):
+    def _compute_IK_LM(
+        self,
+        frames,
+        current_joints,
+        target_pose,
+        max_iter,
+        bounded=False,
+        objectives=None,
+        joint_limits=None,
+    ):
         """
         Computes inverse kinematics using Levenberg-Marquatdt method
 
@@ -180,60 +701,33 @@ class Kinematics:
             current_joints (sequence of float): input joint angles
             target_pose (np.array): goal pose to achieve
             max_iter (int): Maximum number of calculation iterations
+            bounded (bool): keep joint angles within joint limits of the urdf file
+            objectives (list of NullSpaceObjective): secondary objectives minimized in null space
+            joint_limits (tuple): lower and upper joint limits (default: limits of the urdf file)
 
         Returns:
             joints (np.array): target joint angles
+            method (str): method used
+            iterations (int): number of calculation iterations
+            error (float): weighted squared pose error
+            converged (bool): whether the error is below tolerance
         """
-        print("solve with LM1")
-        iterator = 1
-        EPS = float(1e-12)
-        dof = len(current_joints)
-        wn_pos = 1 / 0.3
-        wn_ang = 1 / (2 * np.pi)
-        We = np.diag([wn_pos, wn_pos, wn_pos, wn_ang, wn_ang, wn_ang])
-        Wn = np.eye(dof)
-
-        target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
-
-        cur_fk = self.forward_kinematics(frames, current_joints)
-        cur_pose = list(cur_fk.values())[-1].h_mat
-
-        err = calc_pose_error(target_pose, cur_pose, EPS)
-        Ek = float(np.dot(np.dot(err.T, We), err)[0])
-
-        while Ek > EPS:
-            iterator += 1
-            if iterator > max_iter:
-                break
-
-            lamb = Ek + 0.002
-
-            J = jac.calc_jacobian(frames, cur_fk, len(current_joints))
-            J_dls = np.dot(np.dot(J.T, We), J) + np.dot(Wn, lamb)
-
-            gerr = np.dot(np.dot(J.T, We), err)
-            dq = np.dot(np.linalg.inv(J_dls), gerr)
-            current_joints = [current_joints[i] + dq[i] for i in range(dof)]
-
-            cur_fk = self.forward_kinematics(frames, current_joints)
-            cur_pose = list(cur_fk.values())[-1].h_mat
-            err = calc_pose_error(target_pose, cur_pose, EPS)
-            Ek2 = float(np.dot(np.dot(err.T, We), err)[0])
-
-            if Ek2 < Ek:
-                Ek = Ek2
-            else:
-                current_joints = [current_joints[i] - dq[i] for i in range(dof)]
-                cur_fk = self.forward_kinematics(frames, current_joints)
-                break
-
-        print(f"Iterators : {iterator-1}")
-        current_joints = np.array(
-            [float(current_joint) for current_joint in current_joints]
+        solver = self.get_ik_solver(
+            frames, method="LM", bounded=bounded, joint_limits=joint_limits
         )
-        return current_joints
+        current_joints = solver.solve(current_joints, target_pose, max_iter, objectives)
+        return current_joints, "LM", solver.iterations, solver.error, solver.converged
 
-    def _compute_IK_LM2(self, frames, current_joints, target_pose, max_iter):
+    def _compute_IK_LM2(
+        self,
+        frames,
+        current_joints,
+        target_pose,
+        max_iter,
+        bounded=False,
+        objectives=None,
+        joint_limits=None,
+    ):
         """
         Computes inverse kinematics using Levenberg-Marquatdt method
 
@@ -242,60 +736,116 @@ class Kinematics:
             current_joints (sequence of float): input joint angles
             target_pose (np.array): goal pose to achieve
             max_iter (int): Maximum number of calculation iterations
+            bounded (bool): keep joint angles within joint limits of the urdf file
+            objectives (list of NullSpaceObjective): secondary objectives minimized in null space
+            joint_limits (tuple): lower and upper joint limits (default: limits of the urdf file)
 
         Returns:
             joints (np.array): target joint angles
+            method (str): method used
+            iterations (int): number of calculation iterations
+            error (float): weighted squared pose error
+            converged (bool): whether the error is below tolerance
         """
-        print("solve the problem using LM2!! ")
-        iterator = 1
-        EPS = float(1e-12)
-        dof = len(current_joints)
-        wn_pos = 1 / 0.3
-        wn_ang = 1 / (2 * np.pi)
-        We = np.diag([wn_pos, wn_pos, wn_pos, wn_ang, wn_ang, wn_ang])
-        Wn = np.eye(dof)
-
-        target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
-
-        cur_fk = self.forward_kinematics(frames, current_joints)
-        cur_pose = list(cur_fk.values())[-1].h_mat
-
-        err = calc_pose_error(target_pose, cur_pose, EPS)
-        Ek = float(np.dot(np.dot(err.T, We), err)[0])
+        solver = self.get_ik_solver(
+            frames, method="LM2", bounded=bounded, joint_limits=joint_limits
+        )
+        current_joints = solver.solve(current_joints, target_pose, max_iter, objectives)
+        return current_joints, "LM2", solver.iterations, solver.error, solver.converged
 
-        while Ek > EPS:
-            iterator += 1
-            if iterator > max_iter:
-                break
+    def _compute_IK_analytic(
+        self,
+        frames,
+        current_joints,
+        target_pose,
+        max_iter,
+        bounded=False,
+        joint_limits=None,
+    ):
+        """
+        Computes inverse kinematics using closed-form solution of registered robots
+        and falls back to LM2 if robot has no closed form or target is out of reach
 
-            lamb = Ek + 0.002
+        Args:
+            frames (list or Frame()): robot's frame for inverse kinematics
+            current_joints (sequence of float): input joint angles
+            target_pose (np.array): goal pose to achieve
+            max_iter (int): Maximum number of calculation iterations of LM2
+            bounded (bool): only return solutions within joint limits
+            joint_limits (tuple): lower and upper joint limits (default: limits of the urdf file)
 
-            J = jac.calc_jacobian(frames, cur_fk, len(current_joints))
+        Returns:
+            joints (np.array): solution branch nearest to current joint angles
+            method (str): method used ("LM2" if fell back)
+            iterations (int): number of calculation iterations (Newton steps refining closed form)
+            error (float): weighted squared pose error
+            converged (bool): whether the error is below tolerance of LM2
+        """
+        solver = self.get_analytic_ik_solver(frames)
+        solutions = solver.solve(target_pose) if solver is not None else []
+        if len(solutions) == 0:
+            return self._compute_IK_LM2(
+                frames,
+                current_joints,
+                target_pose,
+                max_iter,
+                bounded,
+                joint_limits=joint_limits,
+            )
 
-            JT = np.dot(np.dot(J.T, We), J)
-            J_dls = JT + np.dot(np.diag(np.diag(JT)), lamb)
+        current_joints = np.asarray(current_joints, dtype=np.float64)
+        diff = (solutions - current_joints + np.pi) % (2 * np.pi) - np.pi
+        solutions = current_joints + diff
 
-            gerr = np.dot(np.dot(J.T, We), err)
-            dq = np.dot(np.linalg.inv(J_dls), gerr)
-            current_joints = [current_joints[i] + dq[i] for i in range(dof)]
+        if bounded:
+            if joint_limits is None:
+                lower, upper = solver.chain.lower_limits, solver.chain.upper_limits
+            else:
+                lower, upper = (
+                    np.asarray(limit, dtype=np.float64) for limit in joint_limits
+                )
+            solutions = np.where(solutions < lower, solutions + 2 * np.pi, solutions)
+            solutions = np.where(solutions > upper, solutions - 2 * np.pi, solutions)
+            solutions = solutions[
+                np.all((solutions >= lower) & (solutions <= upper), axis=-1)
+            ]
+            if len(solutions) == 0:
+                return self._compute_IK_LM2(
+                    frames,
+                    current_joints,
+                    target_pose,
+                    max_iter,
+                    bounded,
+                    joint_limits=joint_limits,
+                )
+
+        nearest = np.argmin(np.linalg.norm(solutions - current_joints, axis=-1))
+        joints = solutions[nearest]
+        target_pose = np.asarray(target_pose, dtype=np.float64)
+        if target_pose.shape != (4, 4):
+            target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
+        err = calc_pose_error_batch(target_pose, solver.chain.eef_pose(joints), 1e-12)
+        error = self._get_weighted_error(err)
+        eps = self.get_ik_solver(
+            frames, method="LM2", bounded=bounded, joint_limits=joint_limits
+        ).eps
+        return joints, "analytic", solver.iterations, error, error <= eps
 
-            cur_fk = self.forward_kinematics(frames, current_joints)
-            cur_pose = list(cur_fk.values())[-1].h_mat
-            err = calc_pose_error(target_pose, cur_pose, EPS)
-            Ek2 = float(np.dot(np.dot(err.T, We), err)[0])
+    @staticmethod
+    def _get_weighted_error(err):
+        """
+        Returns weighted squared pose error with the weights of LM
 
-            if Ek2 < Ek:
-                Ek = Ek2
-            else:
-                current_joints = [current_joints[i] - dq[i] for i in range(dof)]
-                cur_fk = self.forward_kinematics(frames, current_joints)
-                break
+        Args:
+            err (np.array(6,)): pose error
 
-        print(f"Iterators : {iterator-1}")
-        current_joints = np.array(
-            [float(current_joint) for current_joint in current_joints]
-        )
-        return current_joints
+        Returns:
+            float: weighted squared pose error
+        """
+        wn_pos = 1 / 0.3
+        wn_ang = 1 / (2 * np.pi)
+        We = np.array([wn_pos, wn_pos, wn_pos, wn_ang, wn_ang, wn_ang])
+        return float(np.dot(err * We, err))
 
     def _compute_IK_GaBO(
         self,
@@ -303,18 +853,36 @@ class Kinematics:
         target_pose,
         max_iter,
         opt_dimension,
+        verbose=False,
+        refit_interval=1,
+        refit_threshold=9.0,
+        max_data=None,
+        batch_size=1,
     ):
         """
-        Computes inverse kinematics using Geometric-aware Bayesian Optimization method
+        Computes inverse kinematics using Geometric-aware Bayesian Optimization method.
+        By default hyperparameters are refit every iteration. With refit_interval larger than 1,
+        new observations between refits update the GP with a low rank update
+        of its cached Cholesky factor instead of recomputing it
 
         Args:
             frames (list or Frame()): robot's frame for forward kinematics
             target_pose (np.array): goal pose to achieve
             max_iter (int): Maximum number of bayesian optimization iterations
             opt_dimension (int) : torus dimension to optimize from end-effector frame to backward order (Recommended : 2~3)
+            verbose (bool): print progress of sampling and optimization
+            refit_interval (int): iterations between refits of hyperparameters (default 1: refit every iteration)
+            refit_threshold (float): squared standardized residual of new observation which triggers a refit
+            max_data (int): maximum number of training points, the ones with the largest errors are dropped
+                (default None: unbounded)
+            batch_size (int): candidates evaluated per iteration, chosen by Kriging believer if larger than 1
 
         Returns:
             joints (np.array): target joint angles
+            method (str): method used
+            iterations (int): number of calculation iterations
+            error (float): weighted squared pose error
+            converged (bool): whether the error is below tolerance
         """
         try:
             import torch, gpytorch, botorch, pymanopt
@@ -329,7 +897,10 @@ class Kinematics:
             os._exit(0)
         from botorch.acquisition import ExpectedImprovement
         from pykin.utils.gabo.module.torus import Torus
-        from pykin.utils.gabo.module.manifold_optimize import joint_optimize_manifold
+        from pykin.utils.gabo.module.manifold_optimize import (
+            joint_optimize_manifold,
+            kriging_believer_optimize_manifold,
+        )
         from pykin.utils.error_utils import BimanualTypeError
         import pykin.utils.gabo.gabo_util as g_util
 
@@ -343,13 +914,11 @@ class Kinematics:
             device = "cpu"
         torch.set_default_dtype(torch.float32)
 
-        # Define pose error objective function
-        def get_pose_error(target_pose, cur_point):
-            cur_angle = g_util.convert_point_to_angle_torch(cur_point)
-            cur_fk = self.forward_kinematics(frames, cur_angle)
-            cur_pose = list(cur_fk.values())[-1].h_mat
-            err = calc_pose_error(target_pose, cur_pose, EPS)
-            return np.linalg.norm(err)
+        # Define pose error objective function of a batch of joint angles
+        def get_pose_errors(target_pose, cur_angles):
+            cur_poses = self.eef_pose(frames, cur_angles)
+            err = calc_pose_error_batch(target_pose, cur_poses, EPS)
+            return np.linalg.norm(err, axis=-1)
 
         target_pose = t_utils.get_h_mat(target_pose[:3], target_pose[3:])
 
@@ -357,68 +926,70 @@ class Kinematics:
         opt_dimension = opt_dimension
         robot_dimension = len(self.active_joint_names)
         nb_data_init = 10000
+        max_nb_data_init = 4 * nb_data_init
         nb_iter_bo = max_iter
         enough_sample = 4
         EPS = float(1e-6)
 
         # Define torus manifold
         opt_manifold = Torus(dimension=opt_dimension)
-        robot_manifold = Torus(dimension=robot_dimension)
 
         # Get initial x data batches
-        print("Start Pose Random Sampling")
-        scaled_x = []
+        if verbose:
+            print("Start Pose Random Sampling")
+        scaled_angles = []
         scaled_y = []
+        nb_collected = 0
+        nb_samples = nb_data_init
 
         while True:
-            x_init = np.array(
-                [
-                    np.array(robot_manifold.rand()).reshape(2 * robot_dimension)
-                    for n in range(nb_data_init)
-                ]
-            )
-            x_data = torch.tensor(x_init)
-            y_data = torch.zeros(nb_data_init, dtype=torch.float64)
-
-            for n in range(nb_data_init):
-                err = get_pose_error(target_pose, cur_point=x_data[n])
-                y_data[n] = err
-
-            for idx, data in enumerate(y_data):
-                if data < 0.4:
-                    scaled_y.append(y_data[idx])
-                    scaled_x.append(x_data[idx])
-
-            if len(scaled_y) > enough_sample:
+            angles = g_util.sample_torus_angles(nb_samples, robot_dimension)
+            errors = get_pose_errors(target_pose, angles)
+            is_close = errors < 0.4
+            scaled_angles.append(angles[is_close])
+            scaled_y.append(errors[is_close])
+            nb_collected += np.count_nonzero(is_close)
+
+            if nb_collected > enough_sample:
                 break
-            print(f"\tNot enough samples.. Resampling ({len(scaled_y)} collected)")
-
-        x_data = torch.stack(scaled_x, 0)
-        y_data = torch.stack(scaled_y, 0)
-        reduced_x_data = x_data[:, -opt_dimension * 2 :]
-        print(f"Sampling Done : Collected proper samples {y_data.shape[0]}")
 
-        # Initialize best observation and function value list
-        new_best_f, index = y_data.min(0)
-        best_x = [x_data[index]]
-        best_f = [new_best_f]
-
-        # Adjust x, y data to new data format
-        determined_joint = best_x[0][: -opt_dimension * 2]
-        x_data = reduced_x_data
-
-        for n in range(y_data.shape[0]):
-            adjusted_x = torch.cat([determined_joint, x_data[n]])
-            err = get_pose_error(target_pose, cur_point=adjusted_x)
-            y_data[n] = err
-
-        # Re-calculate best observation
+            # Size the next batch from the rate of close samples so far
+            rate = max(nb_collected, 1) / nb_samples
+            nb_samples = int(
+                np.clip(
+                    2 * (enough_sample + 1 - nb_collected) / rate,
+                    nb_data_init,
+                    max_nb_data_init,
+                )
+            )
+            if verbose:
+                print(f"\tNot enough samples.. Resampling ({nb_collected} collected)")
+
+        angles = np.concatenate(scaled_angles)
+        y_data = torch.tensor(np.concatenate(scaled_y))
+        if verbose:
+            print(f"Sampling Done : Collected proper samples {y_data.shape[0]}")
+
+        # Fix joints out of torus to those of the best sample
+        index = np.argmin(y_data.numpy())
+        determined_angle = angles[index, :-opt_dimension].copy()
+        angles[:, :-opt_dimension] = determined_angle
+        y_data = torch.tensor(get_pose_errors(target_pose, angles))
+        x_data = g_util.convert_angle_to_point_torch(angles[:, -opt_dimension:])
+        determined_joint = g_util.convert_angle_to_point_torch(determined_angle)
+
+        # Calculate best observation
         new_best_f, index = y_data.min(0)
         best_x = [x_data[index]]
         best_f = [new_best_f]
-        print(f"Initial best guess of error {best_f[0]}")
+        if verbose:
+            print(f"Initial best guess of error {best_f[0]}")
 
         determined_joint = determined_joint.to(device)
+        torch_kin = self.get_torch_kinematics(frames, device=device)
+        target_pose_tensor = torch.as_tensor(
+            target_pose, dtype=torch_kin.dtype, device=device
+        )
         x_data = x_data.to(device)
         y_data = y_data.to(device)
 
@@ -428,38 +999,69 @@ class Kinematics:
         )
 
         # BO loop
-        print("\n== Start optimization process ==")
+        if verbose:
+            print("\n== Start optimization process ==")
+        need_refit = True
+        last_refit = 0
         for iteration in range(nb_iter_bo):
             # Fit GP model
-            botorch.fit_gpytorch_model(mll=mll_fct)
-
-            # Define the acquisition function
-            acq_fct = ExpectedImprovement(
-                model=model, best_f=best_f[-1], maximize=False
-            )
-            acq_fct.to(device)
-
-            # Get new candidate
-            new_x = joint_optimize_manifold(
-                acq_fct,
-                opt_manifold,
-                solver,
-                q=1,
-                num_restarts=5,
-                raw_samples=100,
-                bounds=bounds,
-                pre_processing_manifold=None,
-                post_processing_manifold=None,
-                approx_hessian=False,
-                inequality_constraints=constraints,
+            if need_refit or iteration - last_refit >= refit_interval:
+                botorch.fit_gpytorch_model(mll=mll_fct)
+                need_refit = False
+                last_refit = iteration
+
+            # Get new candidates
+            if batch_size > 1:
+                new_x = kriging_believer_optimize_manifold(
+                    model,
+                    best_f[-1],
+                    opt_manifold,
+                    solver,
+                    q=batch_size,
+                    num_restarts=5,
+                    raw_samples=100,
+                    bounds=bounds,
+                    pre_processing_manifold=None,
+                    post_processing_manifold=None,
+                    approx_hessian=False,
+                    inequality_constraints=constraints,
+                )
+            else:
+                # Define the acquisition function
+                acq_fct = ExpectedImprovement(
+                    model=model, best_f=best_f[-1], maximize=False
+                )
+                acq_fct.to(device)
+
+                new_x = joint_optimize_manifold(
+                    acq_fct,
+                    opt_manifold,
+                    solver,
+                    q=1,
+                    num_restarts=5,
+                    raw_samples=100,
+                    bounds=bounds,
+                    pre_processing_manifold=None,
+                    post_processing_manifold=None,
+                    approx_hessian=False,
+                    inequality_constraints=constraints,
+                )
+
+            new_x_cat = torch.cat(
+                [determined_joint.expand(new_x.shape[0], -1), new_x], dim=-1
             )
 
-            new_x_cat = torch.cat([determined_joint, new_x[0]])
+            # Get new observations in one batch without leaving torch
+            new_angle = g_util.convert_point_to_angle_torch(new_x_cat)
+            new_err = torch_kin.pose_error(
+                target_pose_tensor, new_angle.to(torch_kin.dtype), EPS
+            )
+            new_y = torch.linalg.norm(new_err, dim=-1)
 
-            # Get new observation
-            err = get_pose_error(target_pose, cur_point=new_x_cat)
-            new_y = torch.tensor(err)[None]
-            new_y = new_y.to(device)
+            # Refit when new observations are unlikely under the current model
+            residual = g_util.get_standardized_residual(model, new_x, new_y)
+            if residual > refit_threshold:
+                need_refit = True
 
             # Update training points
             x_data = torch.cat((x_data, new_x))
@@ -471,16 +1073,28 @@ class Kinematics:
             best_f.append(new_best_f)
 
             # Update the model
-            model.set_train_data(
-                x_data, y_data, strict=False
-            )  # strict False necessary to add datapoints
-            print(
-                "Iteration "
-                + str(iteration)
-                + "\t Best error "
-                + str(new_best_f.item())
-            )
-            print(f"\t>> New error : {new_y.item()}")
+            if max_data is not None and y_data.shape[0] > max_data:
+                x_data, y_data = g_util.select_informative_data(
+                    x_data, y_data, max_data
+                )
+                model.set_train_data(
+                    x_data, y_data, strict=False
+                )  # strict False necessary to add datapoints
+            elif refit_interval > 1:
+                model = g_util.update_gp_model(model, new_x, new_y)
+                mll_fct = gpytorch.mlls.ExactMarginalLogLikelihood(
+                    model.likelihood, model
+                )
+            else:
+                model.set_train_data(x_data, y_data, strict=False)
+            if verbose:
+                print(
+                    "Iteration "
+                    + str(iteration)
+                    + "\t Best error "
+                    + str(new_best_f.item())
+                )
+                print(f"\t>> New error : {new_y.min().item()}")
 
             if new_best_f.item() < 0.2:
                 break
@@ -489,7 +1103,15 @@ class Kinematics:
         joint_point = torch.cat([determined_joint, best_x[-1]])
         joint_angle = g_util.convert_point_to_angle_torch(joint_point)
 
-        return joint_angle
+        cur_fk = self.forward_kinematics(frames, joint_angle)
+        err = calc_pose_error(target_pose, list(cur_fk.values())[-1].h_mat, EPS)
+        return (
+            joint_angle,
+            "GaBO",
+            len(best_f) - 1,
+            self._get_weighted_error(err.flatten()),
+            best_f[-1].item() < 0.2,
+        )
 
 
 class Baxter:
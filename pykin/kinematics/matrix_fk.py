@@ -0,0 +1,204 @@
+import numpy as np
+from collections.abc import Mapping
+
+from pykin.kinematics.transform import Transform
+
+
+class LinkPoses(Mapping):
+    """
+    Class of LinkPoses
+    Read-only mapping of link name to link pose.
+    Transforms are only produced when they are asked for.
+
+    Args:
+        chain (CompiledChain): compiled chain
+        h_mats (np.array(num_links, 4, 4)): homogeneous matrices of links
+    """
+
+    def __init__(self, chain, h_mats):
+        self.chain = chain
+        self.h_mats = h_mats
+
+    def __repr__(self):
+        return "pykin.kinematics.matrix_fk.{}()".format(type(self).__name__)
+
+    def __getitem__(self, link_name):
+        return Transform.from_h_mat(self.h_mats[self.chain.link_index[link_name]])
+
+    def __iter__(self):
+        return iter(self.chain.link_names)
+
+    def __len__(self):
+        return self.chain.num_links
+
+    def h_mat(self, link_name):
+        """
+        Args:
+            link_name (str): link's name
+
+        Returns:
+            np.array: homogeneous matrix of link (view, not copied)
+        """
+        return self.h_mats[self.chain.link_index[link_name]]
+
+    def copy(self):
+        """
+        Returns:
+            LinkPoses: link poses which are not overwritten by next computation
+        """
+        return LinkPoses(self.chain, self.h_mats.copy())
+
+
+class MatrixForwardKinematics:
+    """
+    Class of MatrixForwardKinematics
+    Computes link poses of a compiled chain into preallocated homogeneous matrices
+
+    Args:
+        chain (CompiledChain): compiled chain
+    """
+
+    def __init__(self, chain):
+        self.chain = chain
+        n = chain.num_links
+
+        self._parents = [int(parent) for parent in chain.parents]
+        self._q = np.zeros(n)
+        self._sin = np.zeros((n, 1, 1))
+        self._versine = np.zeros((n, 1, 1))
+        self._rot = np.zeros((n, 3, 3))
+        self._motion = np.tile(np.identity(4), (n, 1, 1))
+        self._local = np.zeros((n, 4, 4))
+
+        self.h_mats = np.zeros((n, 4, 4))
+        self.poses = LinkPoses(chain, self.h_mats)
+
+    def __repr__(self):
+        return "pykin.kinematics.matrix_fk.{}()".format(type(self).__name__)
+
+    def compute(self, thetas):
+        """
+        Computes link poses in place
+
+        Args:
+            thetas (np.array(dof,)): input joint angles
+
+        Returns:
+            poses (LinkPoses): link poses (overwritten by the next computation)
+        """
+        self._update_local(thetas)
+        self._compose(range(self.chain.num_links))
+        return self.poses
+
+    def _update_local(self, thetas):
+        """
+        Updates homogeneous matrices of links with respect to their parents
+
+        Args:
+            thetas (np.array(dof,)): input joint angles
+        """
+        chain = self.chain
+        np.take(np.asarray(thetas, dtype=np.float64), chain.theta_columns, out=self._q)
+        self._q *= chain.actuated_mask
+
+        np.sin(self._q, out=self._sin[:, 0, 0])
+        np.cos(self._q, out=self._versine[:, 0, 0])
+        np.subtract(1.0, self._versine, out=self._versine)
+
+        rot = self._motion[:, :3, :3]
+        np.multiply(chain.skew_axes, self._sin, out=rot)
+        np.multiply(chain.skew_axes_squared, self._versine, out=self._rot)
+        rot += self._rot
+        rot += np.identity(3)
+        np.multiply(
+            chain.translation_axes, self._q[:, None], out=self._motion[:, :3, 3]
+        )
+        np.matmul(chain.offsets, self._motion, out=self._local)
+
+    def _compose(self, indices):
+        """
+        Composes local homogeneous matrices from parent to child
+
+        Args:
+            indices (range or list): indices of links to compose in depth-first order
+        """
+        for i in indices:
+            parent = self._parents[i]
+            if parent < 0:
+                np.matmul(self.chain.base, self._local[i], out=self.h_mats[i])
+            else:
+                np.matmul(self.h_mats[parent], self._local[i], out=self.h_mats[i])
+
+
+class IncrementalForwardKinematics(MatrixForwardKinematics):
+    """
+    Class of IncrementalForwardKinematics
+    Caches the last joint angles and link poses,
+    and recomputes only the links below joints whose angle changed
+
+    Args:
+        chain (CompiledChain): compiled chain
+    """
+
+    def __init__(self, chain):
+        super().__init__(chain)
+        self._thetas = None
+        self.changed_indices = np.arange(chain.num_links)
+
+    def compute(self, thetas):
+        """
+        Computes link poses in place
+
+        Args:
+            thetas (np.array(dof,)): input joint angles
+
+        Returns:
+            poses (LinkPoses): link poses (overwritten by the next computation)
+        """
+        thetas = np.array(thetas, dtype=np.float64)
+        if self._thetas is None or self._thetas.shape != thetas.shape:
+            self.changed_indices = np.arange(self.chain.num_links)
+            self._thetas = thetas
+            return super().compute(thetas)
+
+        changed_columns = np.flatnonzero(thetas != self._thetas)
+        self._thetas = thetas
+        if len(changed_columns) == 0:
+            self.changed_indices = np.arange(0)
+            return self.poses
+
+        changed_links = np.flatnonzero(
+            np.isin(self.chain.theta_indices, changed_columns)
+        )
+        self._update_local_links(thetas, changed_links)
+
+        is_changed = np.zeros(self.chain.num_links, dtype=bool)
+        for i in changed_links:
+            is_changed[i : self.chain.subtree_end[i]] = True
+        self.changed_indices = np.flatnonzero(is_changed)
+        self._compose(self.changed_indices)
+        return self.poses
+
+    def reset(self):
+        """
+        Forgets the cached joint angles so that the next computation updates all links
+        """
+        self._thetas = None
+
+    @property
+    def changed_link_names(self):
+        """
+        Returns:
+            list: names of links updated by the last computation
+        """
+        return [self.chain.link_names[i] for i in self.changed_indices]
+
+    def _update_local_links(self, thetas, links):
+        """
+        Updates homogeneous matrices of given links with respect to their parents
+
+        Args:
+            thetas (np.array(dof,)): input joint angles
+            links (np.array): indices of links to update
+        """
+        self._local[links] = self.chain.get_local_h_mats(thetas, links)
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+class NullSpaceObjective:
+    """
+    Class of NullSpaceObjective
+    Secondary objective of redundant robots minimized by IKSolver in the null space
+    of the jacobian. Subclasses return the gradient of their cost in joint space
+
+    Args:
+        gain (float): scale of gradient
+    """
+
+    def __init__(self, gain=1.0):
+        self.gain = gain
+
+    def __repr__(self):
+        return "pykin.kinematics.null_space.{}()".format(type(self).__name__)
+
+    def __call__(self, solver, thetas):
+        return self.gain * self.gradient(solver, thetas)
+
+    def gradient(self, solver, thetas):
+        """
+        Returns gradient of cost
+
+        Args:
+            solver (IKSolver): solver whose jacobian is computed at thetas
+            thetas (np.array(dof,)): joint angles
+
+        Returns:
+            np.array(dof,): gradient of cost
+        """
+        raise NotImplementedError
+
+
+class JointCentering(NullSpaceObjective):
+    """
+    Class of JointCentering
+    Keeps joints near the middle of their limits,
+    cost is sum(((q - middle) / half_range) ** 2) / 2 over joints with finite limits
+
+    Args:
+        gain (float): scale of gradient
+        lower (np.array(dof,)): lower joint limits (default: limits of solver's chain)
+        upper (np.array(dof,)): upper joint limits (default: limits of solver's chain)
+    """
+
+    def __init__(self, gain=1.0, lower=None, upper=None):
+        super().__init__(gain)
+        self.lower = lower
+        self.upper = upper
+
+    def gradient(self, solver, thetas):
+        lower = solver.chain.lower_limits if self.lower is None else self.lower
+        upper = solver.chain.upper_limits if self.upper is None else self.upper
+        is_limited = np.isfinite(lower) & np.isfinite(upper)
+
+        gradient = np.zeros_like(thetas)
+        middle = (lower[is_limited] + upper[is_limited]) / 2
+        half_range = (upper[is_limited] - lower[is_limited]) / 2
+        gradient[is_limited] = (thetas[is_limited] - middle) / half_range**2
+        return gradient
+
+
+class Manipulability(NullSpaceObjective):
+    """
+    Class of Manipulability
+    Moves away from singularities by maximizing Yoshikawa's manipulability
+    w = sqrt(det(J * J^T)), cost is -log(w) whose gradient
+    -trace((J * J^T)^-1 * J * H_j^T) reuses the jacobian of the solver
+
+    Args:
+        gain (float): scale of gradient
+        damping (float): damping of J * J^T near singularities
+    """
+
+    def __init__(self, gain=1.0, damping=1e-6):
+        super().__init__(gain)
+        self.damping = damping
+
+    def gradient(self, solver, thetas):
+        J = solver.J
+        H = solver.get_hessian()
+        A = np.linalg.solve(np.dot(J, J.T) + self.damping * np.identity(6), J)
+        return -np.einsum("ik,jik->j", A, H)
+
+
+class ObstacleAvoidance(NullSpaceObjective):
+    """
+    Class of ObstacleAvoidance
+    Keeps clearance from obstacles above influence distance,
+    cost is (influence - distance) ** 2 / 2 while distance is below influence
+
+    Args:
+        distance (callable): returns clearance [m] of joint angles, e.g. from a collision checker
+        distance_gradient (callable): returns gradient of clearance (default: central differences)
+        influence (float): clearance [m] above which obstacles are ignored
+        gain (float): scale of gradient
+        delta (float): step [rad] of central differences
+    """
+
+    def __init__(
+        self, distance, distance_gradient=None, influence=0.1, gain=1.0, delta=1e-6
+    ):
+        super().__init__(gain)
+        self.distance = distance
+        self.distance_gradient = distance_gradient
+        self.influence = influence
+        self.delta = delta
+
+    def gradient(self, solver, thetas):
+        penetration = self.influence - self.distance(thetas)
+        if penetration <= 0:
+            return np.zeros_like(thetas)
+
+        if self.distance_gradient is not None:
+            distance_gradient = np.asarray(self.distance_gradient(thetas))
+        else:
+            distance_gradient = np.zeros_like(thetas)
+            for i in range(len(thetas)):
+                step = np.zeros_like(thetas)
+                step[i] = self.delta
+                distance_gradient[i] = (
+                    self.distance(thetas + step) - self.distance(thetas - step)
+                ) / (2 * self.delta)
+        return -penetration * distance_gradient
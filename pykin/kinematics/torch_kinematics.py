@@ -0,0 +1,223 @@
+import numpy as np
+import torch
+
+
+class TorchKinematics:
+    """
+    Class of TorchKinematics
+    Torch backend of CompiledChain computing fk, jacobian and pose error
+    for batches of joint angle tensors.
+    Every output is built from differentiable torch ops, so optimizers working on tensors
+    (e.g. acquisition function of GaBO) get exact gradients from autograd
+    without converting to numpy
+
+    Args:
+        chain (CompiledChain): compiled chain
+        dtype (torch.dtype): dtype of tensors
+        device (str or torch.device): device of tensors
+    """
+
+    def __init__(self, chain, dtype=torch.float64, device="cpu"):
+        self.chain = chain
+        self.dtype = dtype
+        self.device = device
+        self.dof = chain.dof
+
+        self.base = self._to_tensor(chain.base)
+        self.offsets = self._to_tensor(chain.offsets)
+        self.skew_axes = self._to_tensor(chain.skew_axes)
+        self.skew_axes_squared = self._to_tensor(chain.skew_axes_squared)
+        self.translation_axes = self._to_tensor(chain.translation_axes)
+        self.actuated_mask = self._to_tensor(chain.actuated_mask)
+        self.theta_columns = torch.as_tensor(chain.theta_columns, device=device)
+        self.parents = chain.parents.tolist()
+
+        self.eef_path = torch.as_tensor(chain.eef_path, device=device)
+        self._eef_path_is_joint = (chain.theta_indices[chain.eef_path] >= 0).tolist()
+        joints = chain.eef_joint_indices
+        self._joint_columns = torch.as_tensor(
+            chain.theta_indices[joints], device=device
+        )
+        self._revolute_axes = self._to_tensor(
+            np.where(chain.revolute_mask[joints, None], chain.axes[joints], 0.0)
+        )
+        self._prismatic_axes = self._to_tensor(chain.translation_axes[joints])
+
+        wn_pos = 1 / 0.3
+        wn_ang = 1 / (2 * np.pi)
+        self.We = self._to_tensor([wn_pos, wn_pos, wn_pos, wn_ang, wn_ang, wn_ang])
+
+        self._identity = torch.eye(3, dtype=dtype, device=device)
+        self._bottom = self._to_tensor([0.0, 0.0, 0.0, 1.0])
+
+    def __repr__(self):
+        return "pykin.kinematics.torch_kinematics.{}()".format(type(self).__name__)
+
+    def _to_tensor(self, array):
+        return torch.as_tensor(
+            np.asarray(array, dtype=np.float64), dtype=self.dtype, device=self.device
+        )
+
+    def get_local_h_mats(self, thetas, links=slice(None)):
+        """
+        Returns homogeneous matrices of each link with respect to its parent
+
+        Args:
+            thetas (tensor(..., dof)): input joint angles
+            links (slice or tensor): indices of links
+
+        Returns:
+            tensor(..., num_links, 4, 4): local homogeneous matrices
+        """
+        q = thetas[..., self.theta_columns[links]] * self.actuated_mask[links]
+        s = torch.sin(q)[..., None, None]
+        v = (1.0 - torch.cos(q))[..., None, None]
+        rot = (
+            self._identity
+            + s * self.skew_axes[links]
+            + v * self.skew_axes_squared[links]
+        )
+        trans = q[..., None] * self.translation_axes[links]
+        top = torch.cat((rot, trans[..., None]), dim=-1)
+        bottom = self._bottom.expand(top.shape[:-2] + (1, 4))
+        motion = torch.cat((top, bottom), dim=-2)
+        return torch.matmul(self.offsets[links], motion)
+
+    def forward_kinematics(self, thetas):
+        """
+        Returns homogeneous matrices of all links
+
+        Args:
+            thetas (tensor(..., dof)): input joint angles
+
+        Returns:
+            tensor(..., num_links, 4, 4): link poses ordered as links of chain
+        """
+        local = self.get_local_h_mats(thetas)
+        poses = []
+        for i, parent in enumerate(self.parents):
+            parent_pose = self.base if parent < 0 else poses[parent]
+            poses.append(torch.matmul(parent_pose, local[..., i, :, :]))
+        return torch.stack(poses, dim=-3)
+
+    def eef_pose(self, thetas):
+        """
+        Returns homogeneous matrix of end effector (last link)
+        without computing the other link poses
+
+        Args:
+            thetas (tensor(..., dof)): input joint angles
+
+        Returns:
+            tensor(..., 4, 4): end effector's pose
+        """
+        local = self.get_local_h_mats(thetas, self.eef_path)
+        pose = self.base
+        for i in range(local.shape[-3]):
+            pose = torch.matmul(pose, local[..., i, :, :])
+        return pose.expand(thetas.shape[:-1] + (4, 4))
+
+    def jacobian(self, thetas):
+        """
+        Returns jacobian of end effector (same as CompiledChain.jacobian)
+
+        Args:
+            thetas (tensor(..., dof)): input joint angles
+
+        Returns:
+            J (tensor(..., 6, dof)): jacobian
+            eef_pose (tensor(..., 4, 4)): end effector's pose
+        """
+        local = self.get_local_h_mats(thetas, self.eef_path)
+        pose = self.base
+        joint_h_mats = []
+        for i, is_joint in enumerate(self._eef_path_is_joint):
+            pose = torch.matmul(pose, local[..., i, :, :])
+            if is_joint:
+                joint_h_mats.append(pose)
+        joint_h_mats = torch.stack(joint_h_mats, dim=-3)
+
+        rotations = joint_h_mats[..., :3, :3]
+        angular = torch.matmul(rotations, self._revolute_axes[..., None])[..., 0]
+        linear = torch.matmul(rotations, self._prismatic_axes[..., None])[..., 0]
+        distance = pose[..., None, :3, 3] - joint_h_mats[..., :3, 3]
+        linear = linear + torch.linalg.cross(angular, distance, dim=-1)
+
+        jac = torch.cat((linear, angular), dim=-1).transpose(-1, -2)
+        J = jac.new_zeros(jac.shape[:-1] + (self.dof,))
+        return J.index_add(-1, self._joint_columns, jac), pose
+
+    def pose_error(self, target_pose, thetas, eps=1e-12):
+        """
+        Returns pose error between target pose and end effector
+        (same as calc_pose_error_batch), whose gradient is finite at zero error
+
+        Args:
+            target_pose (tensor(..., 4, 4)): target poses
+            thetas (tensor(..., dof)): input joint angles
+            eps (float): epsilon
+
+        Returns:
+            tensor(..., 6): pose errors
+        """
+        cur_pose = self.eef_pose(thetas)
+        return self.calc_pose_error(target_pose, cur_pose, eps)
+
+    def weighted_error(self, target_pose, thetas, eps=1e-12):
+        """
+        Returns weighted squared pose error used by LM methods
+
+        Args:
+            target_pose (tensor(..., 4, 4)): target poses
+            thetas (tensor(..., dof)): input joint angles
+            eps (float): epsilon
+
+        Returns:
+            tensor(...): weighted squared pose errors
+        """
+        err = self.pose_error(target_pose, thetas, eps)
+        return torch.sum(err * err * self.We, dim=-1)
+
+    @staticmethod
+    def calc_pose_error(tar_pose, cur_pose, eps=1e-12):
+        """
+        Returns pose errors of torch tensors (same as calc_pose_error_batch)
+
+        Args:
+            tar_pose (tensor(..., 4, 4)): target poses
+            cur_pose (tensor(..., 4, 4)): current poses
+            eps (float): epsilon
+
+        Returns:
+            tensor(..., 6): pose errors
+        """
+        pos_err = tar_pose[..., :3, 3] - cur_pose[..., :3, 3]
+        cur_rot = cur_pose[..., :3, :3]
+        R = torch.matmul(cur_rot.transpose(-1, -2), tar_pose[..., :3, :3])
+
+        el = torch.stack(
+            (
+                R[..., 2, 1] - R[..., 1, 2],
+                R[..., 0, 2] - R[..., 2, 0],
+                R[..., 1, 0] - R[..., 0, 1],
+            ),
+            dim=-1,
+        )
+        diagonal = torch.diagonal(R, dim1=-2, dim2=-1)
+        squared_norm = torch.sum(el * el, dim=-1)
+        is_rotated = squared_norm > eps * eps
+        # avoid sqrt of zero, whose gradient would be nan
+        norm_el = torch.sqrt(torch.where(is_rotated, squared_norm, 1.0))
+        scale = torch.atan2(norm_el, torch.sum(diagonal, dim=-1) - 1) / norm_el
+        is_identity = torch.all(diagonal > 0, dim=-1)
+        omega = torch.where(
+            is_rotated[..., None],
+            scale[..., None] * el,
+            torch.where(
+                is_identity[..., None],
+                torch.zeros_like(el),
+                np.pi / 2 * (diagonal + 1),
+            ),
+        )
+        w_err = torch.matmul(cur_rot, omega[..., None])[..., 0]
+        return torch.cat((pos_err, w_err), dim=-1)
@@ -32,6 +32,22 @@ class Transform:
         self.pos = self._to_pos(pos)
         self.rot = self._to_quaternion(rot)
 
+    @classmethod
+    def from_h_mat(cls, h_mat):
+        """
+        Args:
+            h_mat (np.array): homogeneous matrix
+
+        Returns:
+            Transform : transform whose homogeneous matrix is h_mat
+        """
+        h_mat = np.array(h_mat, dtype=np.float64)
+        transform = cls(
+            pos=h_mat[:3, 3], rot=t_utils.get_quaternion_from_matrix(h_mat[:3, :3])
+        )
+        transform._h_mat = h_mat
+        return transform
+
     def __str__(self):
         return f"Transform({sc.MAGENTA}pos{sc.ENDC}={self.pos}, {sc.MAGENTA}rot{sc.ENDC}={ self.rot})"
 
@@ -63,6 +79,7 @@ class Transform:
     @pos.setter
     def pos(self, pos):
         self._pos = self._to_pos(pos)
+        self._h_mat = None
 
     @property
     def rot(self):
@@ -75,6 +92,7 @@ class Transform:
     @rot.setter
     def rot(self, rot):
         self._rot = self._to_quaternion(rot)
+        self._h_mat = None
 
     @property
     def pose(self):
@@ -98,9 +116,10 @@ class Transform:
         Returns:
             np.array: homogeneous matrix
         """
-        mat = t_utils.get_h_mat_from_quaternion(self.rot)
-        mat[:3, 3] = self.pos
-        return mat
+        if self._h_mat is None:
+            self._h_mat = t_utils.get_h_mat_from_quaternion(self.rot)
+            self._h_mat[:3, 3] = self.pos
+        return self._h_mat.copy()
 
     @staticmethod
     def _to_rotation_vec(rot, vec):
@@ -39,13 +39,11 @@ class Bimanual(Robot):
         self.joint_limits_upper = self._input2dict(None)
 
     def set_transform(self, thetas):
-        fk = self.forward_kin(thetas)
-        for link, transform in fk.items():
-
-            collision_h_mat = np.dot(
-                transform.h_mat, self.links[link].collision.offset.h_mat
-            )
-            visual_h_mat = np.dot(transform.h_mat, self.links[link].visual.offset.h_mat)
+        fk = self.forward_kin_incremental(thetas)
+        for link in self.incremental_fk.changed_link_names:
+            h_mat = fk.h_mat(link)
+            collision_h_mat = np.dot(h_mat, self.links[link].collision.offset.h_mat)
+            visual_h_mat = np.dot(h_mat, self.links[link].visual.offset.h_mat)
 
             self.info["collision"][link][3] = collision_h_mat
             self.info["visual"][link][3] = visual_h_mat
@@ -140,37 +138,52 @@ class Bimanual(Robot):
 
     def inverse_kin(self, current_joints, target_pose, method="LM", max_iter=100):
         """
-        Returns joint angles obtained by computing IK
+        Returns joint angles obtained by computing IK.
+        With LM and LM2 both arms are solved together in lockstep,
+        so both arms cost about as much as one arm
 
         Args:
-            current_joints (sequence of float): input joint angles
-            target_pose (np.array): goal pose to achieve
+            current_joints (sequence of float or dict): input joint angles (of each arm if dict)
+            target_pose (dict): goal pose of each arm to achieve
             method (str): two methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson)
             max_iter (int): Maximum number of calculation iterations
 
         Returns:
-            joints (np.array): target joint angles
+            joints (dict): target joint angles of each arm
         """
         if not isinstance(target_pose, dict):
             raise TypeError("Be sure to input the target pose in dictionary form.")
 
-        joints = {}
-        self._frames = self._input2dict(None)
-        self._revolute_joint_names = self._input2dict(None)
-        for arm in target_pose.keys():
-            if self.eef_name[arm]:
-                self._set_desired_frame(arm)
-                self._target_pose[arm] = self._convert_target_pose_type_to_npy(
-                    target_pose[arm]
-                )
+        arms = [arm for arm in target_pose.keys() if self.eef_name[arm]]
+        for arm in arms:
+            self._target_pose[arm] = self._convert_target_pose_type_to_npy(
+                target_pose[arm]
+            )
 
-                joints[arm] = self.kin.inverse_kinematics(
-                    self._frames[arm],
-                    current_joints,
-                    self._target_pose[arm],
-                    method,
-                    max_iter,
-                )
+        if isinstance(current_joints, dict):
+            init_joints = [current_joints[arm] for arm in arms]
+        else:
+            init_joints = [current_joints for _ in arms]
+
+        if method in ("LM", "LM2") and len(arms) > 1:
+            results, _ = self.kin.inverse_kinematics_stacked(
+                [self.desired_frames[arm] for arm in arms],
+                init_joints,
+                [self._target_pose[arm] for arm in arms],
+                method,
+                max_iter,
+            )
+            return dict(zip(arms, results))
+
+        joints = {}
+        for arm, init_joint in zip(arms, init_joints):
+            joints[arm] = self.kin.inverse_kinematics(
+                self.desired_frames[arm],
+                init_joint,
+                self._target_pose[arm],
+                method,
+                max_iter,
+            )
         return joints
 
     def _convert_target_pose_type_to_npy(self, value):
@@ -14,6 +14,7 @@ signal.signal(signal.SIGINT, handler)
 from pykin.robots.gripper import PandaGripper, Robotiq140Gripper, JacoHandGripper
 from pykin.kinematics.transform import Transform
 from pykin.kinematics.kinematics import Kinematics
+from pykin.kinematics.matrix_fk import IncrementalForwardKinematics
 from pykin.models.urdf_model import URDFModel
 from pykin.utils.transform_utils import compute_pose_error
 
@@ -66,12 +67,11 @@ class Robot(URDFModel):
         return "pykin.robot.{}()".format(type(self).__name__)
 
     def set_transform(self, thetas):
-        fk = self.forward_kin(thetas)
-        for link, transform in fk.items():
-            collision_h_mat = np.dot(
-                transform.h_mat, self.links[link].collision.offset.h_mat
-            )
-            visual_h_mat = np.dot(transform.h_mat, self.links[link].visual.offset.h_mat)
+        fk = self.forward_kin_incremental(thetas)
+        for link in self.incremental_fk.changed_link_names:
+            h_mat = fk.h_mat(link)
+            collision_h_mat = np.dot(h_mat, self.links[link].collision.offset.h_mat)
+            visual_h_mat = np.dot(h_mat, self.links[link].visual.offset.h_mat)
 
             self.info["collision"][link][3] = collision_h_mat
             self.info["visual"][link][3] = visual_h_mat
@@ -186,6 +186,9 @@ class Robot(URDFModel):
             base_name="",
             eef_name=None,
         )
+        self.incremental_fk = IncrementalForwardKinematics(
+            self.kin.get_chain(self.root)
+        )
 
     def _setup_init_fk(self):
         """
@@ -233,6 +236,21 @@ class Robot(URDFModel):
         fk = self.kin.forward_kinematics(self._frames, thetas)
         return fk
 
+    def forward_kin_incremental(self, thetas):
+        """
+        Returns link poses recomputing only the links below joints whose angle changed
+        since the last call
+
+        Args:
+            thetas (sequence of float): input joint angles
+
+        Returns:
+            fk (LinkPoses): link poses (overwritten by the next call)
+        """
+        thetas = np.asarray(thetas, dtype=np.float64)
+        thetas = self.kin.expand_hand_thetas(self.incremental_fk.chain, thetas)
+        return self.incremental_fk.compute(thetas)
+
     def inverse_kin(self, current_joints, target_pose, method, max_iter):
         """
         Returns joint angles obtained by computing IK
@@ -282,6 +300,7 @@ class Robot(URDFModel):
                     )
 
         self.gripper.open_gripper(z_dis)
+        self.incremental_fk.reset()
 
     def close_gripper(self, z_dis=0.02):
         for geom in ["collision", "visual"]:
@@ -297,6 +316,7 @@ class Robot(URDFModel):
                         - z_dis * self.info[geom][finger][3][:3, 1]
                     )
         self.gripper.close_gripper(z_dis)
+        self.incremental_fk.reset()
 
     @property
     def offset(self):
@@ -1,8 +1,12 @@
 import numpy as np
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+from pykin.kinematics.ik_cache import IKSeedCache
 from pykin.robots.robot import Robot
 from pykin.utils.error_utils import NotFoundError
-from pykin.utils.transform_utils import get_pose_from_homogeneous
+from pykin.utils.transform_utils import get_h_mat, get_pose_from_homogeneous
 
 
 class SingleArm(Robot):
@@ -23,6 +27,11 @@ class SingleArm(Robot):
         self.desired_base_frame = ""
         self._set_joint_limits_upper_and_lower()
         self._init_qpos = np.zeros(self.arm_dof)
+        self.ik_cache = None
+        self._ik_pool = None
+        self._ik_pool_key = None
+        self._ik_pool_finalizer = None
+        self._ik_call_id = None
 
         self.info = self._init_robot_info()
 
@@ -43,30 +52,251 @@ class SingleArm(Robot):
                 self.joint_limits_lower.append(limit_lower)
                 self.joint_limits_upper.append(limit_upper)
 
-    def get_result_qpos(self, init_qpos, eef_pose, method="LM", max_iter=100):
+    def get_result_qpos(
+        self,
+        init_qpos,
+        eef_pose,
+        method="LM",
+        max_iter=100,
+        n_cached_seeds=3,
+        n_restarts=3,
+        workers=None,
+        bounded=False,
+    ):
+        """
+        Returns joint angles within joint limits obtained by computing IK
+        from init_qpos and random restarts.
+        If ik cache is enabled, joints of the nearest solved poses are tried first
+        and solutions are stored in the cache
+
+        Args:
+            init_qpos (sequence of float): initial joint angles
+            eef_pose (np.array): goal pose to achieve
+            method (str): methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson)
+            max_iter (int): Maximum number of calculation iterations
+            n_cached_seeds (int): number of seeds from ik cache
+            n_restarts (int): number of random restarts if result is out of joint limits
+            workers (int): number of worker processes of random restarts (serial if None)
+            bounded (bool): keep joint angles within joint limits of the urdf file (LM, LM2 and analytic)
+
+        Returns:
+            result_qpos (np.array): target joint angles
+        """
+        if self.ik_cache is not None:
+            seeds, _ = self.ik_cache.query(eef_pose, n_cached_seeds)
+            for seed in seeds:
+                result_qpos = self.inverse_kin(
+                    seed, eef_pose, method=method, max_iter=max_iter, bounded=bounded
+                )
+                if self._is_solved(eef_pose, result_qpos):
+                    # query already marked the seed as recently used
+                    return result_qpos
+
         is_limit_qpos = False
         result_qpos = self.inverse_kin(
-            init_qpos, eef_pose, method=method, max_iter=max_iter
+            init_qpos, eef_pose, method=method, max_iter=max_iter, bounded=bounded
         )
-        is_limit_qpos = self.check_limit_joint(result_qpos)
-        limit_cnt = 0
+        is_limit_qpos = self._is_accepted(eef_pose, result_qpos, bounded)
+
+        if workers is not None and workers > 1:
+            if not is_limit_qpos:
+                result_qpos = self._get_result_qpos_parallel(
+                    result_qpos,
+                    eef_pose,
+                    method,
+                    max_iter,
+                    n_restarts,
+                    workers,
+                    bounded,
+                )
+        else:
+            limit_cnt = 0
+            while not is_limit_qpos:
+                limit_cnt += 1
+                if limit_cnt > n_restarts:
+                    break
+                result_qpos = self.inverse_kin(
+                    self._get_random_seeds(1, bounded)[0],
+                    eef_pose,
+                    method=method,
+                    max_iter=max_iter,
+                    bounded=bounded,
+                )
+                is_limit_qpos = self._is_accepted(eef_pose, result_qpos, bounded)
+
+        if self.ik_cache is not None and self._is_solved(eef_pose, result_qpos):
+            self.ik_cache.add(eef_pose, result_qpos)
+        return result_qpos
+
+    def _get_result_qpos_parallel(
+        self, result_qpos, eef_pose, method, max_iter, n_restarts, workers, bounded
+    ):
+        """
+        Runs random restarts in worker processes and returns the first result
+        accepted as by the serial restarts (_is_accepted).
+        Restarts which have not started yet are cancelled as soon as one succeeds
 
-        if is_limit_qpos:
-            return result_qpos
+        Args:
+            result_qpos (np.array): result returned if no restart is accepted
+            eef_pose (np.array): goal pose to achieve
+            method (str): methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson)
+            max_iter (int): Maximum number of calculation iterations
+            n_restarts (int): number of random restarts
+            workers (int): number of worker processes
+            bounded (bool): keep joint angles within joint limits of the urdf file
 
-        while not is_limit_qpos:
-            limit_cnt += 1
-            if limit_cnt > 3:
-                break
-            result_qpos = self.inverse_kin(
-                np.random.randn(len(init_qpos)),
+        Returns:
+            result_qpos (np.array): target joint angles
+        """
+        pool = self._get_ik_pool(workers)
+        with self._ik_call_id.get_lock():
+            self._ik_call_id.value += 1
+            call_id = self._ik_call_id.value
+
+        futures = [
+            pool.submit(
+                _solve_ik_in_worker,
+                call_id,
+                seed,
                 eef_pose,
-                method=method,
-                max_iter=max_iter,
+                method,
+                max_iter,
+                bounded,
             )
-            is_limit_qpos = self.check_limit_joint(result_qpos)
+            for seed in self._get_random_seeds(n_restarts, bounded)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if result is None:
+                continue
+            restart_qpos, is_accepted = result
+            if is_accepted:
+                result_qpos = restart_qpos
+                # workers skip restarts of previous calls
+                with self._ik_call_id.get_lock():
+                    self._ik_call_id.value += 1
+                for pending in futures:
+                    pending.cancel()
+                break
         return result_qpos
 
+    def _get_ik_pool(self, workers):
+        """
+        Returns process pool whose workers have loaded the robot model,
+        which is created again only if the model, chain or number of workers changed.
+        The pool is shut down when the robot is garbage collected or the interpreter exits
+        """
+        key = (
+            self.urdf_name,
+            tuple(self.offset.pos),
+            tuple(self.offset.rot),
+            self.has_gripper,
+            self.gripper_name,
+            self.base_name,
+            self.eef_name,
+            workers,
+        )
+        if self._ik_pool is not None and self._ik_pool_key == key:
+            return self._ik_pool
+
+        self.close_ik_pool()
+        context = multiprocessing.get_context()
+        self._ik_call_id = context.Value("q", 0)
+        self._ik_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_ik_worker,
+            initargs=(
+                self.urdf_name,
+                self.offset,
+                self.has_gripper,
+                self.gripper_name,
+                self.base_name,
+                self.eef_name,
+                self._ik_call_id,
+            ),
+        )
+        self._ik_pool_key = key
+        # the finalizer holds the pool only, so the robot can still be collected
+        self._ik_pool_finalizer = weakref.finalize(
+            self, self._ik_pool.shutdown, cancel_futures=True
+        )
+        return self._ik_pool
+
+    def close_ik_pool(self):
+        """
+        Shuts down worker processes of parallel random restarts
+        """
+        if self._ik_pool is not None:
+            self._ik_pool_finalizer()
+            self._ik_pool = None
+            self._ik_pool_key = None
+            self._ik_pool_finalizer = None
+
+    def enable_ik_cache(self, capacity=10000, rotation_weight=None, file_path=None):
+        """
+        Enables memoization of solved IK used by get_result_qpos
+
+        Args:
+            capacity (int): maximum number of stored solutions
+            rotation_weight (float): weight of rotation [m] in pose distance
+                (default: weight of the loaded file, 0.1 otherwise)
+            file_path (str): npz file saved by ik_cache.save to load solutions from
+        """
+        if file_path is None:
+            if rotation_weight is None:
+                rotation_weight = 0.1
+            self.ik_cache = IKSeedCache(self.arm_dof, capacity, rotation_weight)
+            return
+
+        ik_cache = IKSeedCache.load(file_path, capacity)
+        if ik_cache.dof != self.arm_dof:
+            raise ValueError(
+                "IK cache must have {} joints, instead got: {}".format(
+                    self.arm_dof, ik_cache.dof
+                )
+            )
+        if rotation_weight is not None and rotation_weight != ik_cache.rotation_weight:
+            raise ValueError(
+                "IK cache was saved with rotation_weight {}, instead got: {}".format(
+                    ik_cache.rotation_weight, rotation_weight
+                )
+            )
+        self.ik_cache = ik_cache
+
+    def _get_random_seeds(self, n_seeds, bounded):
+        """
+        Returns joint angles of random restarts (uniform within joint limits if bounded)
+        """
+        if bounded:
+            return np.random.uniform(
+                self.joint_limits_lower,
+                self.joint_limits_upper,
+                size=(n_seeds, self.arm_dof),
+            )
+        return np.random.randn(n_seeds, self.arm_dof)
+
+    def _is_accepted(self, eef_pose, qpos, bounded):
+        """
+        Returns True if result of IK is within joint limits.
+        Bounded results are always within joint limits, so they have to reach eef_pose
+        """
+        if bounded:
+            return self._is_solved(eef_pose, qpos)
+        return self.check_limit_joint(qpos)
+
+    def _is_solved(self, eef_pose, qpos, eps=1e-4):
+        """
+        Returns True if qpos is within joint limits and reaches eef_pose
+        """
+        eef_pose = np.asarray(eef_pose)
+        if eef_pose.shape != (4, 4):
+            eef_pose = get_h_mat(eef_pose[:3], eef_pose[3:])
+        return (
+            self.check_limit_joint(qpos)
+            and self.get_pose_error(eef_pose, self.eef_pose(qpos)) < eps
+        )
+
     def get_info(self, geom="all"):
         if geom == "all":
             return self.info
@@ -106,6 +336,12 @@ class SingleArm(Robot):
         self._eef_name = eef_name
         self._set_desired_base_frame()
         self._set_desired_frame()
+        # workers of parallel restarts and cached solutions belong to the previous chain
+        self.close_ik_pool()
+        if self.ik_cache is not None:
+            self.ik_cache = IKSeedCache(
+                self.arm_dof, self.ik_cache.capacity, self.ik_cache.rotation_weight
+            )
 
     def _check_link_name(self, base_name, eef_name):
         """
@@ -147,18 +383,36 @@ class SingleArm(Robot):
             self.get_revolute_joint_names(self.desired_frames)
         )
 
-    def inverse_kin(self, current_joints, target_pose, method="LM", max_iter=100):
+    def inverse_kin(
+        self,
+        current_joints,
+        target_pose,
+        method="LM",
+        max_iter=100,
+        bounded=False,
+        objectives=None,
+        verbose=False,
+        callback=None,
+        return_result=False,
+        gabo_options=None,
+    ):
         """
         Returns joint angles obtained by computing IK
 
         Args:
             current_joints (sequence of float): input joint angles
             target_pose (np.array): goal pose to achieve
-            method (str): two methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson)
+            method (str): methods to calculate IK (LM: Levenberg-marquardt, NR: Newton-raphson, analytic: closed form)
             max_iter (int): Maximum number of calculation iterations
+            bounded (bool): keep joint angles within joint_limits_lower and joint_limits_upper (LM, LM2 and analytic)
+            objectives (list of NullSpaceObjective): secondary objectives of redundant robots (LM and LM2)
+            verbose (bool): print method, iterations, error and working time
+            callback (callable): called with IKResult after solving
+            return_result (bool): return IKResult instead of joint angles
+            gabo_options (dict): keyword arguments of GaBO, e.g. {"refit_interval": 5, "batch_size": 3}
 
         Returns:
-            joints (np.array): target joint angles
+            joints (np.array): target joint angles (IKResult if return_result)
         """
         target_pose = np.asarray(target_pose)
 
@@ -166,10 +420,119 @@ class SingleArm(Robot):
             target_pose = get_pose_from_homogeneous(target_pose)
 
         joints = self.kin.inverse_kinematics(
-            self.desired_frames, current_joints, target_pose, method, max_iter
+            self.desired_frames,
+            current_joints,
+            target_pose,
+            method,
+            max_iter,
+            bounded,
+            objectives,
+            verbose,
+            callback,
+            return_result,
+            gabo_options,
+            (self.joint_limits_lower, self.joint_limits_upper),
         )
         return joints
 
+    def inverse_kin_batch(
+        self, target_poses, seeds=None, n_seeds=8, method="LM2", max_iter=100
+    ):
+        """
+        Returns best joint angles of many targets solved from many seeds at once
+
+        Args:
+            target_poses (np.array(M, 7) or np.array(M, 4, 4)): goal poses to achieve
+            seeds (np.array(M, K, dof) or np.array(K, dof)): initial joint angles
+                (default: init_qpos and n_seeds-1 random joint angles within joint limits)
+            n_seeds (int): number of seeds if seeds is None
+            method (str): two methods to calculate IK (LM: Levenberg-marquardt, LM2: scaled Levenberg-marquardt)
+            max_iter (int): Maximum number of calculation iterations
+
+        Returns:
+            joints (np.array(M, dof)): best target joint angles of each target
+            errors (np.array(M,)): weighted squared pose errors (inf if no seed respects joint limits)
+        """
+        if seeds is None:
+            seeds = np.random.uniform(
+                self.joint_limits_lower,
+                self.joint_limits_upper,
+                size=(n_seeds, self.arm_dof),
+            )
+            seeds[0] = self.init_qpos
+
+        return self.kin.inverse_kinematics_batch(
+            self.desired_frames,
+            target_poses,
+            seeds,
+            method,
+            max_iter,
+            joint_limits=(self.joint_limits_lower, self.joint_limits_upper),
+        )
+
+    def get_differential_ik(
+        self, current_joints=None, damping=1e-2, velocity_limits=None
+    ):
+        """
+        Returns velocity level inverse kinematics mapping twists of end effector
+        to joint velocities within joint limits, for servo loops
+
+        Args:
+            current_joints (sequence of float): initial joint angles (default: init_qpos)
+            damping (float): damping of least squares near singularities
+            velocity_limits (float or np.array(dof,)): positive maximum joint velocities (default: inf)
+
+        Returns:
+            DifferentialIK: differential inverse kinematics at current joint angles
+        """
+        if current_joints is None:
+            current_joints = self.init_qpos
+
+        return self.kin.get_differential_ik(
+            self.desired_frames, current_joints, damping, velocity_limits
+        )
+
+    def inverse_kin_path(
+        self,
+        target_poses,
+        current_joints=None,
+        method="LM2",
+        max_iter=100,
+        bounded=False,
+    ):
+        """
+        Yields joint angles of a cartesian path solved waypoint by waypoint,
+        each warm started from the previous solution
+
+        Args:
+            target_poses (iterable of np.array): waypoints to achieve (pose(7,) or h_mat(4, 4))
+            current_joints (sequence of float): initial joint angles (default: init_qpos)
+            method (str): two methods to calculate IK (LM: Levenberg-marquardt, LM2: scaled Levenberg-marquardt)
+            max_iter (int): Maximum number of calculation iterations of each waypoint
+            bounded (bool): keep joint angles within joint limits of the urdf file
+
+        Yields:
+            joints (np.array): target joint angles of each waypoint
+        """
+        if current_joints is None:
+            current_joints = self.init_qpos
+
+        return self.kin.inverse_kinematics_path(
+            self.desired_frames, target_poses, current_joints, method, max_iter, bounded
+        )
+
+    def eef_pose(self, thetas):
+        """
+        Get end effector's homogeneous matrix without computing every link's transformation
+
+        Args:
+            thetas (sequence of float): input joint angles
+
+        Returns:
+            eef_pose (np.array(4, 4))
+        """
+        return self.kin.eef_pose(self.desired_frames, thetas)
+
     def compute_eef_pose(self, fk=None):
         """
         Get end effector's pose
@@ -219,7 +582,11 @@ class SingleArm(Robot):
     @property
     def arm_dof(self):
         return len(
-            [joint for joint in self.get_revolute_joint_names() if "head" not in joint and "hand" not in joint]
+            [
+                joint
+                for joint in self.get_revolute_joint_names()
+                if "head" not in joint and "hand" not in joint
+            ]
         )
 
     @property
@@ -229,3 +596,30 @@ class SingleArm(Robot):
     @init_qpos.setter
     def init_qpos(self, init_qpos):
         self._init_qpos = init_qpos
+
+
+# robot model and id of current call loaded in each worker of parallel random restarts
+_worker_robot = None
+_worker_call_id = None
+
+
+def _init_ik_worker(
+    f_name, offset, has_gripper, gripper_name, base_name, eef_name, call_id
+):
+    global _worker_robot, _worker_call_id
+    _worker_robot = SingleArm(f_name, offset, has_gripper, gripper_name)
+    _worker_robot.setup_link_name(base_name, eef_name)
+    _worker_call_id = call_id
+
+
+def _solve_ik_in_worker(call_id, seed, eef_pose, method, max_iter, bounded):
+    """
+    Returns result of a random restart and whether it is accepted as by the serial restarts
+    (None if the call was already solved by another worker)
+    """
+    if _worker_call_id.value != call_id:
+        return None
+    result_qpos = _worker_robot.inverse_kin(
+        seed, eef_pose, method=method, max_iter=max_iter, bounded=bounded
+    )
+    return result_qpos, _worker_robot._is_accepted(eef_pose, result_qpos, bounded)
@@ -12,16 +12,13 @@ def convert_angle_to_point_torch(thetas):
     Converts the input angle to a point.
 
     Args:
-        thetas (list): actuated joint names
+        thetas (np.array(..., dof)): joint angles
 
     Returns:
-        thetas (dict): Dictionary of actuated joint angles
+        point (tensor(..., 2 * dof)): torus point of (cos, sin) pairs
     """
-    point = []
-    for theta in thetas:
-        point.append(np.cos(theta))
-        point.append(np.sin(theta))
-    return torch.tensor(point)
+    thetas = torch.as_tensor(np.asarray(thetas, dtype=np.float64))
+    return torch.stack((torch.cos(thetas), torch.sin(thetas)), -1).flatten(-2)
 
 
 def convert_point_to_angle_torch(point):
@@ -29,17 +26,27 @@ def convert_point_to_angle_torch(point):
     Converts the input torus point tensor to an angle tensor using atan2.
 
     Args:
-        point (tensor): Input torus point tensor
+        point (tensor(..., 2 * dof)): Input torus point tensor
 
     Returns:
-        angle (tensor): Converted angle tensor
+        angle (tensor(..., dof)): Converted angle tensor
     """
-    angle_set = []
-    point_set = point.view(-1, 2)
-    for point in point_set:
-        angle = torch.atan2(point[1], point[0])
-        angle_set.append(angle)
-    return torch.tensor(angle_set)
+    point_set = point.reshape(point.shape[:-1] + (-1, 2))
+    return torch.atan2(point_set[..., 1], point_set[..., 0])
+
+
+def sample_torus_angles(num_samples, dimension):
+    """
+    Samples uniform points of the torus as angles
+
+    Args:
+        num_samples (int): number of points
+        dimension (int): torus dimension
+
+    Returns:
+        angles (np.array(num_samples, dimension)): angles in [-pi, pi)
+    """
+    return np.random.uniform(-np.pi, np.pi, (num_samples, dimension))
 
 
 def get_bounds(dimension):
@@ -95,3 +102,66 @@ def init_gp_model(opt_dimension, device, x_data, y_data):
     solver = TrustRegions(maxiter=200)
 
     return mll_fct, model, solver, bounds, constraints
+
+
+def update_gp_model(model, new_x, new_y):
+    """
+    Adds observations to Gaussian Process model with a low rank update
+    of its cached Cholesky factor (fantasy model of gpytorch) instead of recomputing it.
+    Hyperparameters are kept, and the caches exist once the model is evaluated in eval mode
+
+    Args:
+        model (SingleTaskGP): gaussian process model
+        new_x (tensor(n, dim)): new inputs
+        new_y (tensor(n,)): new observations
+
+    Returns:
+        model (SingleTaskGP): gaussian process model conditioned on new observations
+    """
+    model.eval()
+    if model.prediction_strategy is None:
+        with torch.no_grad():
+            model.posterior(new_x)
+    return model.get_fantasy_model(new_x, new_y)
+
+
+def get_standardized_residual(model, new_x, new_y):
+    """
+    Returns squared standardized residual of new observations under the model,
+    large values meaning the hyperparameters no longer explain the data
+
+    Args:
+        model (SingleTaskGP): gaussian process model
+        new_x (tensor(n, dim)): new inputs
+        new_y (tensor(n,)): new observations
+
+    Returns:
+        residual (float): largest squared standardized residual
+    """
+    model.eval()
+    with torch.no_grad():
+        posterior = model.posterior(new_x, observation_noise=True)
+        mean = posterior.mean.reshape(new_y.shape)
+        variance = posterior.variance.reshape(new_y.shape)
+    return torch.max((new_y - mean) ** 2 / variance).item()
+
+
+def select_informative_data(x_data, y_data, max_data):
+    """
+    Keeps the newest point and the points with the smallest errors,
+    which are the most informative for minimization
+
+    Args:
+        x_data (tensor(N, dim)): inputs
+        y_data (tensor(N,)): observations
+        max_data (int): maximum number of points
+
+    Returns:
+        x_data (tensor(max_data, dim)): kept inputs
+        y_data (tensor(max_data,)): kept observations
+    """
+    if y_data.shape[0] <= max_data:
+        return x_data, y_data
+    keep = torch.argsort(y_data[:-1])[: max_data - 1]
+    keep = torch.cat([keep, torch.tensor([y_data.shape[0] - 1], device=keep.device)])
+    return x_data[keep], y_data[keep]
@@ -11,7 +11,11 @@ import numpy as np
 
 
 from pykin.utils.gabo.module.util.sphere_utils_torch import sphere_distance_torch
-from pykin.utils.gabo.module.util.jacobi_theta_functions import jacobi_theta_function3
+from pykin.utils.gabo.module.util.jacobi_theta_functions import (
+    jacobi_theta_function3,
+    jacobi_theta_function3_chebyshev,
+    get_jacobi_theta_nb_terms,
+)
 
 if torch.cuda.is_available():
     device = torch.cuda.current_device()
@@ -23,11 +27,14 @@ class TorusProductOfManifoldsRiemannianGaussianKernel(gpytorch.kernels.Kernel):
     """
     Instances of this class represent a Gaussian (RBF) covariance matrix between input points on a torus by considering
     it as a product of circle manifolds.
+    The product is fused: the circle kernels only hold the lengthscales, and the kernels of all circles are evaluated
+    together from the cosines of their geodesic distances, with a number of series terms adapted to the lengthscales.
 
     Attributes
     ----------
     self.dim, dimension of the torus manifold on which the data handled by the kernel are living
     self.torus_kernel, product of circle kernels
+    self.serie_nb_terms, maximum number of terms used to compute the Jacobi theta function of the kernel
 
     Methods
     -------
@@ -35,7 +42,7 @@ class TorusProductOfManifoldsRiemannianGaussianKernel(gpytorch.kernels.Kernel):
 
     """
 
-    def __init__(self, dim, **kwargs):
+    def __init__(self, dim, serie_nb_terms=100, **kwargs):
         """
         Initialisation.
 
@@ -45,6 +52,7 @@ class TorusProductOfManifoldsRiemannianGaussianKernel(gpytorch.kernels.Kernel):
 
         Optional parameters
         -------------------
+        :param serie_nb_terms: maximum number of terms used to compute the summation formula of the kernel
         :param kwargs: additional arguments
         """
         self.has_lengthscale = True
@@ -54,17 +62,22 @@ class TorusProductOfManifoldsRiemannianGaussianKernel(gpytorch.kernels.Kernel):
 
         # Dimension of the torus
         self.dim = dim
+        self.serie_nb_terms = serie_nb_terms
 
         # Initialise the product of kernels
         kernels = [
             CircleRiemannianGaussianKernel(
-                active_dims=torch.tensor(list(range(2 * i, 2 * i + 2)))
+                serie_nb_terms=serie_nb_terms,
+                active_dims=torch.tensor(list(range(2 * i, 2 * i + 2))),
             )
             for i in range(self.dim)
         ]
 
         self.torus_kernel = gpytorch.kernels.ProductKernel(*kernels)
 
+        # Normalizing terms of the last lengthscales, reused while hyperparameters are fixed
+        self._norm_cache = None
+
     def forward(self, x1, x2, diag=False, **params):
         """
         Computes the Gaussian kernel matrix between inputs x1 and x2 belonging to a torus manifold by considering it
@@ -84,27 +97,74 @@ class TorusProductOfManifoldsRiemannianGaussianKernel(gpytorch.kernels.Kernel):
         -------
         :return: kernel matrix between x1 and x2
         """
-        # If the points are given as angles, transform them into coordinates on circles
-        if x1.shape[-1] == self.dim:
-            x1_circles = torch.zeros(
-                list(x1.shape[:-1]) + [2 * self.dim], dtype=x1.dtype
-            )
-            x1_circles[..., ::2] = torch.cos(x1)
-            x1_circles[..., 1::2] = torch.sin(x1)
+        # Coordinates on circles, b1 x ... x bk x N x dim x 2
+        x1_circles = self._to_circles(x1)
+        x2_circles = self._to_circles(x2)
+
+        # Inner products of the circles, i.e. cosines of their geodesic distances (clamped as sphere_distance_torch)
+        if diag:
+            cos_distance = torch.sum(x1_circles * x2_circles, dim=-1).transpose(-1, -2)
         else:
-            x1_circles = x1
-        if x2.shape[-1] == self.dim:
-            x2_circles = torch.zeros(
-                list(x2.shape[:-1]) + [2 * self.dim], dtype=x2.dtype
+            cos_distance = torch.matmul(
+                x1_circles.transpose(-3, -2),
+                x2_circles.movedim(-3, -1),
             )
-            x2_circles[..., ::2] = torch.cos(x2)
-            x2_circles[..., 1::2] = torch.sin(x2)
-        else:
-            x2_circles = x2
+        cos_distance = cos_distance.clamp(-1.0 + 1e-15, 1.0 - 1e-15)
+
+        # Kernel of each circle equal to jacobi theta function, cos(2z) = cos(distance)
+        q_param, nb_terms, norm_factor = self._get_series_params()
+        point_dims = (1,) if diag else (1, 1)
+        q_param = q_param.view(q_param.shape + point_dims)
+        norm_factor = norm_factor.view(norm_factor.shape + point_dims)
+        kernel = jacobi_theta_function3_chebyshev(cos_distance, q_param, nb_terms)
 
         # Kernel
-        kernel = self.torus_kernel.forward(x1_circles, x2_circles)
-        return kernel
+        dim = -2 if diag else -3
+        return torch.prod(kernel / norm_factor, dim=dim)
+
+    def _to_circles(self, x):
+        """
+        Returns coordinates on circles of points given as angles or as coordinates on circles
+        """
+        # If the points are given as angles, transform them into coordinates on circles
+        if x.shape[-1] == self.dim:
+            x = torch.stack((torch.cos(x), torch.sin(x)), dim=-1)
+        return x.reshape(x.shape[:-1] + (self.dim, 2))
+
+    def _get_series_params(self):
+        """
+        Returns q parameters of the circles (b1 x ... x bk x dim), number of series terms and normalizing terms
+        """
+        lengthscale = torch.cat(
+            [kernel.lengthscale[..., 0, :] for kernel in self.torus_kernel.kernels],
+            dim=-1,
+        )
+        q_param = torch.exp(-2 * np.pi**2 * lengthscale**2)
+
+        # Hyperparameters are fixed outside of training, e.g. during acquisition optimization
+        cache = self._norm_cache
+        if (
+            not self.training
+            and cache is not None
+            and torch.equal(cache[0], lengthscale.detach())
+        ):
+            return q_param, cache[1], cache[2]
+
+        nb_terms = get_jacobi_theta_nb_terms(
+            q_param.detach(), max_nb_terms=self.serie_nb_terms
+        )
+        norm_factor = jacobi_theta_function3_chebyshev(
+            torch.ones_like(q_param), q_param, nb_terms
+        )
+        if self.training:
+            self._norm_cache = None
+        else:
+            self._norm_cache = (
+                lengthscale.detach().clone(),
+                nb_terms,
+                norm_factor.detach(),
+            )
+        return q_param, nb_terms, norm_factor
 
 
 class CircleRiemannianGaussianKernel(gpytorch.kernels.Kernel):
@@ -114,7 +174,7 @@ class CircleRiemannianGaussianKernel(gpytorch.kernels.Kernel):
 
     Attributes
     ----------
-    self.serie_nb_terms, number of terms used to compute the Jacobi theta function of the kernel
+    self.serie_nb_terms, maximum number of terms used to compute the Jacobi theta function of the kernel
 
     Methods
     -------
@@ -133,7 +193,7 @@ class CircleRiemannianGaussianKernel(gpytorch.kernels.Kernel):
 
         Optional parameters
         -------------------
-        :param serie_nb_terms: number of terms used to compute the summation formula of the kernel
+        :param serie_nb_terms: maximum number of terms used to compute the summation formula of the kernel
         :param kwargs: additional arguments
         """
         self.has_lengthscale = True
@@ -167,11 +227,16 @@ class CircleRiemannianGaussianKernel(gpytorch.kernels.Kernel):
 
         # Compute kernel equal to jacobi theta function
         q_param = torch.exp(-2 * np.pi**2 * self.lengthscale**2)
-        kernel = jacobi_theta_function3(np.pi * scaled_distance, q_param).to(device)
+        nb_terms = get_jacobi_theta_nb_terms(
+            q_param.detach(), max_nb_terms=self.serie_nb_terms
+        )
+        kernel = jacobi_theta_function3(np.pi * scaled_distance, q_param, nb_terms).to(
+            device
+        )
 
         # Normalizing term
         norm_factor = jacobi_theta_function3(
-            torch.zeros((1, 1)).to(device), q_param
+            torch.zeros((1, 1)).to(device), q_param, nb_terms
         ).to(device)
 
         # Kernel
@@ -14,7 +14,7 @@ from torch.nn import Module
 import warnings
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from botorch.acquisition import AcquisitionFunction
+from botorch.acquisition import AcquisitionFunction, ExpectedImprovement
 from botorch.acquisition.analytic import AnalyticAcquisitionFunction
 from botorch.acquisition.utils import is_nonnegative
 from botorch.exceptions import BadInitialCandidatesWarning
@@ -141,6 +141,77 @@ def joint_optimize_manifold(
     )
 
 
+def kriging_believer_optimize_manifold(
+    model: Module,
+    best_f: Union[float, Tensor],
+    manifold: Manifold,
+    solver: Solver,
+    q: int,
+    num_restarts: int,
+    raw_samples: int,
+    bounds: Tensor,
+    maximize: bool = False,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    This function generates a batch of candidates with the Kriging believer heuristic: each candidate maximizes the
+    expected improvement of a model conditioned on the previous candidates, observed at their posterior mean.
+    The conditioned models are low rank updates of the model, so no hyperparameter is refitted.
+
+    Parameters
+    ----------
+    :param model: gaussian process model, evaluated in eval mode since its training data last changed
+    :param best_f: best observation
+    :param manifold: the manifold in the optimization takes place (pymanopt manifold)
+    :param solver: solver on manifold to solve the optimization (pymanopt solver)
+    :param q: number of candidates
+    :param num_restarts: number of starting points for multistart acquisition function optimization
+    :param raw_samples: number of samples for initialization
+    :param bounds: a `2 x d` tensor of lower and upper bounds for each column of `X`
+
+    Optional parameters
+    -------------------
+    :param maximize: if True, the objective is maximized
+    :param kwargs: additional arguments of joint_optimize_manifold
+
+    Returns
+    -------
+    :return: a `q x d` tensor of generated candidates.
+    """
+    candidates = []
+    believer_model = model
+    for i in range(q):
+        acq_function = ExpectedImprovement(
+            model=believer_model, best_f=best_f, maximize=maximize
+        )
+        acq_function.to(device)
+        new_x = joint_optimize_manifold(
+            acq_function,
+            manifold,
+            solver,
+            q=1,
+            num_restarts=num_restarts,
+            raw_samples=raw_samples,
+            bounds=bounds,
+            **kwargs,
+        )
+        candidates.append(new_x)
+
+        if i < q - 1:
+            # Believe the posterior mean at the candidate
+            believer_model.eval()
+            with torch.no_grad():
+                mean = believer_model.posterior(new_x).mean.reshape(-1)
+            believer_model = believer_model.get_fantasy_model(new_x, mean)
+            best_f = (
+                torch.maximum(torch.as_tensor(best_f), mean.max())
+                if maximize
+                else torch.minimum(torch.as_tensor(best_f), mean.min())
+            )
+
+    return torch.cat(candidates)
+
+
 # This function is based on the botorch.gen.gen_candidates_scipy
 def gen_candidates_manifold(
     initial_conditions: Tensor,
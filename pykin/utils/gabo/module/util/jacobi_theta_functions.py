@@ -5,6 +5,7 @@ Authors: Noemie Jaquier, Viacheslav Borovitskiy, Andrei Smolensky, Alexander Ter
 License: MIT
 """
 
+import math
 import torch
 
 if torch.cuda.is_available():
@@ -18,3 +19,32 @@ def jacobi_theta_function3(z, q, serie_nb_terms=200):
     for n in range(1, 1 + serie_nb_terms):
         function_value += torch.pow(q, n**2) * torch.cos(2 * n * z)
     return 2 * function_value + 1.0
+
+
+def jacobi_theta_function3_chebyshev(cos_2z, q, serie_nb_terms=200):
+    """
+    Computes the jacobi theta function 3 from cos(2z) instead of z.
+    cos(2nz) of every term follows from the Chebyshev recurrence
+    cos(2(n+1)z) = 2 cos(2z) cos(2nz) - cos(2(n-1)z), so no trigonometric function is evaluated
+    and q broadcasts against cos_2z, e.g. one q per circle of a torus.
+    """
+    previous = torch.ones_like(cos_2z)
+    current = cos_2z
+    function_value = q * current
+    for n in range(2, 1 + serie_nb_terms):
+        previous, current = current, 2 * cos_2z * current - previous
+        function_value = function_value + torch.pow(q, n**2) * current
+    return 2 * function_value + 1.0
+
+
+def get_jacobi_theta_nb_terms(q, tol=1e-16, max_nb_terms=200):
+    """
+    Returns the number of terms after which q^(n^2) is below tol for every q.
+    """
+    q_max = float(torch.max(q))
+    if q_max <= 0.0:
+        return 1
+    if q_max >= 1.0:
+        return max_nb_terms
+    nb_terms = math.ceil(math.sqrt(math.log(tol) / math.log(q_max)))
+    return min(max(nb_terms, 1), max_nb_terms)
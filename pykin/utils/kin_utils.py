@@ -127,6 +127,56 @@ def rot_to_omega(R, EPS):
     return w
 
 
+def calc_pose_error_batch(tar_pose, cur_pose, EPS):
+    """
+    Args:
+        tar_pose (np.array(..., 4, 4)): target poses
+        cur_pose (np.array(..., 4, 4)): current poses
+        EPS (float): epsilon
+
+    Returns:
+        np.array(..., 6): Returns pose errors
+    """
+    tar_pose = np.asarray(tar_pose)
+    cur_pose = np.asarray(cur_pose)
+    pos_err = tar_pose[..., :3, 3] - cur_pose[..., :3, 3]
+    cur_rot = cur_pose[..., :3, :3]
+    rot_err = np.matmul(np.swapaxes(cur_rot, -1, -2), tar_pose[..., :3, :3])
+    w_err = np.einsum("...ij,...j->...i", cur_rot, rot_to_omega_batch(rot_err, EPS))
+    return np.concatenate((pos_err, w_err), axis=-1)
+
+
+def rot_to_omega_batch(R, EPS):
+    """
+    Args:
+        R (np.array(..., 3, 3)): rotation matrices
+        EPS (float): epsilon
+
+    Returns:
+        np.array(..., 3): Returns angular errors computed by rot_to_omega
+    """
+    el = np.stack(
+        [
+            R[..., 2, 1] - R[..., 1, 2],
+            R[..., 0, 2] - R[..., 2, 0],
+            R[..., 1, 0] - R[..., 0, 1],
+        ],
+        axis=-1,
+    )
+    norm_el = np.linalg.norm(el, axis=-1)
+    diagonal = np.diagonal(R, axis1=-2, axis2=-1)
+    is_rotated = norm_el > EPS
+    scale = np.arctan2(norm_el, np.sum(diagonal, axis=-1) - 1) / np.where(
+        is_rotated, norm_el, 1.0
+    )
+    is_identity = np.all(diagonal > 0, axis=-1)
+    return np.where(
+        is_rotated[..., None],
+        scale[..., None] * el,
+        np.where(is_identity[..., None], 0.0, np.pi / 2 * (diagonal + 1)),
+    )
+
+
 def limit_joints(joint_angles, lower, upper):
     """
     Set joint angle limit
@@ -1,6 +1,6 @@
 import numpy as np
 import math
-from collections import Iterable
+from collections.abc import Iterable
 
 
 def vector_norm(data, axis=None, out=None):
@@ -24,6 +24,13 @@ def get_rot_mat_from_homogeneous(h_mat):
     return h_mat[:-1, :-1]
 
 
+def get_rot_mat_from_homogeneous_batch(h_mat):
+    """
+    Returns (..., 3, 3) rotation matrices from (..., 4, 4) homogeneous matrices
+    """
+    return np.asarray(h_mat)[..., :-1, :-1]
+
+
 def get_pos_mat_from_homogeneous(h_mat):
     """
     Returns position matrix from homogeneous matrix
@@ -31,6 +38,13 @@ def get_pos_mat_from_homogeneous(h_mat):
     return h_mat[:-1, -1]
 
 
+def get_pos_mat_from_homogeneous_batch(h_mat):
+    """
+    Returns (..., 3) positions from (..., 4, 4) homogeneous matrices
+    """
+    return np.asarray(h_mat)[..., :-1, -1]
+
+
 def get_pose_from_homogeneous(h_mat):
     """
     Returns (7,1) pose from homogeneous matrix
@@ -40,6 +54,17 @@ def get_pose_from_homogeneous(h_mat):
     return np.hstack((position, orientation))
 
 
+def get_pose_from_homogeneous_batch(h_mat):
+    """
+    Returns (..., 7) poses from (..., 4, 4) homogeneous matrices
+    """
+    position = get_pos_mat_from_homogeneous_batch(h_mat)
+    orientation = get_quaternion_from_matrix_batch(
+        get_rot_mat_from_homogeneous_batch(h_mat)
+    )
+    return np.concatenate((position, orientation), axis=-1)
+
+
 def get_rpy_from_matrix(R):
     """
     Returns roll pitch, yaw from Rotation matrix
@@ -51,6 +76,18 @@ def get_rpy_from_matrix(R):
     return np.asarray([r, p, y])
 
 
+def get_rpy_from_matrix_batch(R):
+    """
+    Returns (..., 3) roll pitch, yaw from (..., 3, 3) rotation matrices
+    """
+    R = np.asarray(R)
+    r = np.arctan2(R[..., 2, 1], R[..., 2, 2])
+    p = np.arctan2(-R[..., 2, 0], np.sqrt(R[..., 0, 0] ** 2 + R[..., 1, 0] ** 2))
+    y = np.arctan2(R[..., 1, 0], R[..., 0, 0])
+
+    return np.stack([r, p, y], axis=-1)
+
+
 def get_rpy_from_quaternion(q, convention="wxyz"):
     """
     Returns roll pitch, yaw from quaternion
@@ -66,6 +103,17 @@ def get_rpy_from_quaternion(q, convention="wxyz"):
     return rpy
 
 
+def get_rpy_from_quaternion_batch(q, convention="wxyz"):
+    """
+    Returns (..., 3) roll pitch, yaw from (..., 4) quaternions
+    """
+    w, x, y, z = _split_quaternion(q, convention)
+    roll = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x**2 + y**2))
+    pitch = np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0))
+    yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y**2 + z**2))
+    return np.stack([roll, pitch, yaw], axis=-1)
+
+
 def get_matrix_from_rpy(rpy):
     """
     Returns rotation matrix from rpy
@@ -82,6 +130,26 @@ def get_matrix_from_rpy(rpy):
     return R
 
 
+def get_matrix_from_rpy_batch(rpy):
+    """
+    Returns (..., 3, 3) rotation matrices from (..., 3) rpy
+    """
+    rpy = np.asarray(rpy, dtype=np.float64)
+    cr, cp, cy = np.moveaxis(np.cos(rpy), -1, 0)
+    sr, sp, sy = np.moveaxis(np.sin(rpy), -1, 0)
+    R = np.empty(rpy.shape[:-1] + (3, 3))
+    R[..., 0, 0] = cy * cp
+    R[..., 0, 1] = cy * sp * sr - sy * cr
+    R[..., 0, 2] = cy * sp * cr + sy * sr
+    R[..., 1, 0] = sy * cp
+    R[..., 1, 1] = sy * sp * sr + cy * cr
+    R[..., 1, 2] = sy * sp * cr - cy * sr
+    R[..., 2, 0] = -sp
+    R[..., 2, 1] = cp * sr
+    R[..., 2, 2] = cp * cr
+    return R
+
+
 def get_matrix_from_axis_angle(axis, angle):
     """
     Returns rotation matrix from axis angle
@@ -100,6 +168,29 @@ def get_matrix_from_axis_angle(axis, angle):
     return R
 
 
+def get_matrix_from_axis_angle_batch(axis, angle):
+    """
+    Returns (..., 3, 3) rotation matrices from (..., 3) axes and (...) angles
+    """
+    axis = np.asarray(axis, dtype=np.float64)
+    theta = np.asarray(angle, dtype=np.float64)
+    x, y, z = np.moveaxis(axis, -1, 0)
+    c, s = np.cos(theta), np.sin(theta)
+    v = 1 - c
+    shape = np.broadcast(x, theta).shape
+    R = np.empty(shape + (3, 3))
+    R[..., 0, 0] = x**2 * v + c
+    R[..., 0, 1] = x * y * v - z * s
+    R[..., 0, 2] = x * z * v + y * s
+    R[..., 1, 0] = x * y * v + z * s
+    R[..., 1, 1] = y**2 * v + c
+    R[..., 1, 2] = y * z * v - x * s
+    R[..., 2, 0] = x * z * v - y * s
+    R[..., 2, 1] = y * z * v + x * s
+    R[..., 2, 2] = z**2 * v + c
+    return R
+
+
 def get_matrix_from_quaternion(q, convention="wxyz"):
     """
     Returns rotation matrix from quaternion
@@ -121,6 +212,24 @@ def get_matrix_from_quaternion(q, convention="wxyz"):
     return R
 
 
+def get_matrix_from_quaternion_batch(q, convention="wxyz"):
+    """
+    Returns (..., 3, 3) rotation matrices from (..., 4) quaternions
+    """
+    w, x, y, z = _split_quaternion(q, convention)
+    R = np.empty(np.shape(w) + (3, 3))
+    R[..., 0, 0] = 2 * (w**2 + x**2) - 1
+    R[..., 0, 1] = 2 * (x * y - w * z)
+    R[..., 0, 2] = 2 * (x * z + w * y)
+    R[..., 1, 0] = 2 * (x * y + w * z)
+    R[..., 1, 1] = 2 * (w**2 + y**2) - 1
+    R[..., 1, 2] = 2 * (y * z - w * x)
+    R[..., 2, 0] = 2 * (x * z - w * y)
+    R[..., 2, 1] = 2 * (y * z + w * x)
+    R[..., 2, 2] = 2 * (w**2 + z**2) - 1
+    return R
+
+
 def get_quaternion_from_rpy(rpy, convention="wxyz"):
     """
     Returns quaternion from rpy
@@ -155,22 +264,51 @@ def get_quaternion_from_rpy(rpy, convention="wxyz"):
     return q
 
 
+def get_quaternion_from_rpy_batch(rpy, convention="wxyz"):
+    """
+    Returns (..., 4) quaternions from (..., 3) rpy
+    """
+    rpy = np.asarray(rpy, dtype=np.float64)
+    r, p, y = np.moveaxis(rpy, -1, 0)
+    cr, sr = np.cos(r / 2.0), np.sin(r / 2.0)
+    cp, sp = np.cos(p / 2.0), np.sin(p / 2.0)
+    cy, sy = np.cos(y / 2.0), np.sin(y / 2.0)
+
+    w = cr * cp * cy + sr * sp * sy
+    x = sr * cp * cy - cr * sp * sy
+    y = cr * sp * cy + sr * cp * sy
+    z = cr * cp * sy - sr * sp * cy
+
+    return _stack_quaternion(w, x, y, z, convention)
+
+
 def get_quaternion_from_matrix(R, convention="wxyz"):
     """
-    Returns quaternion from rotation matrix
-    """
-    w = 1.0 / 2 * np.sqrt(R[0, 0] + R[1, 1] + R[2, 2] + 1)
-    x, y, z = (
-        1.0
-        / 2
-        * np.array(
-            [
-                np.sign(R[2, 1] - R[1, 2]) * np.sqrt(R[0, 0] - R[1, 1] - R[2, 2] + 1),
-                np.sign(R[0, 2] - R[2, 0]) * np.sqrt(R[1, 1] - R[2, 2] - R[0, 0] + 1),
-                np.sign(R[1, 0] - R[0, 1]) * np.sqrt(R[2, 2] - R[0, 0] - R[1, 1] + 1),
-            ]
-        )
-    )
+    Returns quaternion (w >= 0) from rotation matrix
+
+    The quaternion is computed from its largest component
+    so that it stays accurate near 180 degree rotations
+    """
+    (R00, R01, R02), (R10, R11, R12), (R20, R21, R22) = np.asarray(R)[:3, :3].tolist()
+    diagonal = [
+        R00 + R11 + R22,
+        R00 - R11 - R22,
+        R11 - R00 - R22,
+        R22 - R00 - R11,
+    ]
+    case = diagonal.index(max(diagonal))
+    d = 0.5 * math.sqrt(max(diagonal[case] + 1.0, 0.0))
+    k = 0.25 / d
+    if case == 0:
+        w, x, y, z = d, (R21 - R12) * k, (R02 - R20) * k, (R10 - R01) * k
+    elif case == 1:
+        w, x, y, z = (R21 - R12) * k, d, (R01 + R10) * k, (R02 + R20) * k
+    elif case == 2:
+        w, x, y, z = (R02 - R20) * k, (R01 + R10) * k, d, (R12 + R21) * k
+    else:
+        w, x, y, z = (R10 - R01) * k, (R02 + R20) * k, (R12 + R21) * k, d
+    if w < 0:
+        w, x, y, z = -w, -x, -y, -z
 
     if convention == "xyzw":
         return np.array([x, y, z, w])
@@ -182,6 +320,48 @@ def get_quaternion_from_matrix(R, convention="wxyz"):
         )
 
 
+def get_quaternion_from_matrix_batch(R, convention="wxyz"):
+    """
+    Returns (..., 4) quaternions (w >= 0) from (..., 3, 3) rotation matrices
+
+    Each quaternion is computed from the largest of its components
+    so that it stays accurate near 180 degree rotations
+    """
+    R = np.asarray(R, dtype=np.float64)
+    R00, R01, R02 = R[..., 0, 0], R[..., 0, 1], R[..., 0, 2]
+    R10, R11, R12 = R[..., 1, 0], R[..., 1, 1], R[..., 1, 2]
+    R20, R21, R22 = R[..., 2, 0], R[..., 2, 1], R[..., 2, 2]
+
+    diagonal = np.stack(
+        [
+            R00 + R11 + R22,
+            R00 - R11 - R22,
+            R11 - R00 - R22,
+            R22 - R00 - R11,
+        ],
+        axis=-1,
+    )
+    case = np.argmax(diagonal, axis=-1)
+    d = 0.5 * np.sqrt(
+        np.maximum(np.take_along_axis(diagonal, case[..., None], -1)[..., 0] + 1.0, 0.0)
+    )
+    k = 0.25 / d
+
+    candidates = np.stack(
+        [
+            np.stack([d, (R21 - R12) * k, (R02 - R20) * k, (R10 - R01) * k], axis=-1),
+            np.stack([(R21 - R12) * k, d, (R01 + R10) * k, (R02 + R20) * k], axis=-1),
+            np.stack([(R02 - R20) * k, (R01 + R10) * k, d, (R12 + R21) * k], axis=-1),
+            np.stack([(R10 - R01) * k, (R02 + R20) * k, (R12 + R21) * k, d], axis=-1),
+        ],
+        axis=-2,
+    )
+    q = np.take_along_axis(candidates, case[..., None, None], -2)[..., 0, :]
+    q = np.where(q[..., :1] < 0, -q, q)
+
+    return _stack_quaternion(q[..., 0], q[..., 1], q[..., 2], q[..., 3], convention)
+
+
 def get_quaternion_from_axis_angle(axis, angle, convention="wxyz"):
     """
     Returns quaternion from axis angle
@@ -198,6 +378,16 @@ def get_quaternion_from_axis_angle(axis, angle, convention="wxyz"):
         )
 
 
+def get_quaternion_from_axis_angle_batch(axis, angle, convention="wxyz"):
+    """
+    Returns (..., 4) quaternions from (..., 3) axes and (...) angles
+    """
+    angle = np.asarray(angle, dtype=np.float64)
+    w = np.cos(angle / 2.0)
+    x, y, z = np.moveaxis(np.sin(angle / 2.0)[..., None] * np.asarray(axis), -1, 0)
+    return _stack_quaternion(w, x, y, z, convention)
+
+
 def get_quaternion_inverse(quaternion):
     """
     Returns quaternion inverse
@@ -207,6 +397,15 @@ def get_quaternion_inverse(quaternion):
     return q / np.dot(q, q)
 
 
+def get_quaternion_inverse_batch(quaternion):
+    """
+    Returns (..., 4) inverse of (..., 4) quaternions
+    """
+    q = np.array(quaternion, dtype=np.float64, copy=True)
+    np.negative(q[..., 1:], q[..., 1:])
+    return q / np.sum(q * q, axis=-1, keepdims=True)
+
+
 def get_quaternion_slerp(qA, qB, t):
     """
     referred https://en.wikipedia.org/wiki/Slerp#Quaternion_Slerp
@@ -250,6 +449,31 @@ def get_h_mat_from_quaternion(quaternion):
     )
 
 
+def get_h_mat_from_quaternion_batch(quaternion):
+    """
+    Returns (..., 4, 4) homogeneous rotation matrices from (..., 4) quaternions.
+    """
+    q = np.array(quaternion, dtype=np.float64, copy=True)
+    n = np.sum(q * q, axis=-1)
+    is_small = n < _EPS
+    q *= np.sqrt(2.0 / np.where(is_small, 1.0, n))[..., None]
+    w, x, y, z = np.moveaxis(q, -1, 0)
+
+    h_mat = np.zeros(q.shape[:-1] + (4, 4))
+    h_mat[..., 0, 0] = 1.0 - y * y - z * z
+    h_mat[..., 0, 1] = x * y - z * w
+    h_mat[..., 0, 2] = x * z + y * w
+    h_mat[..., 1, 0] = x * y + z * w
+    h_mat[..., 1, 1] = 1.0 - x * x - z * z
+    h_mat[..., 1, 2] = y * z - x * w
+    h_mat[..., 2, 0] = x * z - y * w
+    h_mat[..., 2, 1] = y * z + x * w
+    h_mat[..., 2, 2] = 1.0 - x * x - y * y
+    h_mat[..., 3, 3] = 1.0
+    h_mat[is_small] = np.identity(4)
+    return h_mat
+
+
 def quaternion_multiply(quaternion1, quaternion0):
     """
     Returns multiplication of two quaternions.
@@ -267,6 +491,23 @@ def quaternion_multiply(quaternion1, quaternion0):
     )
 
 
+def quaternion_multiply_batch(quaternion1, quaternion0):
+    """
+    Returns multiplication of two (..., 4) quaternions.
+    """
+    w0, x0, y0, z0 = np.moveaxis(np.asarray(quaternion0, dtype=np.float64), -1, 0)
+    w1, x1, y1, z1 = np.moveaxis(np.asarray(quaternion1, dtype=np.float64), -1, 0)
+    return np.stack(
+        [
+            -x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0,
+            x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0,
+            -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0,
+            x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0,
+        ],
+        axis=-1,
+    )
+
+
 # epsilon for testing whether a number is close to zero
 _EPS = np.finfo(float).eps * 4.0
 
@@ -283,6 +524,21 @@ def get_quaternion_about_axis(angle, axis):
     return q
 
 
+def get_quaternion_about_axis_batch(angle, axis):
+    """
+    Returns (..., 4) quaternions for rotation about (..., 3) axes by (...) angles.
+    """
+    angle = np.asarray(angle, dtype=np.float64)
+    axis = np.asarray(axis, dtype=np.float64)
+    qlen = np.sqrt(np.sum(axis * axis, axis=-1))
+    scale = np.where(
+        qlen > _EPS, np.sin(angle / 2.0) / np.where(qlen > _EPS, qlen, 1.0), 1.0
+    )
+    xyz = scale[..., None] * axis
+    w = np.broadcast_to(np.cos(angle / 2.0), xyz.shape[:-1])
+    return np.concatenate((w[..., None], xyz), axis=-1)
+
+
 def get_h_mat(position=np.zeros(3), orientation=np.array([1.0, 0.0, 0.0, 0.0])):
     """
     Returns homogeneous matrix from position and orientation
@@ -300,6 +556,33 @@ def get_h_mat(position=np.zeros(3), orientation=np.array([1.0, 0.0, 0.0, 0.0])):
     return H
 
 
+def get_h_mat_batch(position=np.zeros(3), orientation=np.array([1.0, 0.0, 0.0, 0.0])):
+    """
+    Returns (..., 4, 4) homogeneous matrices from (..., 3) positions and
+    (..., 3) rpy, (..., 4) quaternions or (..., 3, 3) rotation matrices
+    """
+    position = np.asarray(position, dtype=np.float64)
+    orientation = np.asarray(orientation, dtype=np.float64)
+    batch_shape = position.shape[:-1]
+    if orientation.shape == batch_shape + (3,):  # RPY Euler angles
+        R = get_matrix_from_rpy_batch(orientation)
+    elif orientation.shape == batch_shape + (4,):  # quaternion in the form [w,x,y,z]
+        R = get_matrix_from_quaternion_batch(orientation)
+    elif orientation.shape == batch_shape + (3, 3):  # Rotation matrix
+        R = orientation
+    else:
+        raise ValueError(
+            "Expecting the shape of the orientation to be (...,3), (...,3,3), or (...,4), instead got: "
+            "{}".format(orientation.shape)
+        )
+
+    H = np.zeros(batch_shape + (4, 4))
+    H[..., :3, :3] = R
+    H[..., :3, 3] = position
+    H[..., 3, 3] = 1.0
+    return H
+
+
 def get_inverse_homogeneous(matrix):
     """
     Returns homogeneous inverse
@@ -309,6 +592,19 @@ def get_inverse_homogeneous(matrix):
     return np.vstack((np.hstack((R, p)), np.array([[0, 0, 0, 1]])))
 
 
+def get_inverse_homogeneous_batch(matrix):
+    """
+    Returns (..., 4, 4) inverse of (..., 4, 4) homogeneous matrices
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    R = np.swapaxes(matrix[..., :3, :3], -1, -2)
+    H = np.zeros(matrix.shape)
+    H[..., :3, :3] = R
+    H[..., :3, 3] = -np.einsum("...ij,...j->...i", R, matrix[..., :3, 3])
+    H[..., 3, 3] = 1.0
+    return H
+
+
 def get_identity_h_mat():
     """
     Returns identity matrix
@@ -325,6 +621,13 @@ def homogeneous_to_pose(matrix):
     return np.concatenate((position, quaternion))
 
 
+def homogeneous_to_pose_batch(matrix):
+    """
+    Returns (..., 7) poses from (..., 4, 4) h_mats
+    """
+    return get_pose_from_homogeneous_batch(matrix)
+
+
 def pose_to_homogeneous(pose):
     """
     Returns h_mat from pose
@@ -334,6 +637,45 @@ def pose_to_homogeneous(pose):
     return get_h_mat(position=position, orientation=orientation)
 
 
+def pose_to_homogeneous_batch(pose):
+    """
+    Returns (..., 4, 4) h_mats from (..., 6) or (..., 7) poses
+    """
+    pose = np.asarray(pose, dtype=np.float64)
+    position, orientation = pose[..., :3], pose[..., 3:]
+    return get_h_mat_batch(position=position, orientation=orientation)
+
+
+def _split_quaternion(q, convention="wxyz"):
+    """
+    Returns w, x, y, z components of (..., 4) quaternions
+    """
+    q = np.asarray(q, dtype=np.float64)
+    if convention == "xyzw":
+        x, y, z, w = np.moveaxis(q, -1, 0)
+    elif convention == "wxyz":
+        w, x, y, z = np.moveaxis(q, -1, 0)
+    else:
+        raise NotImplementedError(
+            "Asking for a convention that has not been implemented"
+        )
+    return w, x, y, z
+
+
+def _stack_quaternion(w, x, y, z, convention="wxyz"):
+    """
+    Returns (..., 4) quaternions from w, x, y, z components
+    """
+    if convention == "xyzw":
+        return np.stack([x, y, z, w], axis=-1)
+    elif convention == "wxyz":
+        return np.stack([w, x, y, z], axis=-1)
+    else:
+        raise NotImplementedError(
+            "Asking for a convention that has not been implemented"
+        )
+
+
 def get_quaternion(orientation, convention="wxyz"):
     """
     Returns quaternion from orientation